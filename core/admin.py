@@ -3,7 +3,8 @@ from django.contrib.auth.admin import UserAdmin
 from core.models import (
     Iglesia, Usuario, CategoriaIngreso, CategoriaEgreso,
     Movimiento, SaldoMensual,
-    CajaChica, MovimientoCajaChica, UsuarioCajaChica, TransferenciaCajaChica
+    CajaChica, MovimientoCajaChica, UsuarioCajaChica, TransferenciaCajaChica,
+    ContadorComprobante, ReporteJob
 )
 from core.utils import formato_pesos
 
@@ -151,15 +152,19 @@ class SaldoMensualAdmin(admin.ModelAdmin):
 
 @admin.register(CajaChica)
 class CajaChicaAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'iglesia', 'saldo_inicial_formateado', 'activa', 'creada_por', 'fecha_creacion')
+    list_display = ('nombre', 'iglesia', 'saldo_inicial_formateado', 'saldo_actual_formateado', 'activa', 'creada_por', 'fecha_creacion')
     list_filter = ('iglesia', 'activa', 'fecha_creacion')
     search_fields = ('nombre', 'iglesia__nombre', 'descripcion')
-    readonly_fields = ('fecha_creacion', 'creada_por')
+    readonly_fields = ('fecha_creacion', 'creada_por', 'saldo_actual', 'saldo_version')
 
     fieldsets = (
         ('Información Básica', {
             'fields': ('nombre', 'iglesia', 'descripcion', 'saldo_inicial')
         }),
+        ('Saldo', {
+            'fields': ('saldo_actual', 'saldo_version'),
+            'classes': ('collapse',)
+        }),
         ('Estado', {
             'fields': ('activa',)
         }),
@@ -173,6 +178,10 @@ class CajaChicaAdmin(admin.ModelAdmin):
         return formato_pesos(obj.saldo_inicial)
     saldo_inicial_formateado.short_description = 'Saldo Inicial'
 
+    def saldo_actual_formateado(self, obj):
+        return formato_pesos(obj.saldo_actual)
+    saldo_actual_formateado.short_description = 'Saldo Actual'
+
 
 class UsuarioCajaChicaInline(admin.TabularInline):
     model = UsuarioCajaChica
@@ -257,6 +266,26 @@ class TransferenciaCajaChicaAdmin(admin.ModelAdmin):
     monto_formateado.short_description = 'Monto'
 
 
+@admin.register(ContadorComprobante)
+class ContadorComprobanteAdmin(admin.ModelAdmin):
+    list_display = ('iglesia', 'caja_chica', 'tipo', 'ultimo_numero')
+    list_filter = ('iglesia', 'tipo')
+    search_fields = ('iglesia__nombre', 'caja_chica__nombre')
+    list_select_related = ('iglesia', 'caja_chica')
+
+
+@admin.register(ReporteJob)
+class ReporteJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'iglesia', 'tipo', 'estado', 'solicitado_por', 'intentos', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo', 'iglesia')
+    search_fields = ('iglesia__nombre', 'nombre_archivo', 'error')
+    readonly_fields = (
+        'clave', 'parametros', 'nombre_archivo', 'content_type', 'error',
+        'intentos', 'fecha_creacion', 'fecha_inicio', 'fecha_fin'
+    )
+    list_select_related = ('iglesia', 'solicitado_por')
+
+
 # Personalizar el sitio admin
 admin.site.site_header = "OIKOS - Administración"
 admin.site.site_title = "OIKOS Admin"
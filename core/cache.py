@@ -0,0 +1,90 @@
+"""
+Claves de caché versionadas, con un espacio de nombres por iglesia.
+
+    clave = clave_cache(iglesia, 'dashboard', mes)
+    # 'v1:iglesia:5:g<generación>:dashboard:2024-05'
+
+Cada iglesia tiene un contador de generación guardado en la misma caché que
+los datos. invalidar_iglesia() lo incrementa y deja inalcanzables, de una
+vez, todas las claves de esa iglesia; las entradas viejas expiran solas.
+
+Los cálculos sobre los datos (movimientos, categorías, cajas) se cachean con
+clave_datos(), que incluye la versión de esos datos de la iglesia o de una
+caja chica (VersionDatosMes). El evento core.signals.datos_iglesia_cambiados
+la incrementa en cada cambio, en la misma transacción, así que lo cacheado
+nunca sirve datos viejos.
+
+La caché puede ser Redis (compartida entre workers) o memoria local / disco
+(ver CACHES en settings): estas funciones solo usan la API de Django, así
+que se prueban igual sin un servidor Redis.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Subir al cambiar el formato de lo que se guarda en caché
+VERSION_CLAVES = 1
+
+
+def _id(iglesia):
+    return getattr(iglesia, 'pk', iglesia)
+
+
+def _clave_generacion(pk, ambito='iglesia'):
+    return f'v{VERSION_CLAVES}:generacion:{ambito}:{pk}'
+
+
+def _generacion(clave, alias):
+    cache = caches[alias]
+
+    generacion = cache.get(clave)
+    if generacion is None:
+        # Se parte de un valor que no se repite: si el contador se perdió
+        # (expulsado o reinicio), las claves viejas no vuelven a ser válidas.
+        # add() no pisa el valor que haya guardado otro proceso mientras tanto
+        cache.add(clave, time.time_ns(), timeout=None)
+        generacion = cache.get(clave)
+    return generacion
+
+
+def _incrementar(clave):
+    for alias in settings.CACHES:
+        try:
+            caches[alias].incr(clave)
+        except ValueError:
+            # Sin contador todavía: nada que dependa de él quedó en esta caché
+            pass
+
+
+def generacion_iglesia(iglesia, alias='default'):
+    """Generación actual del espacio de nombres de la iglesia en la caché `alias`"""
+    return _generacion(_clave_generacion(_id(iglesia)), alias)
+
+
+def clave_cache(iglesia, *partes, alias='default'):
+    """Clave versionada dentro del espacio de nombres de la iglesia"""
+    generacion = generacion_iglesia(iglesia, alias)
+    sufijo = ':'.join(str(parte) for parte in partes)
+    return f'v{VERSION_CLAVES}:iglesia:{_id(iglesia)}:g{generacion}:{sufijo}'
+
+
+def invalidar_iglesia(iglesia):
+    """Descarta todo lo cacheado de la iglesia, en todas las cachés configuradas"""
+    _incrementar(_clave_generacion(_id(iglesia)))
+
+
+def clave_datos(iglesia, *partes, caja=None, alias='default'):
+    """
+    Clave versionada para un cálculo sobre los datos de la iglesia o, si se
+    indica `caja`, solo sobre los de esa caja chica: cambia con cada
+    modificación de esos datos (ver core.utils.version_datos).
+    """
+    from core.utils import version_datos
+
+    version = version_datos(iglesia, caja=caja)
+    if caja is not None:
+        ambito = f'caja:{_id(caja)}:d{version}'
+    else:
+        ambito = f'd{version}'
+    return clave_cache(iglesia, ambito, *partes, alias=alias)
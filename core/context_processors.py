@@ -1,5 +1,8 @@
 from django.conf import settings
 
+from core.utils import cajas_navegacion
+
+
 def app_name(request):
     """
     Context processor para hacer disponible el nombre de la aplicación en todas las templates
@@ -7,3 +10,16 @@ def app_name(request):
     return {
         'APP_NAME': settings.APP_NAME
     }
+
+
+def navegacion(request):
+    """
+    Context processor con las cajas chicas del menú lateral del usuario,
+    cacheadas por usuario (ver core.utils.cajas_navegacion)
+    """
+    usuario = getattr(request, 'user', None)
+    if usuario is None or not usuario.is_authenticated:
+        return {}
+    return {
+        'nav_cajas': cajas_navegacion(usuario)
+    }
@@ -162,6 +162,17 @@ class FiltroMovimientosForm(forms.Form):
 
             self.fields['categoria'].choices = [('', 'Todas')] + categorias
 
+    def clean_mes(self):
+        from datetime import datetime
+
+        mes = self.cleaned_data.get('mes')
+        if mes:
+            try:
+                datetime.strptime(mes, '%Y-%m')
+            except ValueError:
+                raise ValidationError('Mes inválido, use el formato AAAA-MM')
+        return mes
+
 
 class RegistroForm(UserCreationForm):
     # Campos de la iglesia
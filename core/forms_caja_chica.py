@@ -186,7 +186,7 @@ class TransferenciaCajaChicaForm(forms.ModelForm):
 
         # Validar saldo suficiente
         if caja_origen and monto:
-            saldo_origen = caja_origen.calcular_saldo_actual()
+            saldo_origen = caja_origen.saldo_actual
             if saldo_origen < monto:
                 from core.utils import formato_moneda
                 saldo_formateado = formato_moneda(saldo_origen, caja_origen.moneda)
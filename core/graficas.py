@@ -0,0 +1,323 @@
+"""
+Motores de gráficas para los reportes PDF.
+
+Cada motor dibuja las mismas gráficas (líneas, barras de balance y dona) y
+retorna un flowable listo para agregar a un documento de reportlab:
+- GraficasMatplotlib: renderiza PNG en memoria con matplotlib.
+- GraficasReportlab: dibuja objetos vectoriales con reportlab.graphics, sin
+  importar matplotlib.
+El motor por defecto se elige con REPORTES_GRAFICAS_MOTOR en settings.
+"""
+from io import BytesIO
+
+from reportlab.lib import colors
+
+
+def formato_eje(simbolo):
+    """Formatea valores del eje Y con símbolo de moneda y separador de miles"""
+    return lambda valor: f'{simbolo}{valor:,.0f}'
+
+
+def grafica_a_imagen(fig, width, height, dpi=150):
+    """
+    Renderiza una figura de matplotlib a PNG en memoria y la retorna como
+    Image de reportlab (sin archivos temporales). Cierra la figura.
+    """
+    import matplotlib.pyplot as plt
+    from reportlab.platypus import Image
+
+    imagen = BytesIO()
+    try:
+        fig.savefig(imagen, format='png', dpi=dpi, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    imagen.seek(0)
+    return Image(imagen, width=width, height=height)
+
+
+class GraficasMatplotlib:
+    """Gráficas rasterizadas con matplotlib"""
+
+    def __init__(self, dpi=150, escala=1.0):
+        import matplotlib
+        matplotlib.use('Agg')  # Backend sin interfaz gráfica
+        import matplotlib.pyplot as plt
+
+        self.plt = plt
+        self.dpi = dpi
+        self.escala = escala
+
+        plt.rcParams['font.size'] = 10
+        plt.rcParams['axes.labelsize'] = 10
+        plt.rcParams['axes.titlesize'] = 12
+        plt.rcParams['xtick.labelsize'] = 9
+        plt.rcParams['ytick.labelsize'] = 9
+        plt.rcParams['legend.fontsize'] = 8
+
+    def _figura(self, figsize):
+        ancho, alto = figsize
+        return self.plt.subplots(figsize=(ancho * self.escala, alto * self.escala))
+
+    def lineas(self, labels, series, titulo, etiqueta_y, width, height, figsize,
+               simbolo='$', relleno=False, compacta=False):
+        """series: lista de (nombre, valores, color)"""
+        plt = self.plt
+        fig, ax = self._figura(figsize)
+
+        for nombre, valores, color in series:
+            ax.plot(labels, valores, marker='o', linewidth=2, color=color,
+                    markersize=4 if compacta else 6, label=nombre)
+            if relleno:
+                ax.fill_between(range(len(labels)), valores, alpha=0.2, color=color)
+
+        tamaño = 9 if compacta else None
+        ax.set_xlabel('Mes', fontsize=tamaño)
+        ax.set_ylabel(etiqueta_y, fontsize=tamaño)
+        ax.set_title(titulo, fontsize=10 if compacta else None)
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=8 if compacta else None)
+
+        if compacta:
+            # Leyenda debajo de la gráfica
+            ax.tick_params(axis='y', labelsize=8)
+            ax.legend(loc='upper center', bbox_to_anchor=(0.5, -0.20),
+                      ncol=min(4, len(series)), fontsize=7, frameon=True)
+            ax.grid(axis='y', alpha=0.3, linestyle='--')
+        else:
+            ax.legend()
+            ax.grid(axis='y', alpha=0.3)
+
+        # Formatear eje Y con separador de miles
+        formato = formato_eje(simbolo)
+        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: formato(x)))
+
+        plt.tight_layout()
+        return grafica_a_imagen(fig, width=width, height=height, dpi=self.dpi)
+
+    def barras_balance(self, labels, valores, titulo, etiqueta_y, width, height, figsize, simbolo='$'):
+        """Barras verdes para balances positivos y rojas para negativos"""
+        plt = self.plt
+        fig, ax = self._figura(figsize)
+        colores_balance = ['#10b981' if valor >= 0 else '#ef4444' for valor in valores]
+
+        ax.bar(range(len(labels)), valores, color=colores_balance, alpha=0.8)
+        ax.axhline(y=0, color='black', linestyle='-', linewidth=0.8)
+        ax.set_xlabel('Mes', fontsize=9)
+        ax.set_ylabel(etiqueta_y, fontsize=9)
+        ax.set_title(titulo, fontsize=10)
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=8)
+        ax.tick_params(axis='y', labelsize=8)
+        ax.grid(axis='y', alpha=0.3)
+        formato = formato_eje(simbolo)
+        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: formato(x)))
+
+        plt.tight_layout()
+        return grafica_a_imagen(fig, width=width, height=height, dpi=self.dpi)
+
+    def dona(self, labels, valores, colores_dona, titulo, width, height, figsize):
+        """Gráfico de dona con leyenda de porcentajes"""
+        plt = self.plt
+        fig, ax = self._figura(figsize)
+
+        total = sum(valores)
+        porcentajes = [(valor / total * 100) if total > 0 else 0 for valor in valores]
+
+        wedges, texts, autotexts = ax.pie(valores, labels=None, autopct='%1.1f%%',
+                                          colors=colores_dona[:len(valores)], startangle=90,
+                                          pctdistance=0.85, wedgeprops=dict(width=0.5))
+        ax.set_title(titulo)
+
+        # Mejorar el formato de los porcentajes
+        for autotext in autotexts:
+            autotext.set_color('white')
+            autotext.set_fontsize(9)
+            autotext.set_weight('bold')
+
+        # Crear leyenda con nombres y porcentajes
+        legend_labels = [f'{label}: {pct:.1f}%' for label, pct in zip(labels, porcentajes)]
+        ax.legend(legend_labels, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1), fontsize=9)
+
+        plt.tight_layout()
+        return grafica_a_imagen(fig, width=width, height=height, dpi=self.dpi)
+
+
+class GraficasReportlab:
+    """Gráficas vectoriales con reportlab.graphics (sin matplotlib)"""
+
+    def __init__(self, dpi=None, escala=1.0):
+        # El dpi no aplica a gráficos vectoriales; se acepta por compatibilidad
+        self.escala = escala
+
+    def _dibujo(self, width, height, titulo):
+        """
+        Dibujo de width x height multiplicados por la escala, como el tamaño de
+        figura en matplotlib: con más escala, el texto ocupa menos proporción
+        de la gráfica. _ajustar() lo lleva de vuelta al tamaño en la página.
+        """
+        from reportlab.graphics.shapes import Drawing, String
+
+        dibujo = Drawing(width * self.escala, height * self.escala)
+        dibujo.add(String(
+            dibujo.width / 2, dibujo.height - 14, titulo,
+            fontName='Helvetica-Bold', fontSize=10, textAnchor='middle'
+        ))
+        return dibujo
+
+    def _ajustar(self, dibujo):
+        dibujo.scale(1 / self.escala, 1 / self.escala)
+        dibujo.width /= self.escala
+        dibujo.height /= self.escala
+        return dibujo
+
+    def _etiqueta_y(self, dibujo, grafica, etiqueta_y):
+        from reportlab.graphics.shapes import Group, String
+
+        etiqueta = Group(String(0, 0, etiqueta_y, fontName='Helvetica', fontSize=8, textAnchor='middle'))
+        etiqueta.translate(10, grafica.y + grafica.height / 2)
+        etiqueta.rotate(90)
+        dibujo.add(etiqueta)
+
+    def _ejes(self, grafica, labels, simbolo):
+        grafica.categoryAxis.categoryNames = list(labels)
+        grafica.categoryAxis.labels.angle = 45
+        grafica.categoryAxis.labels.boxAnchor = 'ne'
+        grafica.categoryAxis.labels.fontName = 'Helvetica'
+        grafica.categoryAxis.labels.fontSize = 7
+        # Etiquetas de meses debajo del gráfico aunque haya valores negativos
+        grafica.categoryAxis.labelAxisMode = 'low'
+        grafica.valueAxis.labels.fontName = 'Helvetica'
+        grafica.valueAxis.labels.fontSize = 7
+        grafica.valueAxis.labelTextFormat = formato_eje(simbolo)
+        grafica.valueAxis.visibleGrid = True
+        grafica.valueAxis.gridStrokeColor = colors.HexColor('#e5e7eb')
+
+    def _leyenda(self, dibujo, x, y, items, columnas=1):
+        from reportlab.graphics.charts.legends import Legend
+
+        leyenda = Legend()
+        leyenda.x = x
+        leyenda.y = y
+        leyenda.fontName = 'Helvetica'
+        leyenda.fontSize = 7
+        leyenda.boxAnchor = 'nw'
+        leyenda.columnMaximum = max(1, -(-len(items) // columnas))
+        leyenda.deltax = 90
+        leyenda.colorNamePairs = items
+        dibujo.add(leyenda)
+
+    def lineas(self, labels, series, titulo, etiqueta_y, width, height, figsize=None,
+               simbolo='$', relleno=False, compacta=False):
+        """series: lista de (nombre, valores, color)"""
+        from reportlab.graphics.charts.linecharts import HorizontalLineChart
+        from reportlab.graphics.widgets.markers import makeMarker
+
+        dibujo = self._dibujo(width, height, titulo)
+        width, height = dibujo.width, dibujo.height
+        alto_leyenda = 14 * min(len(series), 4) if compacta else 0
+
+        grafica = HorizontalLineChart()
+        grafica.x = 65
+        grafica.y = 40 + alto_leyenda
+        grafica.width = width - 85 - (0 if compacta else 80)
+        grafica.height = height - 70 - alto_leyenda
+        grafica.data = [[float(valor) for valor in valores] for _, valores, _ in series]
+        grafica.joinedLines = 1
+        self._ejes(grafica, labels, simbolo)
+
+        for indice, (_, _, color) in enumerate(series):
+            grafica.lines[indice].strokeColor = colors.HexColor(color)
+            grafica.lines[indice].strokeWidth = 1.5
+            grafica.lines[indice].symbol = makeMarker('FilledCircle', size=3 if compacta else 4)
+            grafica.lines[indice].symbol.fillColor = colors.HexColor(color)
+            grafica.lines[indice].symbol.strokeColor = colors.HexColor(color)
+
+        dibujo.add(grafica)
+        self._etiqueta_y(dibujo, grafica, etiqueta_y)
+
+        items = [(colors.HexColor(color), nombre) for nombre, _, color in series]
+        if compacta:
+            self._leyenda(dibujo, 65, alto_leyenda + 2, items, columnas=4)
+        else:
+            self._leyenda(dibujo, width - 90, height - 30, items)
+        return self._ajustar(dibujo)
+
+    def barras_balance(self, labels, valores, titulo, etiqueta_y, width, height, figsize=None, simbolo='$'):
+        """Barras verdes para balances positivos y rojas para negativos"""
+        from reportlab.graphics.charts.barcharts import VerticalBarChart
+
+        dibujo = self._dibujo(width, height, titulo)
+        width, height = dibujo.width, dibujo.height
+
+        grafica = VerticalBarChart()
+        grafica.x = 65
+        grafica.y = 40
+        grafica.width = width - 85
+        grafica.height = height - 70
+        grafica.data = [[float(valor) for valor in valores]]
+        grafica.bars.strokeColor = None
+        self._ejes(grafica, labels, simbolo)
+
+        for indice, valor in enumerate(valores):
+            color = '#10b981' if valor >= 0 else '#ef4444'
+            grafica.bars[(0, indice)].fillColor = colors.HexColor(color)
+
+        dibujo.add(grafica)
+        self._etiqueta_y(dibujo, grafica, etiqueta_y)
+        return self._ajustar(dibujo)
+
+    def dona(self, labels, valores, colores_dona, titulo, width, height, figsize=None):
+        """Gráfico de dona con leyenda de porcentajes"""
+        from reportlab.graphics.charts.piecharts import Pie
+
+        dibujo = self._dibujo(width, height, titulo)
+        width, height = dibujo.width, dibujo.height
+
+        total = sum(valores)
+        porcentajes = [(valor / total * 100) if total > 0 else 0 for valor in valores]
+
+        diametro = min(height - 40, width / 2)
+        dona = Pie()
+        dona.x = 30
+        dona.y = (height - 20 - diametro) / 2
+        dona.width = diametro
+        dona.height = diametro
+        dona.data = [float(valor) for valor in valores]
+        dona.innerRadiusFraction = 0.5
+        dona.startAngle = 90
+        dona.direction = 'clockwise'
+        dona.slices.strokeColor = colors.white
+        dona.slices.strokeWidth = 1
+        for indice in range(len(valores)):
+            dona.slices[indice].fillColor = colors.HexColor(colores_dona[indice % len(colores_dona)])
+        dibujo.add(dona)
+
+        items = [
+            (colors.HexColor(colores_dona[indice % len(colores_dona)]), f'{label}: {pct:.1f}%')
+            for indice, (label, pct) in enumerate(zip(labels, porcentajes))
+        ]
+        self._leyenda(dibujo, diametro + 60, dona.y + diametro, items)
+        return self._ajustar(dibujo)
+
+
+MOTORES_GRAFICAS = {
+    'matplotlib': GraficasMatplotlib,
+    'reportlab': GraficasReportlab,
+}
+
+
+def obtener_motor_graficas(motor=None, dpi=None, escala=None):
+    """
+    Retorna una instancia del motor de gráficas indicado o, por defecto, el de
+    REPORTES_GRAFICAS_MOTOR. Lanza ValueError si el motor no existe.
+    """
+    from django.conf import settings
+
+    motor = motor or getattr(settings, 'REPORTES_GRAFICAS_MOTOR', 'matplotlib')
+    if motor not in MOTORES_GRAFICAS:
+        raise ValueError(f'Motor de gráficas desconocido: {motor}')
+
+    return MOTORES_GRAFICAS[motor](
+        dpi=dpi or getattr(settings, 'REPORTES_GRAFICAS_DPI', 150),
+        escala=escala or getattr(settings, 'REPORTES_GRAFICAS_ESCALA', 1.0),
+    )
@@ -0,0 +1,104 @@
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+
+from core.graficas import MOTORES_GRAFICAS
+from core.models import Iglesia
+
+
+class Command(BaseCommand):
+    help = 'Compara latencia, memoria (RSS) y tamaño del PDF del dashboard entre motores de gráficas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iglesia',
+            type=int,
+            help='ID de la iglesia a medir (por defecto la que tiene más movimientos)'
+        )
+        parser.add_argument(
+            '--mes',
+            help='Mes del reporte en formato YYYY-MM (por defecto el mes actual)'
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=5,
+            help='Cantidad de PDFs generados por motor (default: 5)'
+        )
+        parser.add_argument(
+            '--motor',
+            choices=sorted(MOTORES_GRAFICAS),
+            help='Mide un único motor en este proceso e imprime el resultado en JSON'
+        )
+
+    def handle(self, *args, **options):
+        if options['iglesia']:
+            iglesia = Iglesia.objects.filter(pk=options['iglesia']).first()
+        else:
+            iglesia = Iglesia.objects.annotate(
+                total=Count('movimientos')
+            ).order_by('-total').first()
+
+        if not iglesia:
+            raise CommandError('No hay iglesias para medir')
+
+        mes = options['mes'] or timezone.now().strftime('%Y-%m')
+
+        if options['motor']:
+            resultado = self.medir(iglesia, mes, options['motor'], options['repeticiones'])
+            self.stdout.write(json.dumps(resultado))
+            return
+
+        # Cada motor se mide en un proceso nuevo para que el RSS no incluya
+        # módulos cargados por el otro (p. ej. matplotlib)
+        self.stdout.write(f'Iglesia: {iglesia.nombre} - Mes: {mes}\n')
+        for motor in sorted(MOTORES_GRAFICAS):
+            proceso = subprocess.run(
+                [
+                    sys.executable, sys.argv[0], 'benchmark_dashboard_pdf',
+                    '--motor', motor,
+                    '--iglesia', str(iglesia.pk),
+                    '--mes', mes,
+                    '--repeticiones', str(options['repeticiones']),
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if proceso.returncode != 0:
+                self.stdout.write(self.style.WARNING(f'○ {motor}: error\n{proceso.stderr}'))
+                continue
+
+            resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {motor}: primera={resultado['primera_ms']:.0f} ms "
+                f"promedio={resultado['promedio_ms']:.0f} ms "
+                f"RSS máx={resultado['rss_max_kb'] / 1024:.1f} MB "
+                f"(+{resultado['rss_incremento_kb'] / 1024:.1f} MB) "
+                f"PDF={resultado['pdf_bytes'] / 1024:.1f} KB"
+            ))
+
+    def medir(self, iglesia, mes, motor, repeticiones):
+        from core.utils import generar_dashboard_pdf
+
+        rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tiempos = []
+        for _ in range(max(1, repeticiones)):
+            inicio = time.perf_counter()
+            pdf = generar_dashboard_pdf(iglesia, mes, motor_graficas=motor)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        rss_final = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        return {
+            'motor': motor,
+            'primera_ms': tiempos[0],
+            'promedio_ms': sum(tiempos) / len(tiempos),
+            'rss_max_kb': rss_final,
+            'rss_incremento_kb': rss_final - rss_inicial,
+            'pdf_bytes': len(pdf.getvalue()),
+        }
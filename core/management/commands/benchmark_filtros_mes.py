@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+
+from core.models import Iglesia, Movimiento
+from core.utils import rango_mes
+
+
+class Command(BaseCommand):
+    help = 'Compara el filtro mensual por fecha__year/fecha__month contra el rango de fechas de rango_mes()'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iglesia',
+            type=int,
+            help='ID de la iglesia a medir (por defecto la que tiene más movimientos)'
+        )
+        parser.add_argument(
+            '--mes',
+            help='Mes a consultar en formato YYYY-MM (por defecto el mes actual)'
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=20,
+            help='Cantidad de ejecuciones por variante (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        if options['iglesia']:
+            iglesia = Iglesia.objects.filter(pk=options['iglesia']).first()
+        else:
+            iglesia = Iglesia.objects.annotate(
+                total=Count('movimientos')
+            ).order_by('-total').first()
+
+        if not iglesia:
+            raise CommandError('No hay iglesias para medir')
+
+        año_mes = options['mes'] or timezone.now().strftime('%Y-%m')
+        try:
+            rango = rango_mes(año_mes)
+        except ValueError:
+            raise CommandError(f'Mes inválido: {año_mes}')
+
+        año, mes = año_mes.split('-')
+        variantes = [
+            ('fecha__year/fecha__month', {'fecha__year': int(año), 'fecha__month': int(mes)}),
+            ('rango_mes()', rango),
+        ]
+
+        self.stdout.write(f'Iglesia: {iglesia.nombre} - Mes: {año_mes}\n')
+
+        for nombre, filtro in variantes:
+            queryset = Movimiento.objects.filter(iglesia=iglesia, anulado=False, **filtro)
+
+            inicio = time.perf_counter()
+            for _ in range(options['repeticiones']):
+                totales = queryset.aggregate(
+                    ingresos=Sum('monto', filter=Q(tipo='INGRESO')),
+                    egresos=Sum('monto', filter=Q(tipo='EGRESO'))
+                )
+            promedio_ms = (time.perf_counter() - inicio) * 1000 / options['repeticiones']
+
+            self.stdout.write(self.style.SUCCESS(f'✓ {nombre}: {promedio_ms:.2f} ms promedio'))
+            self.stdout.write(f"    ingresos={totales['ingresos']} egresos={totales['egresos']}")
+            for linea in queryset.values('tipo').annotate(total=Sum('monto')).explain().splitlines():
+                self.stdout.write(f'    {linea}')
@@ -0,0 +1,217 @@
+import json
+import statistics
+import subprocess
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Iglesia, Usuario, CajaChica, ReporteJob
+from core.perfil import PerfilConsultas
+
+
+def puntos_de_entrada(caja, mes_anterior):
+    """
+    Vistas medidas por el benchmark: (nombre, url, parámetros GET).
+    Las que dependen de una caja chica se omiten si la iglesia no tiene cajas.
+    """
+    hoy = date.today()
+    puntos = [
+        ('dashboard', reverse('dashboard'), {}),
+        ('dashboard_data_api', reverse('dashboard_data_api'), {}),
+        ('movimiento_list', reverse('movimiento_list'), {}),
+        ('caja_chica_list', reverse('caja_chica_list'), {}),
+        ('transferencia_list', reverse('transferencia_list'), {}),
+        ('gestionar_usuarios', reverse('gestionar_usuarios'), {}),
+        ('reporte_mensual_pdf', reverse('generar_reporte_pdf'), {'mes': mes_anterior}),
+        ('reporte_movimientos_completo_pdf', reverse('reporte_movimientos_completo'), {}),
+        ('reporte_movimientos_ultimo_mes_pdf', reverse('reporte_movimientos_completo'), {
+            'fecha_desde': (hoy - relativedelta(months=1)).isoformat(),
+            'fecha_hasta': hoy.isoformat(),
+        }),
+        ('dashboard_pdf', reverse('exportar_dashboard_pdf'), {'mes': mes_anterior}),
+        ('exportar_excel', reverse('exportar_excel'), {}),
+        ('exportar_csv', reverse('exportar_movimientos', args=['csv']), {}),
+        ('exportar_ndjson', reverse('exportar_movimientos', args=['ndjson']), {}),
+    ]
+
+    if caja:
+        puntos += [
+            ('dashboard_caja', reverse('dashboard_caja', args=[caja.pk]), {}),
+            ('dashboard_caja_data_api', reverse('dashboard_caja_data_api', args=[caja.pk]), {}),
+            ('movimiento_caja_list', reverse('movimiento_caja_list', args=[caja.pk]), {}),
+            ('exportar_caja_csv', reverse('exportar_movimientos_caja', args=[caja.pk, 'csv']), {}),
+        ]
+
+    return puntos
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide tiempo y consultas SQL de las vistas principales (dashboard, APIs, listados, '
+        'reportes y exportaciones) y guarda los resultados en JSON para comparar entre commits'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iglesia',
+            type=int,
+            help='ID de la iglesia a medir (por defecto la que tiene más movimientos)'
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=5,
+            help='Veces que se mide cada vista (default: 5)'
+        )
+        parser.add_argument(
+            '--solo',
+            nargs='+',
+            metavar='NOMBRE',
+            help='Mide solo las vistas indicadas'
+        )
+        parser.add_argument(
+            '--salida',
+            help='Archivo JSON de resultados (por defecto benchmark-<commit>.json)'
+        )
+        parser.add_argument(
+            '--comparar',
+            metavar='ARCHIVO',
+            help='JSON de una medición anterior para mostrar la diferencia'
+        )
+
+    def handle(self, *args, **options):
+        if options['iglesia']:
+            iglesia = Iglesia.objects.filter(pk=options['iglesia']).first()
+        else:
+            iglesia = Iglesia.objects.annotate(
+                total=Count('movimientos')
+            ).order_by('-total').first()
+
+        if not iglesia:
+            raise CommandError('No hay iglesias para medir (ver manage.py generar_datos_sinteticos)')
+
+        usuario = Usuario.objects.filter(iglesia=iglesia, rol='ADMIN').order_by('pk').first()
+        if not usuario:
+            raise CommandError(f'La iglesia {iglesia.nombre} no tiene un usuario ADMIN')
+
+        caja = CajaChica.objects.filter(iglesia=iglesia, activa=True).annotate(
+            total=Count('movimientos')
+        ).order_by('-total').first()
+        mes_anterior = (timezone.now().date().replace(day=1) - relativedelta(months=1)).strftime('%Y-%m')
+
+        puntos = puntos_de_entrada(caja, mes_anterior)
+        if options['solo']:
+            puntos = [punto for punto in puntos if punto[0] in options['solo']]
+
+        commit = self.commit_actual()
+        self.stdout.write(f'Iglesia: {iglesia.nombre} - Commit: {commit or "?"}\n')
+
+        ultimo_job = ReporteJob.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        # Reportes generados dentro del request, sin caché, y sin depender de collectstatic
+        with override_settings(
+            ALLOWED_HOSTS=['*'],
+            REPORTES_MODO='local',
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        ):
+            cliente = Client()
+            cliente.force_login(usuario)
+
+            resultados = {}
+            for nombre, url, parametros in puntos:
+                resultados[nombre] = self.medir(cliente, url, parametros, options['repeticiones'])
+                resultado = resultados[nombre]
+                estilo = self.style.SUCCESS if resultado['estado'] == 200 else self.style.WARNING
+                self.stdout.write(estilo(
+                    f"{'✓' if resultado['estado'] == 200 else '○'} {nombre}: "
+                    f"mediana={resultado['mediana_ms']:.0f} ms "
+                    f"consultas={resultado['consultas']} "
+                    f"db={resultado['tiempo_db_ms']:.0f} ms "
+                    f"({resultado['bytes'] / 1024:.0f} KB)"
+                ))
+
+        ReporteJob.objects.filter(pk__gt=ultimo_job, iglesia=iglesia).delete()
+
+        datos = {
+            'commit': commit,
+            'fecha': timezone.now().isoformat(),
+            'base_de_datos': connection.vendor,
+            'iglesia': {
+                'id': iglesia.pk,
+                'movimientos': iglesia.movimientos.count(),
+                'cajas_chicas': iglesia.cajas_chicas.count(),
+            },
+            'repeticiones': options['repeticiones'],
+            'resultados': resultados,
+        }
+
+        salida = options['salida'] or f'benchmark-{commit or "local"}.json'
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump(datos, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'\n✓ Resultados guardados en {salida}'))
+
+        if options['comparar']:
+            self.comparar(options['comparar'], datos)
+
+    def medir(self, cliente, url, parametros, repeticiones):
+        tiempos = []
+        for _ in range(max(1, repeticiones)):
+            caches[settings.REPORTES_CACHE].clear()
+
+            with PerfilConsultas() as perfil:
+                inicio = time.perf_counter()
+                response = cliente.get(url, parametros, follow=True)
+                contenido = b''.join(response.streaming_content) if response.streaming else response.content
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        return {
+            'url': url,
+            'parametros': parametros,
+            'estado': response.status_code,
+            'min_ms': round(min(tiempos), 2),
+            'mediana_ms': round(statistics.median(tiempos), 2),
+            'max_ms': round(max(tiempos), 2),
+            # Consultas y tiempo de base de datos de la última repetición
+            'consultas': perfil.total,
+            'tiempo_db_ms': round(perfil.tiempo_ms, 2),
+            'bytes': len(contenido),
+        }
+
+    def comparar(self, archivo_anterior, datos):
+        with open(archivo_anterior, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)
+
+        self.stdout.write(f'\nComparación con {anterior.get("commit") or archivo_anterior}:')
+        for nombre, actual in datos['resultados'].items():
+            previo = anterior.get('resultados', {}).get(nombre)
+            if not previo:
+                self.stdout.write(f'  {nombre}: sin medición anterior')
+                continue
+
+            variacion = (actual['mediana_ms'] - previo['mediana_ms']) / previo['mediana_ms'] * 100 if previo['mediana_ms'] else 0
+            estilo = self.style.WARNING if variacion > 10 or actual['consultas'] > previo['consultas'] else self.style.SUCCESS
+            self.stdout.write(estilo(
+                f"  {nombre}: {previo['mediana_ms']:.0f} → {actual['mediana_ms']:.0f} ms ({variacion:+.0f}%), "
+                f"consultas {previo['consultas']} → {actual['consultas']}"
+            ))
+
+    def commit_actual(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,258 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    Iglesia, Usuario, CategoriaIngreso, CategoriaEgreso, Movimiento,
+    CajaChica, MovimientoCajaChica, UsuarioCajaChica, TransferenciaCajaChica
+)
+from core.utils import carga_masiva, asignar_comprobantes
+
+# Filas por INSERT en bulk_create
+LOTE = 5000
+
+CONCEPTOS_INGRESO = ['Ofrendas dominicales', 'Diezmos', 'Donación', 'Evento especial', 'Venta de libros']
+CONCEPTOS_EGRESO = ['Alquiler', 'Luz, gas y agua', 'Apoyo misionero', 'Reparaciones', 'Materiales', 'Sueldos']
+
+
+class Command(BaseCommand):
+    help = 'Genera iglesias sintéticas con años de movimientos para pruebas de rendimiento (bulk_create)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iglesias', type=int, default=1, help='Cantidad de iglesias (default: 1)')
+        parser.add_argument('--años', type=int, default=5, help='Años de historia hasta el mes actual (default: 5)')
+        parser.add_argument(
+            '--movimientos-mes', type=int, default=60,
+            help='Movimientos de la iglesia por mes (default: 60)'
+        )
+        parser.add_argument('--cajas', type=int, default=5, help='Cajas chicas por iglesia (default: 5)')
+        parser.add_argument(
+            '--movimientos-caja-mes', type=int, default=15,
+            help='Movimientos por caja chica por mes (default: 15)'
+        )
+        parser.add_argument(
+            '--transferencias-mes', type=int, default=4,
+            help='Transferencias entre cajas por mes (default: 4)'
+        )
+        parser.add_argument(
+            '--anulados', type=float, default=2.0,
+            help='Porcentaje de movimientos anulados (default: 2)'
+        )
+        parser.add_argument('--prefijo', default='Iglesia Sintética', help='Prefijo del nombre de las iglesias')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla aleatoria, para datos reproducibles')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['semilla'])
+        self.options = options
+
+        hoy = date.today()
+        self.fecha_fin = hoy
+        self.fecha_inicio = hoy.replace(day=1) - relativedelta(years=options['años'])
+
+        for numero in range(1, options['iglesias'] + 1):
+            inicio = time.perf_counter()
+            with transaction.atomic():
+                iglesia, totales = self.generar_iglesia(numero)
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {iglesia.nombre} (id {iglesia.pk}): {totales["movimientos"]} movimientos, '
+                f'{totales["cajas"]} cajas, {totales["movimientos_caja"]} movimientos de caja, '
+                f'{totales["transferencias"]} transferencias en {time.perf_counter() - inicio:.1f}s'
+            ))
+
+        self.stdout.write(self.style.SUCCESS('\nUsuarios creados con contraseña: benchmark'))
+
+    def generar_iglesia(self, numero):
+        nombre = f'{self.options["prefijo"]} {numero}'
+        sufijo = 1
+        while Iglesia.objects.filter(nombre=nombre).exists():
+            sufijo += 1
+            nombre = f'{self.options["prefijo"]} {numero}-{sufijo}'
+
+        # Las categorías por defecto se crean por signal
+        iglesia = Iglesia.objects.create(nombre=nombre, direccion=f'Calle Sintética {numero}')
+
+        admin = self.crear_usuario(iglesia, 'admin', rol='ADMIN', puede_aprobar=True)
+        tesorero = self.crear_usuario(iglesia, 'tesorero', rol='TESORERO')
+
+        categorias_ingreso = list(CategoriaIngreso.objects.filter(iglesia=iglesia))
+        categorias_egreso = list(CategoriaEgreso.objects.filter(iglesia=iglesia))
+
+        # bulk_create no dispara los signals: carga_masiva recalcula saldos y
+        # versiones de datos una sola vez al terminar
+        with carga_masiva(iglesia):
+            totales = self.generar_datos_iglesia(iglesia, admin, tesorero, categorias_ingreso, categorias_egreso)
+
+        return iglesia, totales
+
+    def generar_datos_iglesia(self, iglesia, admin, tesorero, categorias_ingreso, categorias_egreso):
+        totales = {
+            'movimientos': self.generar_movimientos(iglesia, admin, categorias_ingreso, categorias_egreso),
+            'cajas': 0,
+            'movimientos_caja': 0,
+            'transferencias': 0,
+        }
+
+        cajas = [
+            CajaChica.objects.create(
+                iglesia=iglesia,
+                nombre=f'Caja {indice:02d}',
+                saldo_inicial=Decimal(self.random.randint(0, 50000)),
+                creada_por=admin
+            )
+            for indice in range(1, self.options['cajas'] + 1)
+        ]
+        totales['cajas'] = len(cajas)
+
+        if cajas:
+            UsuarioCajaChica.objects.bulk_create([
+                UsuarioCajaChica(usuario=tesorero, caja_chica=caja, rol_caja='TESORERO_CAJA', asignado_por=admin)
+                for caja in cajas
+            ])
+            totales['movimientos_caja'] = self.generar_movimientos_caja(
+                cajas, admin, categorias_ingreso, categorias_egreso
+            )
+            totales['transferencias'] = self.generar_transferencias(cajas, admin)
+
+        return totales
+
+    def crear_usuario(self, iglesia, nombre, **campos):
+        return Usuario.objects.create_user(
+            username=f'sintetico_{iglesia.pk}_{nombre}',
+            password='benchmark',
+            iglesia=iglesia,
+            terminos_aceptados=True,
+            fecha_aceptacion_terminos=timezone.now(),
+            **campos
+        )
+
+    def meses(self):
+        mes = self.fecha_inicio
+        while mes <= self.fecha_fin:
+            yield mes
+            mes += relativedelta(months=1)
+
+    def fecha_en_mes(self, mes):
+        ultimo_dia = (mes + relativedelta(months=1) - timedelta(days=1)).day
+        fecha = mes.replace(day=self.random.randint(1, ultimo_dia))
+        return min(fecha, self.fecha_fin)
+
+    def anulado(self):
+        return self.random.random() * 100 < self.options['anulados']
+
+    def datos_anulacion(self, usuario):
+        return {
+            'anulado': True,
+            'anulado_por': usuario,
+            'fecha_anulacion': timezone.now(),
+            'motivo_anulacion': 'Anulación sintética',
+        }
+
+    def generar_movimientos(self, iglesia, usuario, categorias_ingreso, categorias_egreso):
+        lote = []
+        total = 0
+
+        for mes in self.meses():
+            for _ in range(self.options['movimientos_mes']):
+                # Aproximadamente 55% ingresos, con montos que mantienen el saldo positivo
+                tipo = 'INGRESO' if self.random.random() < 0.55 else 'EGRESO'
+                movimiento = Movimiento(
+                    iglesia=iglesia,
+                    tipo=tipo,
+                    fecha=self.fecha_en_mes(mes),
+                    categoria_ingreso=self.random.choice(categorias_ingreso) if tipo == 'INGRESO' else None,
+                    categoria_egreso=self.random.choice(categorias_egreso) if tipo == 'EGRESO' else None,
+                    concepto=self.random.choice(CONCEPTOS_INGRESO if tipo == 'INGRESO' else CONCEPTOS_EGRESO),
+                    monto=Decimal(self.random.randint(1000, 200000)),
+                    creado_por=usuario,
+                    aprobado_por=usuario,
+                    **(self.datos_anulacion(usuario) if self.anulado() else {})
+                )
+                lote.append(movimiento)
+
+                if len(lote) >= LOTE:
+                    self.guardar(Movimiento, lote)
+                    total += len(lote)
+                    lote = []
+
+        self.guardar(Movimiento, lote)
+        return total + len(lote)
+
+    def generar_movimientos_caja(self, cajas, usuario, categorias_ingreso, categorias_egreso):
+        lote = []
+        total = 0
+
+        for caja in cajas:
+            for mes in self.meses():
+                for _ in range(self.options['movimientos_caja_mes']):
+                    tipo = 'INGRESO' if self.random.random() < 0.55 else 'EGRESO'
+                    lote.append(MovimientoCajaChica(
+                        caja_chica=caja,
+                        tipo=tipo,
+                        fecha=self.fecha_en_mes(mes),
+                        categoria_ingreso=self.random.choice(categorias_ingreso) if tipo == 'INGRESO' else None,
+                        categoria_egreso=self.random.choice(categorias_egreso) if tipo == 'EGRESO' else None,
+                        concepto=self.random.choice(CONCEPTOS_INGRESO if tipo == 'INGRESO' else CONCEPTOS_EGRESO),
+                        monto=Decimal(self.random.randint(100, 20000)),
+                        creado_por=usuario,
+                        aprobado_por=usuario,
+                        **(self.datos_anulacion(usuario) if self.anulado() else {})
+                    ))
+
+                    if len(lote) >= LOTE:
+                        self.guardar(MovimientoCajaChica, lote)
+                        total += len(lote)
+                        lote = []
+
+        self.guardar(MovimientoCajaChica, lote)
+        return total + len(lote)
+
+    def guardar(self, modelo, movimientos):
+        asignar_comprobantes(movimientos)
+        modelo.objects.bulk_create(movimientos)
+
+    def generar_transferencias(self, cajas, usuario):
+        if len(cajas) < 2:
+            return 0
+
+        transferencias = []
+        movimientos = []
+        for mes in self.meses():
+            for _ in range(self.options['transferencias_mes']):
+                origen, destino = self.random.sample(cajas, 2)
+                fecha = self.fecha_en_mes(mes)
+                monto = Decimal(self.random.randint(100, 5000))
+                anulacion = self.datos_anulacion(usuario) if self.anulado() else {}
+
+                egreso = MovimientoCajaChica(
+                    caja_chica=origen, tipo='EGRESO', fecha=fecha, monto=monto,
+                    concepto=f'Transferencia a {destino.nombre}: Fondos',
+                    creado_por=usuario, aprobado_por=usuario, **anulacion
+                )
+                ingreso = MovimientoCajaChica(
+                    caja_chica=destino, tipo='INGRESO', fecha=fecha, monto=monto,
+                    concepto=f'Transferencia desde {origen.nombre}: Fondos',
+                    creado_por=usuario, aprobado_por=usuario, **anulacion
+                )
+                movimientos += [egreso, ingreso]
+                transferencias.append(TransferenciaCajaChica(
+                    caja_origen=origen, caja_destino=destino, monto=monto, fecha=fecha,
+                    concepto='Fondos', realizada_por=usuario,
+                    movimiento_egreso=egreso, movimiento_ingreso=ingreso,
+                    anulada=bool(anulacion),
+                    anulada_por=anulacion.get('anulado_por'),
+                    fecha_anulacion=anulacion.get('fecha_anulacion'),
+                    motivo_anulacion=anulacion.get('motivo_anulacion', ''),
+                ))
+
+        # bulk_create asigna las claves primarias (PostgreSQL y SQLite >= 3.35),
+        # necesarias para enlazar las transferencias con sus movimientos
+        asignar_comprobantes(movimientos)
+        MovimientoCajaChica.objects.bulk_create(movimientos, batch_size=LOTE)
+        TransferenciaCajaChica.objects.bulk_create(transferencias, batch_size=LOTE)
+        return len(transferencias)
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.reportes import tomar_siguiente_job, procesar_job, liberar_jobs_colgados, purgar_jobs_antiguos
+
+
+class Command(BaseCommand):
+    help = 'Worker que procesa la cola de reportes en segundo plano (ReporteJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa los jobs pendientes y termina (sin quedar escuchando)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos de espera entre consultas cuando la cola está vacía (default: 2)'
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=0,
+            help='Termina después de procesar N jobs (0 = sin límite); útil para reciclar el proceso'
+        )
+        parser.add_argument(
+            '--timeout-minutos',
+            type=int,
+            help='Minutos tras los cuales un job en proceso se considera colgado y vuelve a la cola '
+                 '(default: REPORTES_TIMEOUT_MINUTOS)'
+        )
+        parser.add_argument(
+            '--retencion-dias',
+            type=int,
+            help='Días que se conservan los jobs terminados antes de eliminarlos '
+                 '(default: REPORTES_RETENCION_DIAS)'
+        )
+
+    def handle(self, *args, **options):
+        eliminados = purgar_jobs_antiguos(options['retencion_dias'])
+        if eliminados:
+            self.stdout.write(self.style.SUCCESS(f'✓ {eliminados} job(s) antiguos eliminados'))
+
+        procesados = 0
+        while True:
+            # En cada vuelta, para recuperar también los jobs de otros workers caídos
+            liberados = liberar_jobs_colgados(options['timeout_minutos'])
+            if liberados:
+                self.stdout.write(self.style.WARNING(f'○ {liberados} job(s) colgados devueltos a la cola'))
+
+            job = tomar_siguiente_job()
+
+            if job is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            inicio = time.perf_counter()
+            procesar_job(job)
+            duracion = time.perf_counter() - inicio
+
+            if job.estado == 'COMPLETADO':
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ Job {job.pk} ({job.get_tipo_display()}) completado en {duracion:.1f}s'
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(f'○ Job {job.pk} ({job.get_tipo_display()}) falló: {job.error}'))
+
+            procesados += 1
+            if options['max_jobs'] and procesados >= options['max_jobs']:
+                break
+
+        if options['una_vez']:
+            self.stdout.write(self.style.SUCCESS(f'✓ {procesados} job(s) procesados'))
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from core.models import Iglesia, CategoriaIngreso, CategoriaEgreso, Movimiento
+from core.utils import carga_masiva, asignar_comprobantes
 from datetime import datetime, timedelta
 from decimal import Decimal
 import random
@@ -11,6 +12,14 @@ Usuario = get_user_model()
 class Command(BaseCommand):
     help = 'Setup inicial de OIKOS con datos de ejemplo'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=3,
+            help='Meses de movimientos de ejemplo a generar (default: 3)'
+        )
+
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.SUCCESS('=== OIKOS - Setup Inicial ===\n'))
 
@@ -21,7 +30,7 @@ class Command(BaseCommand):
                 nombre='Iglesia Ejemplo',
                 defaults={
                     'direccion': 'Calle Principal 123',
-                    'telefono': '011-4444-5555',
+                    'celular': '011-4444-5555',
                     'email': 'contacto@iglesiaejemplo.org',
                     'activa': True
                 }
@@ -56,12 +65,14 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f'✓ Categorías de ingreso: {categorias_ingreso}'))
         self.stdout.write(self.style.SUCCESS(f'✓ Categorías de egreso: {categorias_egreso}'))
 
-        # 3. Crear movimientos de ejemplo (últimos 3 meses)
+        # 3. Crear movimientos de ejemplo (últimos meses)
         if not Movimiento.objects.filter(iglesia=iglesia_demo).exists():
             fecha_actual = datetime.now()
 
             # Obtener categorías
-            cat_diezmo = CategoriaIngreso.objects.get(iglesia=iglesia_demo, codigo='DIEZMO')
+            cat_diezmo, _ = CategoriaIngreso.objects.get_or_create(
+                iglesia=iglesia_demo, codigo='DIEZMO', defaults={'nombre': 'Diezmos'}
+            )
             cat_ofrenda = CategoriaIngreso.objects.get(iglesia=iglesia_demo, codigo='OFRENDA')
             cat_donacion = CategoriaIngreso.objects.get(iglesia=iglesia_demo, codigo='DONACION')
 
@@ -70,10 +81,10 @@ class Command(BaseCommand):
             cat_misiones = CategoriaEgreso.objects.get(iglesia=iglesia_demo, codigo='MISIONES')
             cat_mantenimiento = CategoriaEgreso.objects.get(iglesia=iglesia_demo, codigo='MANTENIMIENTO')
 
-            movimientos_creados = 0
+            movimientos = []
 
-            # Generar movimientos para los últimos 3 meses
-            for mes in range(3):
+            # Generar movimientos para los últimos meses
+            for mes in range(kwargs['meses']):
                 fecha_mes = fecha_actual - timedelta(days=30 * mes)
 
                 # Ingresos del mes
@@ -101,7 +112,7 @@ class Command(BaseCommand):
                 ]
 
                 for ingreso in ingresos_mes:
-                    Movimiento.objects.create(
+                    movimientos.append(Movimiento(
                         iglesia=iglesia_demo,
                         tipo='INGRESO',
                         fecha=fecha_mes - timedelta(days=random.randint(1, 25)),
@@ -110,8 +121,7 @@ class Command(BaseCommand):
                         monto=ingreso['monto'],
                         creado_por=admin,
                         aprobado_por=admin
-                    )
-                    movimientos_creados += 1
+                    ))
 
                 # Egresos del mes
                 egresos_mes = [
@@ -138,7 +148,7 @@ class Command(BaseCommand):
                 ]
 
                 for egreso in egresos_mes:
-                    Movimiento.objects.create(
+                    movimientos.append(Movimiento(
                         iglesia=iglesia_demo,
                         tipo='EGRESO',
                         fecha=fecha_mes - timedelta(days=random.randint(1, 25)),
@@ -148,10 +158,16 @@ class Command(BaseCommand):
                         comprobante_nro=f'FC-{random.randint(1000, 9999)}',
                         creado_por=admin,
                         aprobado_por=admin
-                    )
-                    movimientos_creados += 1
+                    ))
+
+            # Carga masiva: bulk_create no llama a save(), así que los números
+            # de comprobante se reservan en bloque, y el libro de saldos se
+            # reconstruye una sola vez al final
+            with carga_masiva(iglesia_demo):
+                asignar_comprobantes(movimientos)
+                Movimiento.objects.bulk_create(movimientos, batch_size=1000)
 
-            self.stdout.write(self.style.SUCCESS(f'✓ Movimientos de ejemplo creados: {movimientos_creados}'))
+            self.stdout.write(self.style.SUCCESS(f'✓ Movimientos de ejemplo creados: {len(movimientos)}'))
         else:
             self.stdout.write(self.style.WARNING('○ Ya existen movimientos en la base de datos'))
 
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from core.models import Iglesia
+from core.utils import verificar_saldos_mensuales, reconstruir_saldos_mensuales
+
+
+class Command(BaseCommand):
+    help = 'Verifica que los saldos mensuales incrementales coincidan con un recálculo completo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iglesia',
+            type=int,
+            help='ID de la iglesia a verificar (por defecto todas)'
+        )
+        parser.add_argument(
+            '--reparar',
+            action='store_true',
+            help='Reconstruye los saldos de las iglesias con diferencias'
+        )
+
+    def handle(self, *args, **options):
+        iglesias = Iglesia.objects.all()
+        if options['iglesia']:
+            iglesias = iglesias.filter(pk=options['iglesia'])
+
+        iglesias_con_diferencias = 0
+
+        for iglesia in iglesias:
+            diferencias = verificar_saldos_mensuales(iglesia)
+
+            if not diferencias:
+                self.stdout.write(self.style.SUCCESS(f'✓ {iglesia.nombre}: saldos consistentes'))
+                continue
+
+            iglesias_con_diferencias += 1
+            self.stdout.write(self.style.WARNING(f'○ {iglesia.nombre}: {len(diferencias)} diferencia(s)'))
+            for diferencia in diferencias:
+                self.stdout.write(
+                    f"    {diferencia['año_mes']} {diferencia['campo']}: "
+                    f"registrado={diferencia['registrado']} esperado={diferencia['esperado']}"
+                )
+
+            if options['reparar']:
+                corregidos = reconstruir_saldos_mensuales(iglesia)
+                self.stdout.write(self.style.SUCCESS(f'✓ {iglesia.nombre}: {corregidos} mes(es) reconstruidos'))
+
+        if iglesias_con_diferencias and not options['reparar']:
+            self.stdout.write(self.style.WARNING('\nEjecute con --reparar para reconstruir los saldos'))
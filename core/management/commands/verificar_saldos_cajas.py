@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from core.models import CajaChica
+
+
+class Command(BaseCommand):
+    help = 'Detecta cajas chicas cuyo saldo materializado no coincide con sus movimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iglesia',
+            type=int,
+            help='ID de la iglesia a verificar (por defecto todas)'
+        )
+        parser.add_argument(
+            '--reparar',
+            action='store_true',
+            help='Recalcula el saldo de las cajas con diferencias'
+        )
+
+    def handle(self, *args, **options):
+        cajas = CajaChica.objects.select_related('iglesia')
+        if options['iglesia']:
+            cajas = cajas.filter(iglesia_id=options['iglesia'])
+
+        desfasadas = list(cajas.con_saldo_desfasado())
+
+        if not desfasadas:
+            self.stdout.write(self.style.SUCCESS('✓ Todos los saldos de cajas chicas son consistentes'))
+            return
+
+        for caja in desfasadas:
+            self.stdout.write(self.style.WARNING(
+                f'○ {caja}: registrado={caja.saldo_actual} esperado={caja.saldo_calculado}'
+            ))
+            if options['reparar']:
+                saldo = caja.sincronizar_saldo()
+                self.stdout.write(self.style.SUCCESS(f'✓ {caja.nombre}: saldo reparado a {saldo}'))
+
+        if not options['reparar']:
+            self.stdout.write(self.style.WARNING('\nEjecute con --reparar para recalcular los saldos'))
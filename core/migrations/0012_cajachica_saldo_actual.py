@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2025-12-05 10:00
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def calcular_saldos_cajas(apps, schema_editor):
+    """Inicializa el saldo materializado de las cajas existentes"""
+    CajaChica = apps.get_model('core', 'CajaChica')
+    MovimientoCajaChica = apps.get_model('core', 'MovimientoCajaChica')
+
+    totales = {
+        item['caja_chica_id']: item
+        for item in MovimientoCajaChica.objects.filter(anulado=False).values('caja_chica_id').annotate(
+            ingresos=Sum('monto', filter=Q(tipo='INGRESO')),
+            egresos=Sum('monto', filter=Q(tipo='EGRESO'))
+        )
+    }
+
+    cajas = list(CajaChica.objects.all())
+    for caja in cajas:
+        item = totales.get(caja.id, {})
+        caja.saldo_actual = (
+            caja.saldo_inicial
+            + (item.get('ingresos') or Decimal('0.00'))
+            - (item.get('egresos') or Decimal('0.00'))
+        )
+    CajaChica.objects.bulk_update(cajas, ['saldo_actual'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_cajachica_moneda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cajachica',
+            name='saldo_actual',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Saldo actual de la caja (saldo inicial + ingresos - egresos)', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='cajachica',
+            name='saldo_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_saldos_cajas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.1 on 2025-12-08 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _ultimo_numero(comprobantes, prefijo):
+    ultimo = 0
+    inicio = f'{prefijo}-'
+    for comprobante in comprobantes:
+        if not comprobante or not comprobante.startswith(inicio):
+            continue
+        try:
+            ultimo = max(ultimo, int(comprobante[len(inicio):]))
+        except ValueError:
+            continue
+    return ultimo
+
+
+def inicializar_contadores(apps, schema_editor):
+    """Crea los contadores a partir de los comprobantes ya emitidos (comparando numéricamente)"""
+    ContadorComprobante = apps.get_model('core', 'ContadorComprobante')
+    Movimiento = apps.get_model('core', 'Movimiento')
+    MovimientoCajaChica = apps.get_model('core', 'MovimientoCajaChica')
+    CajaChica = apps.get_model('core', 'CajaChica')
+
+    contadores = []
+
+    grupos = Movimiento.objects.values_list('iglesia_id', 'tipo').distinct()
+    for iglesia_id, tipo in grupos:
+        prefijo = 'I' if tipo == 'INGRESO' else 'E'
+        comprobantes = Movimiento.objects.filter(
+            iglesia_id=iglesia_id, tipo=tipo, comprobante_nro__startswith=prefijo
+        ).values_list('comprobante_nro', flat=True)
+        contadores.append(ContadorComprobante(
+            iglesia_id=iglesia_id,
+            tipo=tipo,
+            ultimo_numero=_ultimo_numero(comprobantes.iterator(), prefijo)
+        ))
+
+    iglesia_por_caja = dict(CajaChica.objects.values_list('id', 'iglesia_id'))
+    grupos = MovimientoCajaChica.objects.values_list('caja_chica_id', 'tipo').distinct()
+    for caja_chica_id, tipo in grupos:
+        prefijo = 'CC-I' if tipo == 'INGRESO' else 'CC-E'
+        comprobantes = MovimientoCajaChica.objects.filter(
+            caja_chica_id=caja_chica_id, tipo=tipo, comprobante_nro__startswith=prefijo
+        ).values_list('comprobante_nro', flat=True)
+        contadores.append(ContadorComprobante(
+            iglesia_id=iglesia_por_caja[caja_chica_id],
+            caja_chica_id=caja_chica_id,
+            tipo=tipo,
+            ultimo_numero=_ultimo_numero(comprobantes.iterator(), prefijo)
+        ))
+
+    ContadorComprobante.objects.bulk_create(contadores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_cajachica_saldo_actual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorComprobante',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('INGRESO', 'Ingreso'), ('EGRESO', 'Egreso')], max_length=10)),
+                ('ultimo_numero', models.PositiveIntegerField(default=0)),
+                ('caja_chica', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='contadores_comprobante', to='core.cajachica')),
+                ('iglesia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_comprobante', to='core.iglesia')),
+            ],
+            options={
+                'verbose_name': 'Contador de Comprobantes',
+                'verbose_name_plural': 'Contadores de Comprobantes',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contadorcomprobante',
+            constraint=models.UniqueConstraint(condition=models.Q(('caja_chica__isnull', True)), fields=('iglesia', 'tipo'), name='contador_unico_iglesia_tipo'),
+        ),
+        migrations.AddConstraint(
+            model_name='contadorcomprobante',
+            constraint=models.UniqueConstraint(condition=models.Q(('caja_chica__isnull', False)), fields=('caja_chica', 'tipo'), name='contador_unico_caja_tipo'),
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2025-12-09 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_contadorcomprobante'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['iglesia', 'anulado', 'tipo', 'fecha'], name='mov_iglesia_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(condition=models.Q(('anulado', False)), fields=['iglesia', 'tipo', 'fecha'], name='mov_activos_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['iglesia', '-fecha', '-fecha_creacion'], name='mov_iglesia_listado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientocajachica',
+            index=models.Index(fields=['caja_chica', 'anulado', 'tipo', 'fecha'], name='movcc_caja_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientocajachica',
+            index=models.Index(condition=models.Q(('anulado', False)), fields=['caja_chica', 'tipo', 'fecha'], name='movcc_activos_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientocajachica',
+            index=models.Index(fields=['caja_chica', '-fecha', '-fecha_creacion'], name='movcc_caja_listado_idx'),
+        ),
+    ]
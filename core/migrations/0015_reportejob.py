@@ -0,0 +1,45 @@
+# Generated by Django 5.0.1 on 2025-12-12 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_indices_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('REPORTE_MENSUAL', 'Reporte Mensual PDF'), ('MOVIMIENTOS_COMPLETO', 'Reporte Completo de Movimientos PDF'), ('DASHBOARD', 'Dashboard PDF'), ('EXCEL', 'Movimientos Excel')], max_length=30)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('clave', models.CharField(help_text='Hash de iglesia, tipo y parámetros para deduplicar solicitudes', max_length=64)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En proceso'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20)),
+                ('archivo', models.FileField(blank=True, editable=False, upload_to='reportes/%Y/%m/')),
+                ('nombre_archivo', models.CharField(blank=True, max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('iglesia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reportes_jobs', to='core.iglesia')),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reportes_solicitados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reporte en Segundo Plano',
+                'verbose_name_plural': 'Reportes en Segundo Plano',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='reportejob_cola_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reportejob',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ['PENDIENTE', 'EN_PROCESO'])), fields=('clave',), name='reportejob_activo_unico'),
+        ),
+    ]
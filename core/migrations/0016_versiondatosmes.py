@@ -0,0 +1,60 @@
+# Generated by Django 5.0.1 on 2025-12-15 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def inicializar_versiones(apps, schema_editor):
+    """
+    Crea la versión de cada mes con datos (y la global de cada iglesia con
+    cajas chicas), para que las bajas posteriores siempre tengan qué incrementar
+    """
+    VersionDatosMes = apps.get_model('core', 'VersionDatosMes')
+    Movimiento = apps.get_model('core', 'Movimiento')
+    MovimientoCajaChica = apps.get_model('core', 'MovimientoCajaChica')
+    CajaChica = apps.get_model('core', 'CajaChica')
+
+    meses = set()
+    for iglesia_id, mes in Movimiento.objects.annotate(
+        mes=TruncMonth('fecha')
+    ).values_list('iglesia_id', 'mes').distinct():
+        meses.add((iglesia_id, mes.strftime('%Y-%m')))
+
+    for iglesia_id, mes in MovimientoCajaChica.objects.annotate(
+        mes=TruncMonth('fecha')
+    ).values_list('caja_chica__iglesia_id', 'mes').distinct():
+        meses.add((iglesia_id, mes.strftime('%Y-%m')))
+
+    for iglesia_id in CajaChica.objects.values_list('iglesia_id', flat=True).distinct():
+        meses.add((iglesia_id, '0000-00'))
+
+    VersionDatosMes.objects.bulk_create([
+        VersionDatosMes(iglesia_id=iglesia_id, año_mes=año_mes, version=1)
+        for iglesia_id, año_mes in sorted(meses)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_reportejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatosMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('año_mes', models.CharField(help_text='Formato: YYYY-MM', max_length=7)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('iglesia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versiones_datos', to='core.iglesia')),
+            ],
+            options={
+                'verbose_name': 'Versión de Datos Mensual',
+                'verbose_name_plural': 'Versiones de Datos Mensuales',
+                'unique_together': {('iglesia', 'año_mes')},
+            },
+        ),
+        migrations.RunPython(inicializar_versiones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.1 on 2025-12-22 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def inicializar_versiones_cajas(apps, schema_editor):
+    """
+    Crea la versión de cada caja chica en cada mes con movimientos y la
+    global de cada caja, para que las bajas posteriores siempre tengan qué
+    incrementar. Las versiones de la iglesia siguen valiendo lo mismo o más.
+    """
+    VersionDatosMes = apps.get_model('core', 'VersionDatosMes')
+    MovimientoCajaChica = apps.get_model('core', 'MovimientoCajaChica')
+    CajaChica = apps.get_model('core', 'CajaChica')
+
+    meses = set()
+    for iglesia_id, caja_chica_id, mes in MovimientoCajaChica.objects.annotate(
+        mes=TruncMonth('fecha')
+    ).values_list('caja_chica__iglesia_id', 'caja_chica_id', 'mes').distinct():
+        meses.add((iglesia_id, caja_chica_id, mes.strftime('%Y-%m')))
+
+    for iglesia_id, caja_chica_id in CajaChica.objects.values_list('iglesia_id', 'pk'):
+        meses.add((iglesia_id, caja_chica_id, '0000-00'))
+
+    VersionDatosMes.objects.bulk_create([
+        VersionDatosMes(iglesia_id=iglesia_id, caja_chica_id=caja_chica_id, año_mes=año_mes, version=1)
+        for iglesia_id, caja_chica_id, año_mes in sorted(meses)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_versiondatosmes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='versiondatosmes',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='versiondatosmes',
+            name='caja_chica',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.cajachica'),
+        ),
+        migrations.AddConstraint(
+            model_name='versiondatosmes',
+            constraint=models.UniqueConstraint(condition=models.Q(('caja_chica__isnull', True)), fields=('iglesia', 'año_mes'), name='version_unica_iglesia_mes'),
+        ),
+        migrations.AddConstraint(
+            model_name='versiondatosmes',
+            constraint=models.UniqueConstraint(condition=models.Q(('caja_chica__isnull', False)), fields=('caja_chica', 'año_mes'), name='version_unica_caja_mes'),
+        ),
+        migrations.RunPython(inicializar_versiones_cajas, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
+from django.utils.functional import cached_property
 from decimal import Decimal
 
 class Iglesia(models.Model):
@@ -83,10 +84,24 @@ class Usuario(AbstractUser):
     # MÉTODOS DE PERMISOS PARA CAJAS CHICAS
     # ============================================
 
+    @cached_property
+    def asignaciones_caja(self):
+        """
+        Asignaciones de cajas chicas del usuario: {caja_chica_id: UsuarioCajaChica}.
+        Se consultan una sola vez por instancia; como request.user se carga en
+        cada request, todos los permisos de caja de un request salen de esta foto.
+        """
+        asignaciones = self.cajas_asignadas.select_related('caja_chica').order_by('caja_chica__nombre')
+        return {asignacion.caja_chica_id: asignacion for asignacion in asignaciones}
+
+    def olvidar_permisos_caja(self):
+        """Descarta las asignaciones de caja memorizadas (luego de modificarlas)"""
+        self.__dict__.pop('asignaciones_caja', None)
+
     @property
     def tiene_acceso_cajas_chicas(self):
         """Verifica si el usuario tiene acceso a alguna caja chica"""
-        return self.cajas_asignadas.exists()
+        return bool(self.asignaciones_caja)
 
     @property
     def tiene_acceso_movimientos(self):
@@ -111,40 +126,38 @@ class Usuario(AbstractUser):
         # Verificar si tiene cajas y si su rol es el default sin permisos de iglesia
         # Los roles ADMIN, TESORERO, y PASTOR tienen acceso a la iglesia
         # COLABORADOR sin otros indicadores = solo acceso a caja
+        # (se evalúa el rol primero para no consultar las cajas si no hace falta)
         return (
-            self.tiene_acceso_cajas_chicas and
             self.rol == 'COLABORADOR' and
-            not self.is_staff  # Staff siempre tiene acceso completo
+            not self.is_staff and  # Staff siempre tiene acceso completo
+            self.tiene_acceso_cajas_chicas
         )
 
     def puede_gestionar_caja_chica(self, caja_chica):
         """Verifica si puede gestionar (crear/editar/eliminar) una caja chica específica"""
         # Solo ADMIN puede crear/eliminar cajas
-        if self.rol == 'ADMIN' and self.iglesia == caja_chica.iglesia:
+        if self.rol == 'ADMIN' and self.iglesia_id == caja_chica.iglesia_id:
             return True
         return False
 
     def puede_crear_movimiento_caja(self, caja_chica):
         """Verifica si puede crear movimientos en una caja específica"""
-        if self.rol == 'ADMIN' and self.iglesia == caja_chica.iglesia:
+        if self.rol == 'ADMIN' and self.iglesia_id == caja_chica.iglesia_id:
             return True
 
         # Verificar si es tesorero de esta caja específica
-        asignacion = self.cajas_asignadas.filter(
-            caja_chica=caja_chica,
-            rol_caja='TESORERO_CAJA'
-        ).first()
+        asignacion = self.asignaciones_caja.get(caja_chica.pk)
 
-        return asignacion is not None
+        return asignacion is not None and asignacion.rol_caja == 'TESORERO_CAJA'
 
     def puede_ver_caja(self, caja_chica):
         """Verifica si puede ver una caja específica"""
         # ADMIN puede ver todas las cajas de su iglesia
-        if self.rol == 'ADMIN' and self.iglesia == caja_chica.iglesia:
+        if self.rol == 'ADMIN' and self.iglesia_id == caja_chica.iglesia_id:
             return True
 
         # Verificar si está asignado a esta caja
-        return self.cajas_asignadas.filter(caja_chica=caja_chica).exists()
+        return caja_chica.pk in self.asignaciones_caja
 
 
 class CodigoInvitacion(models.Model):
@@ -388,6 +401,17 @@ class Movimiento(models.Model):
         verbose_name = 'Movimiento'
         verbose_name_plural = 'Movimientos'
         ordering = ['-fecha', '-fecha_creacion']
+        indexes = [
+            # Totales por iglesia/tipo/período (saldos, dashboard, reportes)
+            models.Index(fields=['iglesia', 'anulado', 'tipo', 'fecha'], name='mov_iglesia_tipo_fecha_idx'),
+            models.Index(
+                fields=['iglesia', 'tipo', 'fecha'],
+                condition=models.Q(anulado=False),
+                name='mov_activos_tipo_fecha_idx'
+            ),
+            # Listado de movimientos
+            models.Index(fields=['iglesia', '-fecha', '-fecha_creacion'], name='mov_iglesia_listado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.concepto[:50]} - ${self.monto}"
@@ -397,35 +421,23 @@ class Movimiento(models.Model):
         Genera el número de comprobante automáticamente.
         Formato: I-0001 para ingresos, E-0001 para egresos
         """
-        if not self.iglesia:
+        if not self.iglesia_id:
             return None
 
-        # Obtener el último movimiento del mismo tipo de esta iglesia
         prefijo = 'I' if self.tipo == 'INGRESO' else 'E'
-
-        ultimo_movimiento = Movimiento.objects.filter(
-            iglesia=self.iglesia,
-            tipo=self.tipo,
-            comprobante_nro__startswith=prefijo
-        ).order_by('-comprobante_nro').first()
-
-        if ultimo_movimiento and ultimo_movimiento.comprobante_nro:
-            # Extraer el número del último comprobante
-            try:
-                ultimo_numero = int(ultimo_movimiento.comprobante_nro.split('-')[1])
-                nuevo_numero = ultimo_numero + 1
-            except (IndexError, ValueError):
-                nuevo_numero = 1
-        else:
-            nuevo_numero = 1
+        nuevo_numero = ContadorComprobante.siguiente_numero(self.iglesia_id, self.tipo)
 
         return f"{prefijo}-{nuevo_numero:04d}"
 
     def save(self, *args, **kwargs):
-        # Generar número de comprobante si no existe
-        if not self.comprobante_nro and self.iglesia:
-            self.comprobante_nro = self.generar_numero_comprobante()
-        super().save(*args, **kwargs)
+        from django.db import transaction
+
+        # Generar número de comprobante si no existe. El contador queda
+        # bloqueado hasta que el movimiento se guarda en la misma transacción.
+        with transaction.atomic():
+            if not self.comprobante_nro and self.iglesia:
+                self.comprobante_nro = self.generar_numero_comprobante()
+            super().save(*args, **kwargs)
 
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -471,6 +483,42 @@ class SaldoMensual(models.Model):
 # MODELOS DE CAJAS CHICAS
 # ============================================
 
+class CajaChicaQuerySet(models.QuerySet):
+
+    def with_saldo(self):
+        """
+        Anota `saldo_calculado` en cada caja con una subconsulta agregada,
+        de modo que el saldo real de todas las cajas se obtiene en una sola consulta.
+        Se usa para verificar el saldo materializado (`saldo_actual`).
+        """
+        from django.db.models import Case, When, F, Sum, Value, OuterRef, Subquery, DecimalField
+        from django.db.models.functions import Coalesce
+
+        neto = MovimientoCajaChica.objects.filter(
+            caja_chica=OuterRef('pk'),
+            anulado=False
+        ).order_by().values('caja_chica').annotate(
+            neto=Sum(Case(
+                When(tipo='EGRESO', then=-F('monto')),
+                default=F('monto'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ))
+        ).values('neto')
+
+        return self.annotate(
+            saldo_calculado=F('saldo_inicial') + Coalesce(
+                Subquery(neto),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+
+    def con_saldo_desfasado(self):
+        """Cajas cuyo saldo materializado no coincide con sus movimientos"""
+        from django.db.models import F
+        return self.with_saldo().exclude(saldo_actual=F('saldo_calculado'))
+
+
 class CajaChica(models.Model):
     """
     Representa una caja chica dentro de una iglesia.
@@ -498,11 +546,26 @@ class CajaChica(models.Model):
         help_text="Moneda de la caja chica. No se puede cambiar una vez creada con movimientos."
     )
 
+    # Saldo materializado: se mantiene con expresiones F() desde los signals
+    # de MovimientoCajaChica, nunca desde el valor en memoria de la instancia
+    saldo_actual = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="Saldo actual de la caja (saldo inicial + ingresos - egresos)"
+    )
+    saldo_version = models.PositiveIntegerField(default=0, editable=False)
+
     # Control
     activa = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     creada_por = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='cajas_creadas')
 
+    objects = CajaChicaQuerySet.as_manager()
+
+    CAMPOS_SALDO = ('saldo_actual', 'saldo_version')
+
     class Meta:
         verbose_name = 'Caja Chica'
         verbose_name_plural = 'Cajas Chicas'
@@ -525,21 +588,63 @@ class CajaChica(models.Model):
         """Retorna el nombre completo de la moneda"""
         return dict(self.MONEDAS).get(self.moneda, 'Peso Argentino ($)')
 
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # Una caja nueva no tiene movimientos: su saldo es el inicial
+            self.saldo_actual = self.saldo_inicial
+        elif kwargs.get('update_fields') is None:
+            # No pisar el saldo materializado con un valor posiblemente desactualizado
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.CAMPOS_SALDO
+            ]
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def aplicar_delta_saldo(caja_id, delta):
+        """Suma `delta` al saldo materializado de una caja de forma atómica"""
+        from django.db.models import F
+
+        if not delta:
+            return
+        CajaChica.objects.filter(pk=caja_id).update(
+            saldo_actual=F('saldo_actual') + delta,
+            saldo_version=F('saldo_version') + 1
+        )
+
+    def sincronizar_saldo(self):
+        """
+        Recalcula el saldo materializado a partir de los movimientos y lo guarda.
+        Retorna el saldo recalculado.
+        """
+        from django.db import transaction
+        from django.db.models import F
+
+        with transaction.atomic():
+            caja = CajaChica.objects.select_for_update().get(pk=self.pk)
+            saldo = caja.calcular_saldo_actual()
+            CajaChica.objects.filter(pk=self.pk).update(
+                saldo_actual=saldo,
+                saldo_version=F('saldo_version') + 1
+            )
+
+        self.saldo_actual = saldo
+        return saldo
+
     def calcular_saldo_actual(self):
-        """Calcula el saldo actual de la caja"""
-        from django.db.models import Sum
+        """Calcula el saldo actual de la caja recorriendo sus movimientos"""
+        from django.db.models import Sum, Q
 
-        ingresos = MovimientoCajaChica.objects.filter(
+        totales = MovimientoCajaChica.objects.filter(
             caja_chica=self,
-            tipo='INGRESO',
             anulado=False
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
+        ).aggregate(
+            ingresos=Sum('monto', filter=Q(tipo='INGRESO')),
+            egresos=Sum('monto', filter=Q(tipo='EGRESO'))
+        )
 
-        egresos = MovimientoCajaChica.objects.filter(
-            caja_chica=self,
-            tipo='EGRESO',
-            anulado=False
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
+        ingresos = totales['ingresos'] or Decimal('0.00')
+        egresos = totales['egresos'] or Decimal('0.00')
 
         return self.saldo_inicial + ingresos - egresos
 
@@ -615,6 +720,15 @@ class MovimientoCajaChica(models.Model):
         verbose_name = 'Movimiento de Caja Chica'
         verbose_name_plural = 'Movimientos de Caja Chica'
         ordering = ['-fecha', '-fecha_creacion']
+        indexes = [
+            models.Index(fields=['caja_chica', 'anulado', 'tipo', 'fecha'], name='movcc_caja_tipo_fecha_idx'),
+            models.Index(
+                fields=['caja_chica', 'tipo', 'fecha'],
+                condition=models.Q(anulado=False),
+                name='movcc_activos_tipo_fecha_idx'
+            ),
+            models.Index(fields=['caja_chica', '-fecha', '-fecha_creacion'], name='movcc_caja_listado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.caja_chica.nombre} - {self.concepto[:50]} - ${self.monto}"
@@ -625,29 +739,21 @@ class MovimientoCajaChica(models.Model):
         Formato: CC-I-0001, CC-E-0001
         """
         prefijo = 'CC-I' if self.tipo == 'INGRESO' else 'CC-E'
-
-        ultimo = MovimientoCajaChica.objects.filter(
-            caja_chica=self.caja_chica,
-            tipo=self.tipo,
-            comprobante_nro__startswith=prefijo
-        ).order_by('-comprobante_nro').first()
-
-        if ultimo and ultimo.comprobante_nro:
-            try:
-                ultimo_numero = int(ultimo.comprobante_nro.split('-')[2])
-                nuevo_numero = ultimo_numero + 1
-            except (IndexError, ValueError):
-                nuevo_numero = 1
-        else:
-            nuevo_numero = 1
+        nuevo_numero = ContadorComprobante.siguiente_numero(
+            self.caja_chica.iglesia_id, self.tipo, caja_chica_id=self.caja_chica_id
+        )
 
         return f"{prefijo}-{nuevo_numero:04d}"
 
     def save(self, *args, **kwargs):
-        # Generar número de comprobante si no existe
-        if not self.comprobante_nro and self.caja_chica:
-            self.comprobante_nro = self.generar_numero_comprobante()
-        super().save(*args, **kwargs)
+        from django.db import transaction
+
+        # Generar número de comprobante si no existe. El contador queda
+        # bloqueado hasta que el movimiento se guarda en la misma transacción.
+        with transaction.atomic():
+            if not self.comprobante_nro and self.caja_chica:
+                self.comprobante_nro = self.generar_numero_comprobante()
+            super().save(*args, **kwargs)
 
 
 class UsuarioCajaChica(models.Model):
@@ -763,7 +869,7 @@ class TransferenciaCajaChica(models.Model):
             raise ValidationError('Las cajas deben pertenecer a la misma iglesia')
 
         # Validar saldo suficiente en caja origen
-        saldo_origen = self.caja_origen.calcular_saldo_actual()
+        saldo_origen = self.caja_origen.saldo_actual
         if saldo_origen < self.monto:
             raise ValidationError(
                 f'Saldo insuficiente en {self.caja_origen.nombre}. '
@@ -823,3 +929,258 @@ class TransferenciaCajaChica(models.Model):
             self.movimiento_ingreso.fecha_anulacion = timezone.now()
             self.movimiento_ingreso.motivo_anulacion = f'Anulación de transferencia: {motivo}'
             self.movimiento_ingreso.save()
+
+
+# ============================================
+# CONTADORES DE COMPROBANTES
+# ============================================
+
+def ultimo_numero_comprobante(comprobantes, prefijo):
+    """
+    Retorna el mayor número entre comprobantes con formato `{prefijo}-NNNN`.
+    Compara numéricamente (no como texto), por lo que funciona pasado el 9999.
+    """
+    ultimo = 0
+    inicio = f'{prefijo}-'
+    for comprobante in comprobantes:
+        if not comprobante or not comprobante.startswith(inicio):
+            continue
+        try:
+            ultimo = max(ultimo, int(comprobante[len(inicio):]))
+        except ValueError:
+            continue
+    return ultimo
+
+
+class ContadorComprobante(models.Model):
+    """
+    Último número de comprobante emitido por iglesia y tipo de movimiento,
+    o por caja chica y tipo. Se bloquea con select_for_update al asignar un
+    número, lo que evita duplicados entre workers concurrentes.
+    """
+    iglesia = models.ForeignKey(Iglesia, on_delete=models.CASCADE, related_name='contadores_comprobante')
+    caja_chica = models.ForeignKey(
+        CajaChica,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='contadores_comprobante'
+    )
+    tipo = models.CharField(max_length=10, choices=Movimiento.TIPOS)
+    ultimo_numero = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Contador de Comprobantes'
+        verbose_name_plural = 'Contadores de Comprobantes'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['iglesia', 'tipo'],
+                condition=models.Q(caja_chica__isnull=True),
+                name='contador_unico_iglesia_tipo'
+            ),
+            models.UniqueConstraint(
+                fields=['caja_chica', 'tipo'],
+                condition=models.Q(caja_chica__isnull=False),
+                name='contador_unico_caja_tipo'
+            ),
+        ]
+
+    def __str__(self):
+        ambito = self.caja_chica.nombre if self.caja_chica_id else self.iglesia.nombre
+        return f"{ambito} - {self.get_tipo_display()}: {self.ultimo_numero}"
+
+    @classmethod
+    def siguiente_numero(cls, iglesia_id, tipo, caja_chica_id=None):
+        """
+        Reserva y retorna el siguiente número de comprobante.
+        El contador queda bloqueado hasta el fin de la transacción que guarda
+        el movimiento, así que un rollback no deja huecos en la numeración.
+        """
+        return cls.reservar_numeros(iglesia_id, tipo, 1, caja_chica_id)
+
+    @classmethod
+    def reservar_numeros(cls, iglesia_id, tipo, cantidad, caja_chica_id=None):
+        """
+        Reserva `cantidad` números consecutivos con un único bloqueo del
+        contador (para cargas con bulk_create). Retorna el primero.
+        """
+        from django.db import transaction, IntegrityError
+
+        with transaction.atomic():
+            contador = cls.objects.select_for_update().filter(
+                iglesia_id=iglesia_id,
+                caja_chica_id=caja_chica_id,
+                tipo=tipo
+            ).first()
+
+            if contador is None:
+                try:
+                    with transaction.atomic():
+                        contador = cls.objects.create(
+                            iglesia_id=iglesia_id,
+                            caja_chica_id=caja_chica_id,
+                            tipo=tipo,
+                            ultimo_numero=cls._numero_inicial(iglesia_id, tipo, caja_chica_id)
+                        )
+                except IntegrityError:
+                    # Otro worker creó el contador al mismo tiempo
+                    contador = cls.objects.select_for_update().get(
+                        iglesia_id=iglesia_id,
+                        caja_chica_id=caja_chica_id,
+                        tipo=tipo
+                    )
+
+            contador.ultimo_numero += cantidad
+            contador.save(update_fields=['ultimo_numero'])
+
+        return contador.ultimo_numero - cantidad + 1
+
+    @staticmethod
+    def _numero_inicial(iglesia_id, tipo, caja_chica_id=None):
+        """Último número ya emitido antes de existir el contador (solo se usa una vez)"""
+        if caja_chica_id:
+            prefijo = 'CC-I' if tipo == 'INGRESO' else 'CC-E'
+            comprobantes = MovimientoCajaChica.objects.filter(
+                caja_chica_id=caja_chica_id,
+                tipo=tipo,
+                comprobante_nro__startswith=prefijo
+            ).values_list('comprobante_nro', flat=True)
+        else:
+            prefijo = 'I' if tipo == 'INGRESO' else 'E'
+            comprobantes = Movimiento.objects.filter(
+                iglesia_id=iglesia_id,
+                tipo=tipo,
+                comprobante_nro__startswith=prefijo
+            ).values_list('comprobante_nro', flat=True)
+
+        return ultimo_numero_comprobante(comprobantes.iterator(), prefijo)
+
+
+# ============================================
+# REPORTES EN SEGUNDO PLANO
+# ============================================
+
+class ReporteJob(models.Model):
+    """
+    Solicitud de generación de un reporte (PDF o Excel) que procesa un worker
+    fuera del request (ver core.reportes y el comando procesar_reportes).
+    Mientras un job está pendiente o en proceso, las solicitudes idénticas
+    (misma iglesia, tipo y parámetros) reutilizan el mismo job.
+    """
+    TIPOS = [
+        ('REPORTE_MENSUAL', 'Reporte Mensual PDF'),
+        ('MOVIMIENTOS_COMPLETO', 'Reporte Completo de Movimientos PDF'),
+        ('DASHBOARD', 'Dashboard PDF'),
+        ('EXCEL', 'Movimientos Excel'),
+    ]
+
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En proceso'),
+        ('COMPLETADO', 'Completado'),
+        ('ERROR', 'Error'),
+    ]
+
+    ESTADOS_ACTIVOS = ('PENDIENTE', 'EN_PROCESO')
+
+    iglesia = models.ForeignKey(Iglesia, on_delete=models.CASCADE, related_name='reportes_jobs')
+    solicitado_por = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reportes_solicitados'
+    )
+    tipo = models.CharField(max_length=30, choices=TIPOS)
+    parametros = models.JSONField(default=dict, blank=True)
+    clave = models.CharField(
+        max_length=64,
+        help_text='Hash de iglesia, tipo y parámetros para deduplicar solicitudes'
+    )
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE')
+
+    # Resultado
+    # El archivo se guarda en el storage por defecto (MEDIA_ROOT) y se sirve
+    # por streaming, sin cargarlo entero en memoria
+    archivo = models.FileField(upload_to='reportes/%Y/%m/', blank=True, editable=False)
+    nombre_archivo = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+
+    # Control
+    intentos = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Reporte en Segundo Plano'
+        verbose_name_plural = 'Reportes en Segundo Plano'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='reportejob_cola_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clave'],
+                condition=models.Q(estado__in=['PENDIENTE', 'EN_PROCESO']),
+                name='reportejob_activo_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.iglesia.nombre} ({self.get_estado_display()})"
+
+    @property
+    def terminado(self):
+        return self.estado in ('COMPLETADO', 'ERROR')
+
+
+# ============================================
+# CACHÉ DE REPORTES
+# ============================================
+
+class VersionDatosMes(models.Model):
+    """
+    Contador de cambios de los datos de una iglesia, o de una de sus cajas
+    chicas, en un mes. Lo incrementa el evento core.signals.datos_iglesia_cambiados
+    al guardar, anular o eliminar movimientos de ese mes, y forma parte de
+    las claves de caché de los reportes y de los cálculos cacheados (ver
+    core.reportes y core.cache.clave_datos), de modo que un cambio invalida
+    solo lo que depende de él.
+    """
+    # Cambios que afectan a todos los meses (categorías, datos de la caja)
+    AÑO_MES_GLOBAL = '0000-00'
+
+    iglesia = models.ForeignKey(Iglesia, on_delete=models.CASCADE, related_name='versiones_datos')
+    # Sin restricción en la base: al eliminar una caja sus contadores siguen
+    # sumando en la versión de la iglesia, que así nunca retrocede
+    caja_chica = models.ForeignKey(
+        CajaChica,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    año_mes = models.CharField(max_length=7, help_text="Formato: YYYY-MM")
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Versión de Datos Mensual'
+        verbose_name_plural = 'Versiones de Datos Mensuales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['iglesia', 'año_mes'],
+                condition=models.Q(caja_chica__isnull=True),
+                name='version_unica_iglesia_mes'
+            ),
+            models.UniqueConstraint(
+                fields=['caja_chica', 'año_mes'],
+                condition=models.Q(caja_chica__isnull=False),
+                name='version_unica_caja_mes'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.iglesia.nombre} - {self.año_mes} - v{self.version}"
@@ -0,0 +1,159 @@
+"""
+Perfilado de consultas SQL por request.
+
+PerfilConsultas registra, mientras está activo, cada consulta ejecutada en
+las conexiones a la base de datos: cantidad, tiempo total y consultas
+repetidas agrupadas por huella (el SQL sin parámetros). Una misma huella
+repetida muchas veces en un request es el síntoma típico de un N+1.
+
+PerfilConsultasMiddleware (opcional, se activa con PERFIL_CONSULTAS=True)
+lo aplica a cada request: agrega el header Server-Timing y registra una
+línea en el logger 'core.perfil'. AssertConsultasMixin lo expone en tests.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('core.perfil')
+
+# Repeticiones de una misma consulta a partir de las cuales se considera N+1
+UMBRAL_N_MAS_1 = 10
+
+_LISTA_IN = re.compile(r'\bIN \((?:%s, )*%s\)', re.IGNORECASE)
+_ESPACIOS = re.compile(r'\s+')
+
+
+def huella_consulta(sql):
+    """SQL normalizado para agrupar consultas iguales salvo por sus parámetros"""
+    sql = _LISTA_IN.sub('IN (...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+class PerfilConsultas:
+    """
+    Registra las consultas ejecutadas dentro del bloque `with`.
+
+        with PerfilConsultas() as perfil:
+            ...
+        perfil.total, perfil.tiempo_ms, perfil.repetidas, perfil.n_mas_1
+    """
+
+    def __init__(self, umbral_n_mas_1=None):
+        self.umbral_n_mas_1 = umbral_n_mas_1 or getattr(settings, 'PERFIL_CONSULTAS_UMBRAL', UMBRAL_N_MAS_1)
+        self.consultas = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for conexion in connections.all():
+            self._stack.enter_context(conexion.execute_wrapper(self._registrar))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+
+    def _registrar(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, (time.perf_counter() - inicio) * 1000))
+
+    @property
+    def total(self):
+        return len(self.consultas)
+
+    @property
+    def tiempo_ms(self):
+        return sum(duracion for _, duracion in self.consultas)
+
+    @property
+    def repetidas(self):
+        """{huella: cantidad} de las consultas ejecutadas más de una vez"""
+        conteo = Counter(huella_consulta(sql) for sql, _ in self.consultas)
+        return {huella: cantidad for huella, cantidad in conteo.most_common() if cantidad > 1}
+
+    @property
+    def n_mas_1(self):
+        """{huella: cantidad} de las consultas repetidas al menos umbral_n_mas_1 veces"""
+        return {
+            huella: cantidad for huella, cantidad in self.repetidas.items()
+            if cantidad >= self.umbral_n_mas_1
+        }
+
+    def resumen(self):
+        repetidas = self.repetidas
+        return {
+            'consultas': self.total,
+            'tiempo_db_ms': round(self.tiempo_ms, 2),
+            'repetidas': sum(repetidas.values()) - len(repetidas),
+            'n_mas_1': [
+                {'cantidad': cantidad, 'sql': huella[:300]}
+                for huella, cantidad in self.n_mas_1.items()
+            ],
+        }
+
+
+class PerfilConsultasMiddleware:
+    """
+    Perfila las consultas de cada request. Solo se activa con
+    PERFIL_CONSULTAS=True; en ese caso agrega el header Server-Timing
+    (tiempo de base de datos y total) y registra un resumen en 'core.perfil',
+    como advertencia si detecta un posible N+1.
+    En respuestas por streaming no cuenta las consultas hechas al iterar.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFIL_CONSULTAS', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        with PerfilConsultas() as perfil:
+            response = self.get_response(request)
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+
+        resumen = perfil.resumen()
+        timing = (
+            f'db;dur={resumen["tiempo_db_ms"]:.2f};desc="{resumen["consultas"]} consultas", '
+            f'total;dur={duracion_ms:.2f}'
+        )
+        if response.has_header('Server-Timing'):
+            timing = f'{response["Server-Timing"]}, {timing}'
+        response['Server-Timing'] = timing
+
+        datos = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'duracion_ms': round(duracion_ms, 2),
+            **resumen,
+        }
+        nivel = logging.WARNING if resumen['n_mas_1'] else logging.INFO
+        logger.log(nivel, json.dumps(datos, ensure_ascii=False), extra={'perfil': datos})
+
+        return response
+
+
+class AssertConsultasMixin:
+    """Aserciones sobre las consultas ejecutadas, para usar en TestCase"""
+
+    @contextmanager
+    def assertSinNMas1(self, umbral=None):
+        """Falla si alguna consulta se repite `umbral` veces o más dentro del bloque"""
+        with PerfilConsultas(umbral) as perfil:
+            yield perfil
+        if perfil.n_mas_1:
+            detalle = '\n'.join(
+                f'  {cantidad}x {huella}' for huella, cantidad in perfil.n_mas_1.items()
+            )
+            self.fail(f'Posible N+1 ({perfil.total} consultas en total):\n{detalle}')
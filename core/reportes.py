@@ -0,0 +1,335 @@
+"""
+Generación de reportes en segundo plano.
+
+Las vistas de reportes encolan un ReporteJob con encolar_reporte() y el
+worker (comando procesar_reportes) los toma de la base de datos con
+tomar_siguiente_job() y los ejecuta con procesar_job(). La cola vive en la
+misma base de datos, así que no requiere infraestructura adicional.
+
+Con REPORTES_MODO = 'local' (por defecto y en tests) el job se procesa en el
+mismo request al encolarlo, sin necesidad de worker. Un job que quedó en
+proceso más de REPORTES_TIMEOUT_MINUTOS (por ejemplo, si gunicorn mató al
+proceso a mitad de la generación) vuelve a pendiente y lo retoma el siguiente
+request que lo pida o consulte su estado.
+
+Los reportes mensuales y el dashboard se guardan en la caché 'reportes' con
+una clave que incluye la versión de los datos de la iglesia (VersionDatosMes):
+mientras no cambien los movimientos del período, las descargas repetidas
+sirven el archivo ya generado.
+"""
+import hashlib
+import json
+import logging
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.cache import clave_cache
+from core.models import ReporteJob
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_PDF = 'application/pdf'
+CONTENT_TYPE_EXCEL = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+# ============================================
+# GENERADORES POR TIPO DE REPORTE
+# Cada generador recibe (iglesia, parametros) y retorna
+# (archivo posicionado al inicio, nombre de archivo, content type)
+# ============================================
+
+def _generar_reporte_mensual(iglesia, parametros):
+    from core.utils import generar_reporte_pdf
+
+    año_mes = parametros['mes']
+    pdf_buffer = generar_reporte_pdf(iglesia, año_mes)
+    pdf_buffer.seek(0)
+    return pdf_buffer, f'reporte_{iglesia.nombre}_{año_mes}.pdf', CONTENT_TYPE_PDF
+
+
+def _generar_movimientos_completo(iglesia, parametros):
+    from core.utils import generar_reporte_movimientos_completo_pdf
+
+    fecha_desde = parametros.get('fecha_desde')
+    fecha_hasta = parametros.get('fecha_hasta')
+    fecha_desde = datetime.strptime(fecha_desde, '%Y-%m-%d').date() if fecha_desde else None
+    fecha_hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d').date() if fecha_hasta else None
+
+    pdf_buffer = generar_reporte_movimientos_completo_pdf(iglesia, fecha_desde, fecha_hasta)
+
+    filename = f"movimientos_{iglesia.nombre.replace(' ', '_')}"
+    if fecha_desde and fecha_hasta:
+        filename += f"_{fecha_desde.strftime('%Y%m%d')}-{fecha_hasta.strftime('%Y%m%d')}"
+    filename += ".pdf"
+    pdf_buffer.seek(0)
+    return pdf_buffer, filename, CONTENT_TYPE_PDF
+
+
+def _generar_dashboard(iglesia, parametros):
+    from core.utils import generar_dashboard_pdf
+
+    pdf_buffer = generar_dashboard_pdf(iglesia, parametros['mes'])
+    filename = f'dashboard_{iglesia.nombre}_{timezone.now().strftime("%Y%m%d")}.pdf'
+    pdf_buffer.seek(0)
+    return pdf_buffer, filename, CONTENT_TYPE_PDF
+
+
+def _generar_excel(iglesia, parametros):
+    from core.models import Movimiento
+    from core.utils import generar_excel_movimientos, rango_mes
+
+    queryset = Movimiento.objects.filter(iglesia=iglesia, anulado=False).order_by('-fecha')
+    if parametros.get('mes'):
+        queryset = queryset.filter(**rango_mes(parametros['mes']))
+
+    # Archivo temporal en disco: se copia al storage por bloques (ver procesar_job)
+    archivo = generar_excel_movimientos(queryset)
+    filename = f'movimientos_{iglesia.nombre}_{timezone.now().strftime("%Y%m%d")}.xlsx'
+    return archivo, filename, CONTENT_TYPE_EXCEL
+
+
+GENERADORES = {
+    'REPORTE_MENSUAL': _generar_reporte_mensual,
+    'MOVIMIENTOS_COMPLETO': _generar_movimientos_completo,
+    'DASHBOARD': _generar_dashboard,
+    'EXCEL': _generar_excel,
+}
+
+
+# ============================================
+# CACHÉ
+# ============================================
+
+def clave_cache_reporte(iglesia, tipo, parametros):
+    """
+    Clave de caché del archivo de un reporte: hash de iglesia, tipo, período
+    y versión de los datos de los que depende, dentro del espacio de nombres
+    de la iglesia (core.cache). Retorna None si el tipo de reporte no se cachea.
+    """
+    from core.utils import version_datos
+
+    if tipo == 'REPORTE_MENSUAL':
+        # Depende del mes y, por el saldo inicial, de todos los anteriores
+        periodo = parametros['mes']
+        version = version_datos(iglesia, hasta_año_mes=periodo)
+        opciones = []
+    elif tipo == 'DASHBOARD':
+        # Las gráficas de evolución llegan hasta el mes en curso
+        mes_en_curso = date.today().strftime('%Y-%m')
+        periodo = [parametros.get('mes') or mes_en_curso, mes_en_curso]
+        version = version_datos(iglesia)
+        opciones = [
+            settings.REPORTES_GRAFICAS_MOTOR,
+            settings.REPORTES_GRAFICAS_DPI,
+            settings.REPORTES_GRAFICAS_ESCALA,
+        ]
+    else:
+        return None
+
+    datos = json.dumps(
+        [iglesia.pk, iglesia.nombre, iglesia.direccion, tipo, periodo, version, opciones],
+        default=str
+    )
+    huella = hashlib.sha256(datos.encode('utf-8')).hexdigest()
+    return clave_cache(iglesia, 'reporte', huella, alias=settings.REPORTES_CACHE)
+
+
+def generar_reporte(iglesia, tipo, parametros):
+    """
+    Genera un reporte o lo toma de la caché si ya se generó con los mismos datos.
+    Retorna (archivo posicionado al inicio, nombre de archivo, content type).
+    Solo se cachean los reportes de tamaño acotado (PDF mensual y dashboard),
+    que se generan en memoria.
+    """
+    clave = clave_cache_reporte(iglesia, tipo, parametros)
+    cache = caches[settings.REPORTES_CACHE]
+
+    if clave:
+        resultado = cache.get(clave)
+        if resultado is not None:
+            contenido, nombre_archivo, content_type = resultado
+            return BytesIO(contenido), nombre_archivo, content_type
+
+    archivo, nombre_archivo, content_type = GENERADORES[tipo](iglesia, parametros)
+
+    if clave:
+        cache.set(clave, (archivo.getvalue(), nombre_archivo, content_type), settings.REPORTES_CACHE_TIMEOUT)
+    return archivo, nombre_archivo, content_type
+
+
+def reporte_en_cache(iglesia, tipo, parametros):
+    """Indica si el reporte ya está generado en la caché con los datos actuales"""
+    clave = clave_cache_reporte(iglesia, tipo, parametros)
+    return bool(clave) and caches[settings.REPORTES_CACHE].has_key(clave)
+
+
+# ============================================
+# COLA
+# ============================================
+
+def clave_reporte(iglesia_id, tipo, parametros):
+    """Hash estable de la solicitud, usado para deduplicar jobs en curso"""
+    datos = json.dumps([iglesia_id, tipo, parametros], sort_keys=True, default=str)
+    return hashlib.sha256(datos.encode('utf-8')).hexdigest()
+
+
+def encolar_reporte(usuario, tipo, parametros):
+    """
+    Crea un ReporteJob para la iglesia del usuario, o retorna el job en curso
+    si ya hay uno idéntico pendiente o en proceso.
+    En modo 'local', o si el reporte ya está en caché, el job pendiente se
+    procesa inmediatamente.
+    Retorna (job, creado).
+    """
+    if tipo not in GENERADORES:
+        raise ValueError(f'Tipo de reporte desconocido: {tipo}')
+
+    iglesia_id = usuario.iglesia_id
+    clave = clave_reporte(iglesia_id, tipo, parametros)
+
+    # Mantenimiento de la cola en el request: en modo local no hay worker que lo haga
+    liberar_jobs_colgados()
+    purgar_jobs_antiguos()
+    job = ReporteJob.objects.filter(clave=clave, estado__in=ReporteJob.ESTADOS_ACTIVOS).first()
+    creado = False
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = ReporteJob.objects.create(
+                    iglesia_id=iglesia_id,
+                    solicitado_por=usuario,
+                    tipo=tipo,
+                    parametros=parametros,
+                    clave=clave,
+                )
+            creado = True
+        except IntegrityError:
+            # Otro request creó el mismo job al mismo tiempo
+            job = ReporteJob.objects.get(clave=clave, estado__in=ReporteJob.ESTADOS_ACTIVOS)
+        else:
+            # Los jobs terminados del mismo reporte quedan reemplazados por el nuevo,
+            # así las descargas repetidas no acumulan filas ni archivos
+            ReporteJob.objects.filter(clave=clave, estado__in=['COMPLETADO', 'ERROR']).delete()
+
+    # Un job pendiente (nuevo o liberado por colgado) se procesa aquí mismo
+    # si no hay worker o si el archivo ya está en caché
+    if job.estado == 'PENDIENTE' and (
+        modo_local() or reporte_en_cache(usuario.iglesia, tipo, parametros)
+    ):
+        if marcar_en_proceso(job):
+            procesar_job(job)
+
+    return job, creado
+
+
+def modo_local():
+    return getattr(settings, 'REPORTES_MODO', 'local') == 'local'
+
+
+def retomar_job(job):
+    """
+    En modo local no hay worker: al consultar el estado de un job activo se
+    liberan los colgados y, si este quedó pendiente, se procesa en el request.
+    Retorna el job actualizado.
+    """
+    if not modo_local() or job.terminado:
+        return job
+
+    if liberar_jobs_colgados():
+        job.refresh_from_db()
+    if job.estado == 'PENDIENTE' and marcar_en_proceso(job):
+        procesar_job(job)
+    return job
+
+
+def marcar_en_proceso(job):
+    """
+    Reclama un job pendiente para procesarlo. Retorna False si otro worker
+    lo tomó primero (la actualización es condicional sobre el estado).
+    """
+    ahora = timezone.now()
+    actualizados = ReporteJob.objects.filter(pk=job.pk, estado='PENDIENTE').update(
+        estado='EN_PROCESO',
+        fecha_inicio=ahora,
+        intentos=job.intentos + 1
+    )
+    if actualizados:
+        job.estado = 'EN_PROCESO'
+        job.fecha_inicio = ahora
+        job.intentos += 1
+    return bool(actualizados)
+
+
+def tomar_siguiente_job():
+    """
+    Toma el job pendiente más antiguo y lo marca en proceso.
+    En PostgreSQL usa SELECT ... FOR UPDATE SKIP LOCKED para que varios
+    workers no compitan por el mismo job. Retorna None si la cola está vacía.
+    """
+    with transaction.atomic():
+        job = ReporteJob.objects.select_for_update(skip_locked=True).filter(
+            estado='PENDIENTE'
+        ).order_by('fecha_creacion').first()
+
+        if job is None or not marcar_en_proceso(job):
+            return None
+
+    return job
+
+
+def procesar_job(job):
+    """
+    Ejecuta el generador del job y guarda el archivo resultante en el
+    storage (copiándolo por bloques) o el error
+    """
+    try:
+        archivo, nombre_archivo, content_type = generar_reporte(job.iglesia, job.tipo, job.parametros)
+        with archivo:
+            job.archivo.save(nombre_archivo, File(archivo), save=False)
+    except Exception as e:
+        logger.exception('Error generando reporte %s (job %s)', job.tipo, job.pk)
+        job.estado = 'ERROR'
+        job.error = str(e)
+    else:
+        job.estado = 'COMPLETADO'
+        job.nombre_archivo = nombre_archivo
+        job.content_type = content_type
+        job.error = ''
+
+    job.fecha_fin = timezone.now()
+    job.save(update_fields=['estado', 'archivo', 'nombre_archivo', 'content_type', 'error', 'fecha_fin'])
+    return job
+
+
+def liberar_jobs_colgados(minutos=None):
+    """
+    Devuelve a la cola los jobs en proceso hace más de `minutos` (por defecto
+    REPORTES_TIMEOUT_MINUTOS), por ejemplo si murió el worker o el proceso web
+    que lo generaba. Retorna la cantidad liberada.
+    """
+    if minutos is None:
+        minutos = settings.REPORTES_TIMEOUT_MINUTOS
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return ReporteJob.objects.filter(estado='EN_PROCESO', fecha_inicio__lt=limite).update(estado='PENDIENTE')
+
+
+def purgar_jobs_antiguos(dias=None):
+    """
+    Elimina los jobs terminados hace más de `dias` días (por defecto
+    REPORTES_RETENCION_DIAS); sus archivos se borran por signal.
+    Retorna la cantidad eliminada.
+    """
+    if dias is None:
+        dias = settings.REPORTES_RETENCION_DIAS
+    limite = timezone.now() - timedelta(days=dias)
+    eliminados, _ = ReporteJob.objects.filter(
+        estado__in=['COMPLETADO', 'ERROR'],
+        fecha_fin__lt=limite
+    ).delete()
+    return eliminados
@@ -1,18 +1,64 @@
-from django.db.models.signals import post_save, pre_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.dispatch import Signal, receiver
+from core.cache import invalidar_iglesia
 from core.models import Movimiento, Iglesia, SaldoMensual
-from core.utils import calcular_saldo_mes
+from core.utils import aplicar_movimiento_a_saldos, registrar_cambio_datos, en_carga_masiva, invalidar_navegacion
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 
 
+@receiver(pre_save, sender=Movimiento)
+def capturar_estado_anterior_movimiento(sender, instance, **kwargs):
+    """
+    Guarda el estado previo del movimiento para calcular la diferencia
+    que hay que aplicar al libro de saldos mensuales
+    """
+    instance._estado_anterior = None
+    if instance.pk:
+        instance._estado_anterior = Movimiento.objects.filter(pk=instance.pk).values(
+            'fecha', 'tipo', 'monto', 'anulado'
+        ).first()
+
+
 @receiver(post_save, sender=Movimiento)
 def actualizar_saldo_mensual(sender, instance, created, **kwargs):
     """
-    Actualiza el saldo mensual cuando se crea o modifica un movimiento
+    Actualiza el saldo mensual cuando se crea, modifica o anula un movimiento.
+    Solo se aplica la diferencia al mes afectado y se arrastra a los meses posteriores.
+    """
+    anterior = getattr(instance, '_estado_anterior', None)
+    instance._estado_anterior = None
+    if en_carga_masiva(instance.iglesia_id):
+        # El libro se reconstruye una sola vez al terminar la carga
+        return
+
+    aplicar_movimiento_a_saldos(instance, anterior)
+    notificar_cambio_datos(instance.iglesia_id, fechas=(instance.fecha, anterior and anterior['fecha']), sender=sender)
+
+
+@receiver(post_delete, sender=Movimiento)
+def descontar_saldo_mensual(sender, instance, **kwargs):
+    """
+    Quita del libro de saldos el aporte de un movimiento eliminado
     """
-    año_mes = instance.fecha.strftime('%Y-%m')
-    calcular_saldo_mes(instance.iglesia, año_mes)
+    if en_carga_masiva(instance.iglesia_id):
+        return
+
+    estado = {
+        'fecha': instance.fecha,
+        'tipo': instance.tipo,
+        'monto': instance.monto,
+        'anulado': instance.anulado,
+    }
+    aplicar_movimiento_a_saldos(instance, estado, eliminado=True)
+    notificar_cambio_datos(instance.iglesia_id, fechas=(instance.fecha,), crear=False, sender=sender)
+
+
+@receiver(post_save, sender=Iglesia)
+def invalidar_cache_iglesia(sender, instance, created, **kwargs):
+    """Los datos de la iglesia (nombre, dirección) aparecen en lo cacheado de todas sus páginas y reportes"""
+    if not created:
+        invalidar_iglesia(instance)
 
 
 @receiver(post_save, sender=Iglesia)
@@ -31,11 +77,9 @@ def crear_categorias_default(sender, instance, created, **kwargs):
             {'codigo': 'OTRO_ING', 'nombre': 'Otros Ingresos'},
         ]
 
-        for cat in categorias_ingreso:
-            CategoriaIngreso.objects.create(
-                iglesia=instance,
-                **cat
-            )
+        CategoriaIngreso.objects.bulk_create([
+            CategoriaIngreso(iglesia=instance, **cat) for cat in categorias_ingreso
+        ])
 
         # Categorías de egreso por defecto
         categorias_egreso = [
@@ -51,11 +95,9 @@ def crear_categorias_default(sender, instance, created, **kwargs):
             {'codigo': 'OTRO_EGR', 'nombre': 'Otros Egresos'},
         ]
 
-        for cat in categorias_egreso:
-            CategoriaEgreso.objects.create(
-                iglesia=instance,
-                **cat
-            )
+        CategoriaEgreso.objects.bulk_create([
+            CategoriaEgreso(iglesia=instance, **cat) for cat in categorias_egreso
+        ])
 
 
 @receiver(pre_save, sender=Movimiento)
@@ -114,6 +156,143 @@ def validar_permisos_caja_chica(sender, instance, **kwargs):
         instance.fecha_aprobacion = timezone.now()
 
 
+def _aporte_caja(tipo, monto, anulado):
+    """Variación de saldo que aporta un movimiento de caja chica"""
+    if anulado or monto is None:
+        return 0
+    return monto if tipo == 'INGRESO' else -monto
+
+
+@receiver(pre_save, sender='core.MovimientoCajaChica')
+def capturar_estado_anterior_movimiento_caja(sender, instance, **kwargs):
+    """
+    Guarda el estado previo del movimiento para actualizar el saldo
+    materializado de la caja solo con la diferencia
+    """
+    instance._estado_anterior = None
+    if instance.pk:
+        instance._estado_anterior = sender.objects.filter(pk=instance.pk).values(
+            'caja_chica_id', 'caja_chica__iglesia_id', 'fecha', 'tipo', 'monto', 'anulado'
+        ).first()
+
+
+@receiver(post_save, sender='core.MovimientoCajaChica')
+def actualizar_saldo_caja(sender, instance, created, **kwargs):
+    """
+    Mantiene CajaChica.saldo_actual al crear, editar o anular un movimiento
+    (incluidos los generados por transferencias)
+    """
+    from core.models import CajaChica
+
+    anterior = getattr(instance, '_estado_anterior', None)
+    instance._estado_anterior = None
+    iglesia_id = instance.caja_chica.iglesia_id
+    if en_carga_masiva(iglesia_id):
+        # Los saldos de las cajas se recalculan una sola vez al terminar la carga
+        return
+
+    deltas = {}
+    if anterior:
+        deltas[anterior['caja_chica_id']] = -_aporte_caja(
+            anterior['tipo'], anterior['monto'], anterior['anulado']
+        )
+
+    deltas[instance.caja_chica_id] = deltas.get(instance.caja_chica_id, 0) + _aporte_caja(
+        instance.tipo, instance.monto, instance.anulado
+    )
+
+    for caja_id, delta in deltas.items():
+        CajaChica.aplicar_delta_saldo(caja_id, delta)
+
+    # Invalidar lo cacheado de los meses afectados, en la caja actual y la anterior
+    notificar_cambio_datos(iglesia_id, instance.caja_chica_id, fechas=(instance.fecha,), sender=sender)
+    if anterior and (anterior['caja_chica_id'] != instance.caja_chica_id or anterior['fecha'] != instance.fecha):
+        notificar_cambio_datos(
+            anterior['caja_chica__iglesia_id'], anterior['caja_chica_id'], fechas=(anterior['fecha'],), sender=sender
+        )
+
+
+@receiver(post_delete, sender='core.MovimientoCajaChica')
+def descontar_saldo_caja(sender, instance, **kwargs):
+    """Quita del saldo de la caja el aporte de un movimiento eliminado"""
+    from core.models import CajaChica
+
+    if en_carga_masiva(instance.caja_chica.iglesia_id):
+        return
+
+    CajaChica.aplicar_delta_saldo(
+        instance.caja_chica_id,
+        -_aporte_caja(instance.tipo, instance.monto, instance.anulado)
+    )
+    notificar_cambio_datos(
+        instance.caja_chica.iglesia_id, instance.caja_chica_id, fechas=(instance.fecha,), crear=False, sender=sender
+    )
+
+
+@receiver(post_save, sender='core.CajaChica')
+def invalidar_reportes_caja(sender, instance, **kwargs):
+    """Los datos de una caja (nombre, saldo inicial, estado) aparecen en los reportes de todos los meses"""
+    notificar_cambio_datos(instance.iglesia_id, instance.pk, sender=sender)
+
+
+@receiver(post_delete, sender='core.CajaChica')
+def invalidar_reportes_caja_eliminada(sender, instance, **kwargs):
+    notificar_cambio_datos(instance.iglesia_id, instance.pk, crear=False, sender=sender)
+
+
+@receiver(post_save, sender='core.UsuarioCajaChica')
+@receiver(post_delete, sender='core.UsuarioCajaChica')
+def invalidar_navegacion_asignacion(sender, instance, **kwargs):
+    """Asignar o quitar una caja cambia el menú lateral del usuario"""
+    invalidar_navegacion(instance.usuario_id)
+
+
+@receiver(post_save, sender='core.CajaChica')
+def invalidar_navegacion_caja(sender, instance, created, **kwargs):
+    """
+    El nombre de la caja aparece en el menú de sus usuarios. Los cambios de
+    saldo se guardan con update() y no pasan por aquí; al eliminar la caja,
+    el borrado en cascada de las asignaciones ya invalida el menú.
+    """
+    if not created:
+        invalidar_navegacion(*instance.usuarios_asignados.values_list('usuario_id', flat=True))
+
+
+@receiver(post_save, sender='core.CategoriaIngreso')
+@receiver(post_save, sender='core.CategoriaEgreso')
+def invalidar_reportes_categoria(sender, instance, **kwargs):
+    """
+    Las categorías aparecen en los reportes y listados de todos los meses, de
+    la iglesia y de sus cajas (la versión global de la iglesia cuenta en todas)
+    """
+    notificar_cambio_datos(instance.iglesia_id, sender=sender)
+
+
+@receiver(post_delete, sender='core.CategoriaIngreso')
+@receiver(post_delete, sender='core.CategoriaEgreso')
+def invalidar_reportes_categoria_eliminada(sender, instance, **kwargs):
+    notificar_cambio_datos(instance.iglesia_id, crear=False, sender=sender)
+
+
+@receiver(pre_save, sender='core.CajaChica')
+def capturar_saldo_inicial_caja(sender, instance, **kwargs):
+    """Guarda el saldo inicial previo para detectar si fue modificado"""
+    instance._saldo_inicial_anterior = None
+    if instance.pk and not instance._state.adding:
+        instance._saldo_inicial_anterior = sender.objects.filter(pk=instance.pk).values_list(
+            'saldo_inicial', flat=True
+        ).first()
+
+
+@receiver(post_save, sender='core.CajaChica')
+def ajustar_saldo_por_saldo_inicial(sender, instance, created, **kwargs):
+    """Si se edita el saldo inicial, trasladar la diferencia al saldo materializado"""
+    anterior = getattr(instance, '_saldo_inicial_anterior', None)
+    if not created and anterior is not None and anterior != instance.saldo_inicial:
+        sender.aplicar_delta_saldo(instance.pk, instance.saldo_inicial - anterior)
+    instance._saldo_inicial_anterior = None
+
+
 @receiver(post_save, sender='core.TransferenciaCajaChica')
 def crear_movimientos_transferencia(sender, instance, created, **kwargs):
     """
@@ -124,3 +303,44 @@ def crear_movimientos_transferencia(sender, instance, created, **kwargs):
 
     if created and not instance.movimiento_egreso and not instance.movimiento_ingreso:
         instance.crear_movimientos()
+
+
+@receiver(post_delete, sender='core.ReporteJob')
+def borrar_archivo_reporte(sender, instance, **kwargs):
+    """Al eliminar un job (purga o borrado en cascada) se borra su archivo del storage"""
+    if instance.archivo:
+        instance.archivo.delete(save=False)
+
+
+# ============================================
+# EVENTO "CAMBIARON LOS DATOS DE LA IGLESIA"
+# ============================================
+
+# Se envía con iglesia_id, caja_chica_id si el cambio es de una caja chica,
+# fechas (los meses afectados; vacío = todos) y crear (False en bajas).
+# Lo disparan los signals de arriba al guardar, anular o eliminar movimientos,
+# movimientos de caja, categorías y cajas; las transferencias lo hacen a través
+# de los dos movimientos que generan y anulan. Es el único camino por el que se
+# invalida lo cacheado a partir de los datos: lo registra en VersionDatosMes,
+# que leen las claves de los reportes y core.cache.clave_datos.
+datos_iglesia_cambiados = Signal()
+
+
+def notificar_cambio_datos(iglesia_id, caja_chica_id=None, fechas=(), crear=True, sender=None):
+    if en_carga_masiva(iglesia_id):
+        # Se notifica una sola vez al terminar la carga (sincronizar_datos_derivados)
+        return
+    datos_iglesia_cambiados.send(
+        sender=sender, iglesia_id=iglesia_id, caja_chica_id=caja_chica_id,
+        fechas=tuple(fechas), crear=crear
+    )
+
+
+@receiver(datos_iglesia_cambiados)
+def registrar_version_datos(sender, iglesia_id, caja_chica_id=None, fechas=(), crear=True, **kwargs):
+    """
+    Incrementa las versiones de datos de los meses afectados. Es un UPDATE
+    dentro de la misma transacción que el cambio: otros procesos siguen
+    leyendo la versión anterior, con los datos anteriores, hasta el commit.
+    """
+    registrar_cambio_datos(iglesia_id, *fechas, caja=caja_chica_id, crear=crear)
@@ -1,3 +1,1225 @@
+import os
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
 from django.test import TestCase
 
-# Create your tests here.
+from core.models import (
+    Iglesia, Usuario, CategoriaIngreso, CategoriaEgreso, Movimiento, SaldoMensual,
+    CajaChica, MovimientoCajaChica, TransferenciaCajaChica, ContadorComprobante, ReporteJob
+)
+from core.perfil import AssertConsultasMixin
+from core.utils import verificar_saldos_mensuales, reconstruir_saldos_mensuales
+
+
+class DatosBaseMixin:
+    """Crea una iglesia con un usuario ADMIN y sus categorías por defecto"""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+
+        # Los archivos de reportes van a un directorio temporal
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media_root)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.iglesia = Iglesia.objects.create(nombre='Iglesia Test')
+        self.usuario = Usuario.objects.create_user(
+            username='tesorero',
+            password='clave-segura-123',
+            iglesia=self.iglesia,
+            rol='ADMIN',
+            puede_aprobar=True
+        )
+        self.cat_ingreso = CategoriaIngreso.objects.filter(iglesia=self.iglesia).first()
+        self.cat_egreso = CategoriaEgreso.objects.filter(iglesia=self.iglesia).first()
+
+    def crear_caja(self, nombre='Caja Jóvenes', saldo_inicial='0'):
+        return CajaChica.objects.create(
+            iglesia=self.iglesia,
+            nombre=nombre,
+            saldo_inicial=Decimal(saldo_inicial),
+            creada_por=self.usuario
+        )
+
+    def crear_movimiento_caja(self, caja, tipo, fecha, monto):
+        return MovimientoCajaChica.objects.create(
+            caja_chica=caja,
+            tipo=tipo,
+            fecha=fecha,
+            concepto=f'{tipo} {fecha}',
+            monto=Decimal(monto),
+            creado_por=self.usuario
+        )
+
+    def crear_movimiento(self, tipo, fecha, monto):
+        return Movimiento.objects.create(
+            iglesia=self.iglesia,
+            tipo=tipo,
+            fecha=fecha,
+            categoria_ingreso=self.cat_ingreso if tipo == 'INGRESO' else None,
+            categoria_egreso=self.cat_egreso if tipo == 'EGRESO' else None,
+            concepto=f'{tipo} {fecha}',
+            monto=Decimal(monto),
+            creado_por=self.usuario
+        )
+
+
+class SaldoMensualIncrementalTest(DatosBaseMixin, TestCase):
+
+    def test_altas_ediciones_y_anulaciones_coinciden_con_recalculo(self):
+        self.crear_movimiento('INGRESO', date(2024, 1, 10), '1000')
+        self.crear_movimiento('EGRESO', date(2024, 3, 5), '200')
+        movimiento = self.crear_movimiento('INGRESO', date(2024, 2, 15), '500')
+
+        # Edición de monto y cambio de mes
+        movimiento.monto = Decimal('750')
+        movimiento.fecha = date(2024, 4, 1)
+        movimiento.save()
+
+        # Alta en un mes anterior a todos los registrados
+        self.crear_movimiento('EGRESO', date(2023, 12, 20), '100')
+
+        # Anulación
+        egreso = Movimiento.objects.get(tipo='EGRESO', fecha=date(2024, 3, 5))
+        egreso.anulado = True
+        egreso.save()
+
+        self.assertEqual(verificar_saldos_mensuales(self.iglesia), [])
+
+        abril = SaldoMensual.objects.get(iglesia=self.iglesia, año_mes='2024-04')
+        self.assertEqual(abril.saldo_inicial, Decimal('900'))
+        self.assertEqual(abril.saldo_final, Decimal('1650'))
+
+    def test_baja_de_movimiento_actualiza_meses_posteriores(self):
+        self.crear_movimiento('INGRESO', date(2024, 5, 1), '300')
+        movimiento = self.crear_movimiento('INGRESO', date(2024, 4, 1), '100')
+        movimiento.delete()
+
+        self.assertEqual(verificar_saldos_mensuales(self.iglesia), [])
+
+    def test_reconstruir_corrige_diferencias(self):
+        self.crear_movimiento('INGRESO', date(2024, 1, 10), '1000')
+        self.crear_movimiento('EGRESO', date(2024, 2, 10), '400')
+        SaldoMensual.objects.filter(iglesia=self.iglesia, año_mes='2024-02').update(saldo_final=0)
+
+        self.assertNotEqual(verificar_saldos_mensuales(self.iglesia), [])
+        self.assertEqual(reconstruir_saldos_mensuales(self.iglesia), 1)
+        self.assertEqual(verificar_saldos_mensuales(self.iglesia), [])
+
+
+class DashboardDataTest(DatosBaseMixin, TestCase):
+
+    def test_serie_mensual_de_solo_lectura(self):
+        from dateutil.relativedelta import relativedelta
+        from core.utils import get_dashboard_data
+
+        hoy = date.today().replace(day=1)
+        hace_tres_meses = hoy - relativedelta(months=3)
+        self.crear_movimiento('INGRESO', hoy - relativedelta(years=3), '1000')
+        self.crear_movimiento('INGRESO', hace_tres_meses, '500')
+        self.crear_movimiento('EGRESO', hace_tres_meses, '200')
+        self.crear_movimiento('EGRESO', hoy, '50')
+        SaldoMensual.objects.all().delete()
+
+        with self.assertNumQueries(3):
+            data = get_dashboard_data(self.iglesia)
+
+        self.assertFalse(SaldoMensual.objects.exists())
+        self.assertEqual(len(data['meses_labels']), 12)
+        self.assertEqual(data['saldos_data'][0], 1000.0)
+        self.assertEqual(data['ingresos_data'][-3], 500.0)
+        self.assertEqual(data['egresos_data'][-3], 200.0)
+        self.assertEqual(data['saldos_data'][-1], 1300.0)
+
+
+class DashboardCajaDataApiTest(DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.caja = self.crear_caja(saldo_inicial='100')
+        self.client.force_login(self.usuario)
+
+    def test_año_calendario_con_saldo_de_apertura(self):
+        from django.urls import reverse
+
+        self.crear_movimiento_caja(self.caja, 'INGRESO', date(2023, 6, 1), '50')
+        self.crear_movimiento_caja(self.caja, 'INGRESO', date(2024, 2, 10), '300')
+        self.crear_movimiento_caja(self.caja, 'EGRESO', date(2024, 2, 20), '120')
+
+        url = reverse('dashboard_caja_data_api', args=[self.caja.pk])
+        data = self.client.get(url, {'año': 2024}).json()
+
+        self.assertEqual(len(data['meses_labels']), 12)
+        self.assertEqual(data['ingresos_data'][1], 300.0)
+        self.assertEqual(data['egresos_data'][1], 120.0)
+        self.assertEqual(data['saldos_data'][0], 150.0)
+        self.assertEqual(data['saldos_data'][-1], 330.0)
+        self.assertEqual(data['meses_superavit'], 1)
+
+    def test_ventana_movil_y_parametros_invalidos(self):
+        from django.urls import reverse
+
+        url = reverse('dashboard_caja_data_api', args=[self.caja.pk])
+        data = self.client.get(url, {'meses': 24}).json()
+        self.assertEqual(len(data['saldos_data']), 24)
+
+        self.assertEqual(self.client.get(url, {'meses': 'x'}).status_code, 400)
+
+
+class CajaChicaConSaldoTest(DatosBaseMixin, TestCase):
+
+    def test_with_saldo_coincide_con_calculo_individual(self):
+        caja_a = self.crear_caja('Caja A', saldo_inicial='100')
+        caja_b = self.crear_caja('Caja B', saldo_inicial='0')
+        self.crear_caja('Caja C', saldo_inicial='25')
+        self.crear_movimiento_caja(caja_a, 'INGRESO', date(2024, 1, 1), '40')
+        self.crear_movimiento_caja(caja_a, 'EGRESO', date(2024, 1, 2), '15')
+        anulado = self.crear_movimiento_caja(caja_b, 'INGRESO', date(2024, 1, 3), '500')
+        anulado.anulado = True
+        anulado.save()
+        self.crear_movimiento_caja(caja_b, 'EGRESO', date(2024, 1, 4), '10')
+
+        with self.assertNumQueries(1):
+            saldos = {c.nombre: c.saldo_calculado for c in CajaChica.objects.with_saldo()}
+
+        for caja in CajaChica.objects.all():
+            self.assertEqual(saldos[caja.nombre], caja.calcular_saldo_actual())
+        self.assertEqual(saldos, {
+            'Caja A': Decimal('125'),
+            'Caja B': Decimal('-10'),
+            'Caja C': Decimal('25'),
+        })
+
+
+class SaldoMaterializadoCajaTest(DatosBaseMixin, TestCase):
+
+    def test_saldo_actual_se_mantiene_con_cada_operacion(self):
+        origen = self.crear_caja('Origen', saldo_inicial='1000')
+        destino = self.crear_caja('Destino', saldo_inicial='0')
+
+        ingreso = self.crear_movimiento_caja(origen, 'INGRESO', date(2024, 1, 1), '200')
+        egreso = self.crear_movimiento_caja(origen, 'EGRESO', date(2024, 1, 2), '50')
+
+        # Edición y anulación
+        ingreso.monto = Decimal('300')
+        ingreso.save()
+        egreso.anulado = True
+        egreso.save()
+
+        # Transferencia entre cajas (genera un egreso y un ingreso)
+        TransferenciaCajaChica.objects.create(
+            caja_origen=origen,
+            caja_destino=destino,
+            monto=Decimal('400'),
+            concepto='Apoyo',
+            fecha=date(2024, 1, 3),
+            realizada_por=self.usuario
+        )
+
+        # Una instancia desactualizada no debe pisar el saldo al guardarse
+        origen.activa = False
+        origen.save()
+
+        # Cambio de saldo inicial
+        destino.refresh_from_db()
+        destino.saldo_inicial = Decimal('10')
+        destino.save()
+
+        self.crear_movimiento_caja(destino, 'EGRESO', date(2024, 1, 4), '5').delete()
+
+        origen.refresh_from_db()
+        destino.refresh_from_db()
+        self.assertEqual(origen.saldo_actual, Decimal('900'))
+        self.assertEqual(destino.saldo_actual, Decimal('410'))
+        self.assertFalse(CajaChica.objects.con_saldo_desfasado().exists())
+
+    def test_sincronizar_saldo_repara_desfase(self):
+        caja = self.crear_caja(saldo_inicial='100')
+        self.crear_movimiento_caja(caja, 'INGRESO', date(2024, 1, 1), '20')
+        CajaChica.objects.filter(pk=caja.pk).update(saldo_actual=0)
+
+        self.assertTrue(CajaChica.objects.con_saldo_desfasado().exists())
+        self.assertEqual(caja.sincronizar_saldo(), Decimal('120'))
+        self.assertFalse(CajaChica.objects.con_saldo_desfasado().exists())
+
+
+class ContadorComprobanteTest(DatosBaseMixin, TestCase):
+
+    def test_numeracion_continua_pasado_9999(self):
+        movimiento = self.crear_movimiento('INGRESO', date(2024, 1, 1), '10')
+        Movimiento.objects.filter(pk=movimiento.pk).update(comprobante_nro='I-9999')
+        ContadorComprobante.objects.all().delete()
+
+        # Sin contador se inicializa desde los comprobantes existentes
+        self.assertEqual(self.crear_movimiento('INGRESO', date(2024, 1, 2), '10').comprobante_nro, 'I-10000')
+        self.assertEqual(self.crear_movimiento('INGRESO', date(2024, 1, 3), '10').comprobante_nro, 'I-10001')
+        self.assertEqual(self.crear_movimiento('EGRESO', date(2024, 1, 3), '10').comprobante_nro, 'E-0001')
+
+    def test_secuencias_independientes_por_iglesia_y_caja(self):
+        otra = Iglesia.objects.create(nombre='Otra Iglesia')
+        tesorero_otra = Usuario.objects.create_user(
+            username='tesorero-otra', password='clave-segura-123', iglesia=otra, rol='ADMIN'
+        )
+        caja_a = self.crear_caja('Caja A')
+        caja_b = self.crear_caja('Caja B')
+
+        self.crear_movimiento('INGRESO', date(2024, 1, 1), '10')
+        otro = Movimiento.objects.create(
+            iglesia=otra, tipo='INGRESO', fecha=date(2024, 1, 1),
+            categoria_ingreso=CategoriaIngreso.objects.filter(iglesia=otra).first(),
+            concepto='Ofrenda', monto=Decimal('5'), creado_por=tesorero_otra
+        )
+        self.crear_movimiento_caja(caja_a, 'INGRESO', date(2024, 1, 1), '10')
+        mov_a = self.crear_movimiento_caja(caja_a, 'INGRESO', date(2024, 1, 2), '10')
+        mov_b = self.crear_movimiento_caja(caja_b, 'INGRESO', date(2024, 1, 1), '10')
+
+        self.assertEqual(otro.comprobante_nro, 'I-0001')
+        self.assertEqual(mov_a.comprobante_nro, 'CC-I-0002')
+        self.assertEqual(mov_b.comprobante_nro, 'CC-I-0001')
+
+
+class IndicesMovimientosTest(DatosBaseMixin, TestCase):
+    """Verifica en el plan de ejecución que las consultas frecuentes usan los índices compuestos"""
+
+    def plan(self, queryset):
+        from django.db import connection
+
+        if connection.vendor == 'postgresql':
+            # Con tablas chicas PostgreSQL prefiere un seq scan; se desactiva para ver el índice elegible
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_totales_por_tipo_y_periodo_usan_indice(self):
+        from django.db.models import Sum
+
+        self.crear_movimiento('INGRESO', date(2024, 1, 10), '100')
+        queryset = Movimiento.objects.filter(
+            iglesia=self.iglesia, anulado=False, tipo='INGRESO',
+            fecha__gte=date(2024, 1, 1), fecha__lt=date(2024, 2, 1)
+        ).values('tipo').annotate(total=Sum('monto'))
+
+        self.assertRegex(self.plan(queryset), r'mov_(iglesia|activos)_tipo_fecha_idx')
+
+    def test_totales_de_caja_usan_indice(self):
+        from django.db.models import Sum
+
+        caja = self.crear_caja()
+        self.crear_movimiento_caja(caja, 'EGRESO', date(2024, 1, 10), '10')
+        queryset = MovimientoCajaChica.objects.filter(
+            caja_chica=caja, anulado=False, tipo='EGRESO', fecha__gte=date(2024, 1, 1)
+        ).values('tipo').annotate(total=Sum('monto'))
+
+        self.assertRegex(self.plan(queryset), r'movcc_(caja|activos)_tipo_fecha_idx')
+
+    def test_listado_ordenado_usa_indice(self):
+        queryset = Movimiento.objects.filter(iglesia=self.iglesia)[:25]
+
+        self.assertIn('mov_iglesia_listado_idx', self.plan(queryset))
+
+    def test_filtro_mensual_por_rango_usa_indice(self):
+        from core.utils import rango_mes
+
+        queryset = Movimiento.objects.filter(iglesia=self.iglesia, anulado=False, **rango_mes('2024-02'))
+
+        self.assertNotIn('EXTRACT', str(queryset.query).upper())
+        self.assertNotIn('django_date_extract', str(queryset.query))
+        self.assertRegex(self.plan(queryset), r'mov_\w+_idx')
+
+
+class RangoMesTest(DatosBaseMixin, TestCase):
+
+    def test_rango_incluye_el_mes_completo(self):
+        from core.utils import rango_mes
+
+        self.assertEqual(rango_mes('2024-12'), {'fecha__gte': date(2024, 12, 1), 'fecha__lt': date(2025, 1, 1)})
+        with self.assertRaises(ValueError):
+            rango_mes('2024-13')
+
+        for dia in (date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 29), date(2024, 3, 1)):
+            self.crear_movimiento('INGRESO', dia, '10')
+        self.assertEqual(Movimiento.objects.filter(**rango_mes('2024-02')).count(), 2)
+
+
+class ExportarExcelTest(DatosBaseMixin, TestCase):
+
+    def test_exportacion_por_streaming(self):
+        from io import BytesIO
+        import openpyxl
+        from django.urls import reverse
+
+        self.crear_movimiento('INGRESO', date(2024, 2, 1), '1500')
+        self.crear_movimiento('EGRESO', date(2024, 2, 10), '200')
+        self.crear_movimiento('EGRESO', date(2024, 3, 1), '50')
+        self.client.force_login(self.usuario)
+
+        response = self.client.get(reverse('exportar_excel'), {'mes': '2024-02'}, follow=True)
+
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        hoja = openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        filas = list(hoja.iter_rows(min_row=2, values_only=True))
+        self.assertEqual([fila[4] for fila in filas], [-200.0, 1500.0])
+        self.assertEqual(filas[1][2], self.cat_ingreso.nombre)
+
+
+class ExportacionMasivaTest(DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.usuario)
+
+    def test_csv_de_movimientos_con_filtros(self):
+        import csv
+        from django.urls import reverse
+
+        self.crear_movimiento('INGRESO', date(2024, 2, 1), '1500.50')
+        self.crear_movimiento('EGRESO', date(2024, 2, 10), '200')
+        self.crear_movimiento('INGRESO', date(2024, 3, 1), '50')
+
+        response = self.client.get(
+            reverse('exportar_movimientos', args=['csv']), {'mes': '2024-02', 'tipo': 'INGRESO'}
+        )
+
+        self.assertTrue(response.streaming)
+        filas = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len(filas), 1)
+        self.assertEqual(filas[0]['monto'], '1500.50')
+        self.assertEqual(filas[0]['categoria'], self.cat_ingreso.nombre)
+        self.assertEqual(filas[0]['fecha'], '2024-02-01')
+
+    def test_ndjson_de_caja_chica(self):
+        import json
+        from django.urls import reverse
+
+        caja = self.crear_caja()
+        self.crear_movimiento_caja(caja, 'INGRESO', date(2024, 1, 1), '10')
+        self.crear_movimiento_caja(caja, 'EGRESO', date(2024, 1, 2), '4')
+
+        response = self.client.get(reverse('exportar_movimientos_caja', args=[caja.pk, 'ndjson']))
+
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        filas = [json.loads(linea) for linea in lineas]
+        self.assertEqual([fila['tipo'] for fila in filas], ['INGRESO', 'EGRESO'])
+        self.assertEqual(filas[1]['comprobante_nro'], 'CC-E-0001')
+
+        formato_invalido = reverse('exportar_movimientos_caja', args=[caja.pk, 'xml'])
+        self.assertEqual(self.client.get(formato_invalido).status_code, 404)
+
+    def test_filtros_invalidos_no_exportan_todo(self):
+        from django.urls import reverse
+
+        self.crear_movimiento('INGRESO', date(2024, 2, 1), '100')
+        caja = self.crear_caja()
+
+        for url in (
+            reverse('exportar_movimientos', args=['csv']),
+            reverse('exportar_movimientos_caja', args=[caja.pk, 'csv']),
+        ):
+            for filtros in ({'mes': '2024-13'}, {'categoria': 'ingreso_999999'}):
+                response = self.client.get(url, filtros)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(filtros)), response.json()['errores'])
+
+
+class DashboardPdfTest(DatosBaseMixin, TestCase):
+
+    def generar_pdf_contando_consultas(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.utils import generar_dashboard_pdf
+
+        with CaptureQueriesContext(connection) as consultas:
+            pdf = generar_dashboard_pdf(self.iglesia, '2024-03')
+        self.assertTrue(pdf.getvalue().startswith(b'%PDF'))
+        return len(consultas)
+
+    def test_cantidad_de_consultas_no_depende_de_las_cajas(self):
+        self.crear_movimiento('INGRESO', date(2024, 3, 1), '1000')
+        caja = self.crear_caja('Caja 1', saldo_inicial='100')
+        self.crear_movimiento_caja(caja, 'INGRESO', date(2024, 1, 5), '50')
+        consultas_una_caja = self.generar_pdf_contando_consultas()
+
+        for numero in range(2, 6):
+            otra = self.crear_caja(f'Caja {numero}')
+            self.crear_movimiento_caja(otra, 'INGRESO', date(2024, 2, 1), '20')
+            self.crear_movimiento_caja(otra, 'EGRESO', date(2024, 3, 1), '5')
+
+        # Totales de la iglesia, cajas, resumen de cajas y las 3 del get_dashboard_data
+        self.assertEqual(consultas_una_caja, 6)
+        self.assertEqual(self.generar_pdf_contando_consultas(), consultas_una_caja)
+
+    def test_graficas_se_renderizan_en_memoria(self):
+        from unittest import mock
+        from core.utils import generar_dashboard_pdf
+
+        self.crear_movimiento('INGRESO', date(2024, 3, 1), '1000')
+        self.crear_movimiento('EGRESO', date(2024, 3, 2), '300')
+        self.crear_caja(saldo_inicial='50')
+
+        with mock.patch('tempfile.NamedTemporaryFile', side_effect=AssertionError('sin archivos')), \
+                mock.patch('os.unlink', side_effect=AssertionError('sin archivos')):
+            pdf_baja = generar_dashboard_pdf(self.iglesia, '2024-03', dpi=50).getvalue()
+            pdf_alta = generar_dashboard_pdf(self.iglesia, '2024-03', dpi=150).getvalue()
+
+        self.assertTrue(pdf_baja.startswith(b'%PDF'))
+        self.assertLess(len(pdf_baja), len(pdf_alta))
+
+    def test_motor_vectorial_no_usa_matplotlib(self):
+        import sys
+        from unittest import mock
+        from core.utils import generar_dashboard_pdf
+
+        self.crear_movimiento('INGRESO', date(2024, 3, 1), '1000')
+        self.crear_movimiento('EGRESO', date(2024, 3, 2), '300')
+        caja = self.crear_caja(saldo_inicial='50')
+        self.crear_movimiento_caja(caja, 'EGRESO', date(2024, 2, 1), '10')
+
+        with mock.patch.dict(sys.modules, {'matplotlib': None, 'matplotlib.pyplot': None}):
+            pdf = generar_dashboard_pdf(self.iglesia, '2024-03', motor_graficas='reportlab').getvalue()
+
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        with self.assertRaises(ValueError):
+            generar_dashboard_pdf(self.iglesia, '2024-03', motor_graficas='svg')
+
+    def test_graficas_reportlab_con_escala_y_etiqueta_y(self):
+        from reportlab.graphics.shapes import String
+        from core.graficas import GraficasReportlab
+
+        def textos(nodo):
+            for hijo in getattr(nodo, 'contents', []):
+                if isinstance(hijo, String):
+                    yield hijo.text
+                yield from textos(hijo)
+
+        dibujo = GraficasReportlab(escala=2.0).barras_balance(
+            ['Ene', 'Feb'], [100, -50], 'Balance', 'Monto ($)', width=300, height=200
+        )
+
+        # Se dibuja al doble de tamaño y se reduce a lo pedido en la página
+        self.assertEqual((dibujo.width, dibujo.height), (300, 200))
+        self.assertEqual(dibujo.transform[:2], (0.5, 0))
+        self.assertIn('Monto ($)', list(textos(dibujo)))
+
+    def test_resumen_de_cajas_coincide_con_calculo_por_caja(self):
+        from core.utils import resumen_mensual_cajas
+
+        caja = self.crear_caja(saldo_inicial='100')
+        self.crear_movimiento_caja(caja, 'INGRESO', date(2023, 12, 1), '40')
+        self.crear_movimiento_caja(caja, 'INGRESO', date(2024, 1, 10), '300')
+        self.crear_movimiento_caja(caja, 'EGRESO', date(2024, 3, 20), '100')
+        self.crear_movimiento_caja(caja, 'EGRESO', date(2024, 5, 2), '60')
+
+        meses, resumen = resumen_mensual_cajas([caja], '2024-03', hoy=date(2024, 6, 15))
+        datos = resumen[caja.pk]
+
+        self.assertEqual(datos['saldo'], Decimal('340'))
+        # Promedio de enero, marzo y mayo de 2024
+        self.assertEqual(datos['promedio_ingresos'], Decimal('100'))
+        self.assertEqual(datos['promedio_egresos'], Decimal('160') / 3)
+        self.assertEqual(meses[0], date(2023, 6, 1))
+        self.assertEqual(meses[-1], date(2024, 5, 1))
+        self.assertEqual(datos['evolucion'][0], Decimal('100'))
+        self.assertEqual(datos['evolucion'][-1], Decimal('280'))
+
+
+class ReporteJobTest(DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        from django.core.cache import caches
+
+        super().setUp()
+        caches['reportes'].clear()
+        self.crear_movimiento('INGRESO', date(2024, 2, 1), '1500')
+        self.client.force_login(self.usuario)
+
+    def test_modo_local_genera_dentro_del_request(self):
+        from django.urls import reverse
+
+        response = self.client.get(reverse('generar_reporte_pdf'), {'mes': '2024-02'}, follow=True)
+
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        job = ReporteJob.objects.get()
+        self.assertEqual(job.estado, 'COMPLETADO')
+
+        # El archivo vive en el storage y se borra junto con el job
+        ruta = job.archivo.path
+        job.delete()
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_cola_deduplica_y_worker_procesa(self):
+        from django.core.management import call_command
+        from django.test import override_settings
+        from django.urls import reverse
+
+        with override_settings(REPORTES_MODO='cola'):
+            primera = self.client.get(reverse('exportar_dashboard_pdf'), {'mes': '2024-02'})
+            segunda = self.client.get(reverse('exportar_dashboard_pdf'), {'mes': '2024-02'})
+            otra = self.client.get(reverse('exportar_dashboard_pdf'), {'mes': '2024-03'})
+
+        job = ReporteJob.objects.get(parametros={'mes': '2024-02'})
+        self.assertRedirects(primera, reverse('reporte_job_estado', args=[job.pk]), fetch_redirect_response=False)
+        self.assertEqual(segunda.url, primera.url)
+        self.assertNotEqual(otra.url, primera.url)
+        self.assertEqual(ReporteJob.objects.count(), 2)
+
+        estado_url = reverse('reporte_job_estado_api', args=[job.pk])
+        with override_settings(REPORTES_MODO='cola'):
+            self.assertEqual(self.client.get(estado_url).json()['estado'], 'PENDIENTE')
+
+        call_command('procesar_reportes', una_vez=True, stdout=StringIO())
+
+        estado = self.client.get(estado_url).json()
+        self.assertEqual(estado['estado'], 'COMPLETADO')
+        descarga = self.client.get(estado['url_descarga'])
+        self.assertTrue(b''.join(descarga.streaming_content).startswith(b'%PDF'))
+
+    def test_jobs_de_otra_iglesia_no_son_accesibles(self):
+        from django.urls import reverse
+        from core.reportes import encolar_reporte
+
+        otra = Iglesia.objects.create(nombre='Otra Iglesia')
+        ajeno = Usuario.objects.create_user(username='ajeno', password='clave-segura-123', iglesia=otra, rol='ADMIN')
+        job, _ = encolar_reporte(ajeno, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+
+        self.assertEqual(self.client.get(reverse('descargar_reporte_job', args=[job.pk])).status_code, 404)
+
+    def test_jobs_requieren_permiso_de_reportes(self):
+        from django.urls import reverse
+        from core.reportes import encolar_reporte
+
+        job, _ = encolar_reporte(self.usuario, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+        colaborador = Usuario.objects.create_user(
+            username='colaborador', password='clave-segura-123', iglesia=self.iglesia
+        )
+        self.client.force_login(colaborador)
+
+        for nombre in ('reporte_job_estado', 'reporte_job_estado_api', 'descargar_reporte_job'):
+            self.assertEqual(self.client.get(reverse(nombre, args=[job.pk])).status_code, 404)
+
+    def test_colaborador_descarga_el_dashboard_pdf(self):
+        from django.test import override_settings
+        from django.urls import reverse
+        from core.reportes import encolar_reporte
+
+        colaborador = Usuario.objects.create_user(
+            username='colaborador', password='clave-segura-123', iglesia=self.iglesia
+        )
+        self.client.force_login(colaborador)
+
+        response = self.client.get(reverse('exportar_dashboard_pdf'), {'mes': '2024-02'}, follow=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(ReporteJob.objects.get().solicitado_por, colaborador)
+
+        # Un job en cola pedido por el tesorero se comparte con el colaborador
+        with override_settings(REPORTES_MODO='cola'):
+            job, _ = encolar_reporte(self.usuario, 'DASHBOARD', {'mes': '2024-01'})
+            response = self.client.get(reverse('exportar_dashboard_pdf'), {'mes': '2024-01'})
+            self.assertRedirects(response, reverse('reporte_job_estado', args=[job.pk]), fetch_redirect_response=False)
+            estado = self.client.get(reverse('reporte_job_estado_api', args=[job.pk]))
+        self.assertEqual(estado.json()['estado'], 'PENDIENTE')
+
+    def test_modo_local_no_acumula_jobs_ni_archivos(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from core.reportes import encolar_reporte
+
+        anterior, _ = encolar_reporte(self.usuario, 'REPORTE_MENSUAL', {'mes': '2024-01'})
+        ReporteJob.objects.filter(pk=anterior.pk).update(fecha_fin=timezone.now() - timedelta(days=30))
+        ruta_anterior = anterior.archivo.path
+
+        for _ in range(3):
+            job, _ = encolar_reporte(self.usuario, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+            self.assertEqual(job.estado, 'COMPLETADO')
+
+        # Un job por reporte pedido; los vencidos se purgan con su archivo
+        self.assertEqual(list(ReporteJob.objects.values_list('pk', flat=True)), [job.pk])
+        self.assertFalse(os.path.exists(ruta_anterior))
+        self.assertEqual(len(os.listdir(os.path.dirname(job.archivo.path))), 1)
+
+    def test_modo_local_retoma_jobs_colgados(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from core.reportes import clave_reporte, encolar_reporte
+
+        # Proceso web muerto a mitad de la generación
+        colgado = ReporteJob.objects.create(
+            iglesia=self.iglesia, solicitado_por=self.usuario, tipo='REPORTE_MENSUAL',
+            parametros={'mes': '2024-02'}, estado='EN_PROCESO',
+            clave=clave_reporte(self.iglesia.pk, 'REPORTE_MENSUAL', {'mes': '2024-02'}),
+            fecha_inicio=timezone.now() - timedelta(hours=1),
+        )
+
+        job, creado = encolar_reporte(self.usuario, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+
+        self.assertFalse(creado)
+        self.assertEqual(job.pk, colgado.pk)
+        self.assertEqual(job.estado, 'COMPLETADO')
+
+    def test_modo_local_procesa_job_pendiente_al_consultar_estado(self):
+        from django.test import override_settings
+        from django.urls import reverse
+
+        # Encolado mientras el sitio usaba la cola, sin worker que lo tome
+        with override_settings(REPORTES_MODO='cola'):
+            self.client.get(reverse('exportar_dashboard_pdf'), {'mes': '2024-02'})
+        job = ReporteJob.objects.get()
+        self.assertEqual(job.estado, 'PENDIENTE')
+
+        estado = self.client.get(reverse('reporte_job_estado_api', args=[job.pk])).json()
+
+        self.assertEqual(estado['estado'], 'COMPLETADO')
+
+
+class ReporteCacheTest(DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        from django.core.cache import caches
+
+        super().setUp()
+        caches['reportes'].clear()
+        self.movimiento = self.crear_movimiento('INGRESO', date(2024, 2, 10), '1500')
+
+    def test_descarga_repetida_usa_la_cache(self):
+        from unittest import mock
+        from core import reportes
+
+        with mock.patch.dict(reportes.GENERADORES, {
+            'REPORTE_MENSUAL': mock.Mock(wraps=reportes.GENERADORES['REPORTE_MENSUAL'])
+        }):
+            primero = reportes.generar_reporte(self.iglesia, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+            segundo = reportes.generar_reporte(self.iglesia, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+            generador = reportes.GENERADORES['REPORTE_MENSUAL']
+
+        self.assertEqual(generador.call_count, 1)
+        self.assertEqual(primero[0].read(), segundo[0].read())
+        self.assertEqual(primero[1:], segundo[1:])
+        self.assertTrue(reportes.reporte_en_cache(self.iglesia, 'REPORTE_MENSUAL', {'mes': '2024-02'}))
+
+    def test_cambios_invalidan_solo_los_meses_afectados(self):
+        from core.reportes import clave_cache_reporte
+
+        def claves():
+            return {
+                mes: clave_cache_reporte(self.iglesia, 'REPORTE_MENSUAL', {'mes': mes})
+                for mes in ('2024-01', '2024-02', '2024-03')
+            }
+
+        iniciales = claves()
+
+        # Anular un movimiento de febrero cambia febrero y los meses siguientes
+        self.movimiento.anulado = True
+        self.movimiento.save()
+        tras_anular = claves()
+        self.assertEqual(tras_anular['2024-01'], iniciales['2024-01'])
+        self.assertNotEqual(tras_anular['2024-02'], iniciales['2024-02'])
+        self.assertNotEqual(tras_anular['2024-03'], iniciales['2024-03'])
+
+        # Los movimientos de caja chica también cuentan
+        caja = self.crear_caja()
+        tras_caja = claves()
+        self.crear_movimiento_caja(caja, 'INGRESO', date(2024, 3, 5), '100')
+        self.assertEqual(claves()['2024-02'], tras_caja['2024-02'])
+        self.assertNotEqual(claves()['2024-03'], tras_caja['2024-03'])
+
+    def test_cola_sirve_reportes_cacheados_sin_worker(self):
+        from django.test import override_settings
+        from core.reportes import encolar_reporte, generar_reporte
+
+        generar_reporte(self.iglesia, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+
+        with override_settings(REPORTES_MODO='cola'):
+            cacheado, _ = encolar_reporte(self.usuario, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+            nuevo, _ = encolar_reporte(self.usuario, 'REPORTE_MENSUAL', {'mes': '2024-03'})
+
+        self.assertEqual(cacheado.estado, 'COMPLETADO')
+        self.assertEqual(nuevo.estado, 'PENDIENTE')
+
+
+class ReporteMovimientosCompletoTest(DatosBaseMixin, TestCase):
+
+    def test_una_tabla_por_pagina_con_saldo_transportado(self):
+        import re
+        from unittest import mock
+        from core import utils
+
+        for dia in range(1, 8):
+            self.crear_movimiento('INGRESO', date(2024, 1, dia), '100')
+
+        tablas = []
+        tabla_extracto = utils._tabla_extracto
+
+        def registrar_tabla(filas, saldo_anterior=None, saldo_a_transportar=None, etiqueta_saldo_anterior=None):
+            tablas.append((len(filas), saldo_anterior, saldo_a_transportar))
+            return tabla_extracto(filas, saldo_anterior, saldo_a_transportar, etiqueta_saldo_anterior)
+
+        with mock.patch.object(utils, '_tabla_extracto', registrar_tabla), self.assertNumQueries(1):
+            pdf = utils.generar_reporte_movimientos_completo_pdf(self.iglesia, filas_por_pagina=3).getvalue()
+
+        self.assertEqual(tablas, [
+            (3, None, Decimal('300')),
+            (3, Decimal('300'), Decimal('600')),
+            (1, Decimal('600'), None),
+        ])
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', pdf)), 3)
+
+    def test_saldo_inicial_del_periodo_sin_recorrer_el_historial(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.utils import generar_reporte_movimientos_completo_pdf, saldo_al
+
+        def consultas_extracto():
+            with CaptureQueriesContext(connection) as consultas:
+                generar_reporte_movimientos_completo_pdf(
+                    self.iglesia, fecha_desde=date(2024, 3, 10), fecha_hasta=date(2024, 3, 31)
+                )
+            return len(consultas)
+
+        consultas_iglesia_nueva = consultas_extracto()
+
+        # Historial de varios años, incluido el mismo mes antes del período
+        for año in range(2014, 2024):
+            self.crear_movimiento('INGRESO', date(año, 6, 1), '1000')
+            self.crear_movimiento('EGRESO', date(año, 7, 1), '300')
+        self.crear_movimiento('INGRESO', date(2024, 3, 5), '50')
+        anulado = self.crear_movimiento('INGRESO', date(2024, 3, 6), '999')
+        anulado.anulado = True
+        anulado.save()
+        self.crear_movimiento('EGRESO', date(2024, 3, 10), '20')
+
+        self.assertEqual(saldo_al(self.iglesia, date(2024, 3, 10)), Decimal('7050'))
+        self.assertEqual(saldo_al(self.iglesia, date(2024, 3, 11)), Decimal('7030'))
+        self.assertEqual(saldo_al(self.iglesia, date(2014, 6, 1)), Decimal('0'))
+        self.assertEqual(consultas_extracto(), consultas_iglesia_nueva)
+
+
+class PerfilConsultasTest(AssertConsultasMixin, DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for dia in range(1, 13):
+            self.crear_movimiento('INGRESO', date(2024, 1, dia), '100')
+
+    def test_detecta_n_mas_1(self):
+        with self.assertRaisesRegex(AssertionError, r'Posible N\+1'):
+            with self.assertSinNMas1():
+                [mov.categoria_ingreso.nombre for mov in Movimiento.objects.all()]
+
+        with self.assertSinNMas1() as perfil:
+            [mov.categoria_ingreso.nombre for mov in Movimiento.objects.select_related('categoria_ingreso')]
+        self.assertEqual(perfil.total, 1)
+
+    def test_middleware_agrega_server_timing_y_log(self):
+        from django.test import override_settings
+        from django.urls import reverse
+
+        self.client.force_login(self.usuario)
+        with override_settings(PERFIL_CONSULTAS=True), self.assertLogs('core.perfil', 'INFO') as logs:
+            response = self.client.get(reverse('dashboard_data_api'))
+
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ consultas", total;dur=[\d.]+')
+        self.assertIn('"ruta": "/api/dashboard-data/"', logs.output[0])
+
+        # Desactivado por defecto (cada cliente nuevo vuelve a cargar los middlewares)
+        cliente = self.client_class()
+        cliente.force_login(self.usuario)
+        self.assertFalse(cliente.get(reverse('dashboard_data_api')).has_header('Server-Timing'))
+
+
+class DatosSinteticosTest(TestCase):
+
+    def test_genera_datos_consistentes_con_bulk_create(self):
+        from django.core.management import call_command
+
+        call_command(
+            'generar_datos_sinteticos', iglesias=1, años=1, movimientos_mes=10, cajas=3,
+            movimientos_caja_mes=5, transferencias_mes=2, anulados=20, stdout=StringIO()
+        )
+
+        iglesia = Iglesia.objects.get(nombre='Iglesia Sintética 1')
+        self.assertGreaterEqual(Movimiento.objects.filter(iglesia=iglesia).count(), 120)
+        self.assertTrue(Movimiento.objects.filter(iglesia=iglesia, anulado=True).exists())
+        self.assertEqual(verificar_saldos_mensuales(iglesia), [])
+        self.assertFalse(CajaChica.objects.filter(iglesia=iglesia).con_saldo_desfasado().exists())
+        self.assertFalse(TransferenciaCajaChica.objects.filter(movimiento_egreso__isnull=True).exists())
+
+
+class CargaMasivaTest(DatosBaseMixin, TestCase):
+
+    def test_suspende_signals_y_reconstruye_al_final(self):
+        from core.utils import carga_masiva
+
+        self.crear_movimiento('INGRESO', date(2024, 1, 5), '1000')
+
+        with carga_masiva(self.iglesia):
+            for mes in range(2, 7):
+                self.crear_movimiento('EGRESO', date(2024, mes, 5), '100')
+            # Durante la carga el libro de saldos no se toca
+            self.assertFalse(SaldoMensual.objects.filter(iglesia=self.iglesia, año_mes='2024-06').exists())
+
+        self.assertEqual(verificar_saldos_mensuales(self.iglesia), [])
+        self.assertEqual(
+            SaldoMensual.objects.get(iglesia=self.iglesia, año_mes='2024-06').saldo_final,
+            Decimal('500')
+        )
+
+    def test_bulk_create_con_comprobantes_reservados(self):
+        from core.utils import carga_masiva, asignar_comprobantes
+
+        self.crear_movimiento('INGRESO', date(2024, 1, 5), '1000')
+        movimientos = [
+            Movimiento(
+                iglesia=self.iglesia, tipo='INGRESO', fecha=date(2024, 2, dia),
+                categoria_ingreso=self.cat_ingreso, concepto='Importado',
+                monto=Decimal('10'), creado_por=self.usuario
+            )
+            for dia in (3, 1, 2)
+        ]
+
+        with carga_masiva(self.iglesia):
+            asignar_comprobantes(movimientos)
+            Movimiento.objects.bulk_create(movimientos)
+
+        self.assertEqual(
+            list(Movimiento.objects.filter(concepto='Importado').order_by('fecha').values_list('comprobante_nro', flat=True)),
+            ['I-0002', 'I-0003', 'I-0004']
+        )
+        self.assertEqual(self.crear_movimiento('INGRESO', date(2024, 3, 1), '5').comprobante_nro, 'I-0005')
+        self.assertEqual(verificar_saldos_mensuales(self.iglesia), [])
+
+
+class PermisosCajaTest(DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        from core.models import UsuarioCajaChica
+
+        self.caja = self.crear_caja()
+        self.otra_caja = self.crear_caja('Caja Damas')
+        self.colaborador = Usuario.objects.create_user(
+            username='colaborador', password='clave-segura-123', iglesia=self.iglesia
+        )
+        UsuarioCajaChica.objects.create(
+            usuario=self.colaborador, caja_chica=self.caja,
+            rol_caja='TESORERO_CAJA', asignado_por=self.usuario
+        )
+
+    def test_permisos_de_caja_con_una_sola_consulta(self):
+        colaborador = Usuario.objects.get(pk=self.colaborador.pk)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(colaborador.tiene_acceso_cajas_chicas)
+            self.assertTrue(colaborador.es_usuario_solo_caja)
+            self.assertFalse(colaborador.tiene_acceso_movimientos)
+            self.assertTrue(colaborador.puede_ver_caja(self.caja))
+            self.assertTrue(colaborador.puede_crear_movimiento_caja(self.caja))
+            self.assertFalse(colaborador.puede_ver_caja(self.otra_caja))
+            self.assertFalse(colaborador.puede_crear_movimiento_caja(self.otra_caja))
+
+    def test_admin_no_consulta_asignaciones(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(self.usuario.puede_ver_caja(self.otra_caja))
+            self.assertTrue(self.usuario.puede_crear_movimiento_caja(self.otra_caja))
+            self.assertTrue(self.usuario.tiene_acceso_movimientos)
+
+    def test_olvidar_permisos_caja(self):
+        from core.models import UsuarioCajaChica
+
+        self.assertFalse(self.colaborador.puede_ver_caja(self.otra_caja))
+        UsuarioCajaChica.objects.create(
+            usuario=self.colaborador, caja_chica=self.otra_caja,
+            rol_caja='COLABORADOR_CAJA', asignado_por=self.usuario
+        )
+        self.colaborador.olvidar_permisos_caja()
+
+        self.assertTrue(self.colaborador.puede_ver_caja(self.otra_caja))
+        self.assertFalse(self.colaborador.puede_crear_movimiento_caja(self.otra_caja))
+
+
+class VistasCajaChicaTest(AssertConsultasMixin, DatosBaseMixin, TestCase):
+    """La caja y los permisos del usuario se resuelven una sola vez por request"""
+
+    def setUp(self):
+        super().setUp()
+        from core.models import UsuarioCajaChica
+
+        self.caja = self.crear_caja()
+        for dia in range(1, 16):
+            self.crear_movimiento_caja(self.caja, 'INGRESO' if dia % 2 else 'EGRESO', date(2024, 1, dia), '10')
+
+        self.tesorero_caja = Usuario.objects.create_user(
+            username='tesorero_caja', password='clave-segura-123', iglesia=self.iglesia
+        )
+        UsuarioCajaChica.objects.create(
+            usuario=self.tesorero_caja, caja_chica=self.caja,
+            rol_caja='TESORERO_CAJA', asignado_por=self.usuario
+        )
+        self.client.force_login(self.tesorero_caja)
+
+    def get(self, nombre, *args):
+        from django.conf import settings
+        from django.test import override_settings
+        from django.urls import reverse
+
+        storages = {
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }
+        with override_settings(STORAGES=storages), self.assertSinNMas1() as perfil:
+            response = self.client.get(reverse(nombre, args=args))
+        self.assertEqual(response.status_code, 200)
+        return response, perfil
+
+    def consultas_caja(self, perfil):
+        return [sql for sql, _ in perfil.consultas if 'FROM "core_cajachica"' in sql]
+
+    def test_dashboard_caja(self):
+        response, perfil = self.get('dashboard_caja', self.caja.pk)
+
+        self.assertEqual(response.context['caja'], self.caja)
+        self.assertTrue(response.context['puede_crear_movimientos'])
+        self.assertEqual(len(self.consultas_caja(perfil)), 1)
+        self.assertEqual(perfil.total, 8)
+
+    def test_listado_movimientos_caja(self):
+        response, perfil = self.get('movimiento_caja_list', self.caja.pk)
+
+        self.assertEqual(len(response.context['movimientos']), 15)
+        self.assertTrue(response.context['puede_crear'])
+        self.assertEqual(len(self.consultas_caja(perfil)), 1)
+        # Sin N+1 por movimiento: categorías y usuarios van en la consulta del listado
+        self.assertEqual(perfil.total, 11)
+
+    def test_formularios_movimiento_caja(self):
+        _, perfil = self.get('movimiento_caja_create', self.caja.pk)
+        self.assertEqual(len(self.consultas_caja(perfil)), 1)
+        self.assertEqual(perfil.total, 7)
+
+        movimiento = self.caja.movimientos.first()
+        _, perfil = self.get('movimiento_caja_update', self.caja.pk, movimiento.pk)
+        self.assertEqual(len(self.consultas_caja(perfil)), 1)
+        self.assertEqual(perfil.total, 8)
+
+    def test_sin_acceso(self):
+        from django.urls import reverse
+
+        otra_caja = self.crear_caja('Caja Damas')
+        self.assertRedirects(
+            self.client.get(reverse('dashboard_caja', args=[otra_caja.pk])),
+            reverse('dashboard'), fetch_redirect_response=False
+        )
+        self.assertRedirects(
+            self.client.get(reverse('movimiento_caja_create', args=[otra_caja.pk])),
+            reverse('movimiento_caja_list', args=[otra_caja.pk]), fetch_redirect_response=False
+        )
+
+
+class NavegacionTest(DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        from core.models import UsuarioCajaChica
+
+        cache.clear()
+        self.caja = self.crear_caja()
+        self.colaborador = Usuario.objects.create_user(
+            username='colaborador', password='clave-segura-123', iglesia=self.iglesia
+        )
+        self.asignacion = UsuarioCajaChica.objects.create(
+            usuario=self.colaborador, caja_chica=self.caja,
+            rol_caja='COLABORADOR_CAJA', asignado_por=self.usuario
+        )
+
+    def nav_cajas(self):
+        from django.test import RequestFactory
+        from core.context_processors import navegacion
+
+        request = RequestFactory().get('/')
+        request.user = Usuario.objects.get(pk=self.colaborador.pk)
+        return navegacion(request)['nav_cajas']
+
+    def test_menu_cacheado_por_usuario(self):
+        self.assertEqual(self.nav_cajas(), [{
+            'pk': self.caja.pk, 'nombre': 'Caja Jóvenes',
+            'rol_caja': 'COLABORADOR_CAJA', 'rol_caja_display': 'Colaborador de Caja',
+        }])
+
+        # Solo la consulta del usuario: las cajas salen de la caché
+        with self.assertNumQueries(1):
+            self.nav_cajas()
+
+    def test_invalidacion(self):
+        from core.models import UsuarioCajaChica
+
+        self.nav_cajas()
+        self.caja.nombre = 'Caja Misiones'
+        self.caja.save()
+        self.assertEqual([caja['nombre'] for caja in self.nav_cajas()], ['Caja Misiones'])
+
+        otra_caja = self.crear_caja('Caja Damas')
+        UsuarioCajaChica.objects.create(
+            usuario=self.colaborador, caja_chica=otra_caja,
+            rol_caja='TESORERO_CAJA', asignado_por=self.usuario
+        )
+        self.assertEqual([caja['nombre'] for caja in self.nav_cajas()], ['Caja Damas', 'Caja Misiones'])
+
+        self.asignacion.delete()
+        otra_caja.delete()
+        self.assertEqual(self.nav_cajas(), [])
+
+
+class CacheIglesiaTest(DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        from django.core.cache import caches
+
+        super().setUp()
+        for alias in ('default', 'reportes'):
+            caches[alias].clear()
+        self.otra_iglesia = Iglesia.objects.create(nombre='Otra Iglesia')
+
+    def test_invalidar_iglesia_cambia_solo_su_espacio_de_nombres(self):
+        from core.cache import clave_cache, invalidar_iglesia
+
+        clave = clave_cache(self.iglesia, 'dashboard', '2024-02')
+        otra = clave_cache(self.otra_iglesia, 'dashboard', '2024-02')
+        self.assertEqual(clave_cache(self.iglesia.pk, 'dashboard', '2024-02'), clave)
+
+        invalidar_iglesia(self.iglesia)
+
+        self.assertNotEqual(clave_cache(self.iglesia, 'dashboard', '2024-02'), clave)
+        self.assertEqual(clave_cache(self.otra_iglesia, 'dashboard', '2024-02'), otra)
+
+    def test_generacion_perdida_no_revive_claves_viejas(self):
+        from django.core.cache import cache
+        from core.cache import clave_cache, invalidar_iglesia
+
+        # Invalidar sin contador no falla
+        invalidar_iglesia(self.iglesia)
+
+        clave = clave_cache(self.iglesia, 'dashboard')
+        cache.clear()
+        self.assertNotEqual(clave_cache(self.iglesia, 'dashboard'), clave)
+
+    def test_editar_iglesia_invalida_sus_reportes(self):
+        from core.reportes import generar_reporte, reporte_en_cache
+
+        self.crear_movimiento('INGRESO', date(2024, 2, 10), '1500')
+        generar_reporte(self.iglesia, 'REPORTE_MENSUAL', {'mes': '2024-02'})
+        self.assertTrue(reporte_en_cache(self.iglesia, 'REPORTE_MENSUAL', {'mes': '2024-02'}))
+
+        self.iglesia.celular = '+54 11 5555-5555'
+        self.iglesia.save()
+
+        self.assertFalse(reporte_en_cache(self.iglesia, 'REPORTE_MENSUAL', {'mes': '2024-02'}))
+
+
+class DatosIglesiaCambiadosTest(DatosBaseMixin, TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        from core.signals import datos_iglesia_cambiados
+
+        super().setUp()
+        cache.clear()
+        self.caja = self.crear_caja()
+        self.otra_caja = self.crear_caja('Caja Damas', '1000')
+
+        self.eventos = []
+        registrar = lambda sender, iglesia_id, caja_chica_id=None, **kwargs: self.eventos.append(
+            (sender.__name__, iglesia_id, caja_chica_id)
+        )
+        datos_iglesia_cambiados.connect(registrar, weak=False, dispatch_uid='test_eventos')
+        self.addCleanup(datos_iglesia_cambiados.disconnect, dispatch_uid='test_eventos')
+
+    def test_eventos_por_modelo(self):
+        movimiento = self.crear_movimiento('INGRESO', date(2024, 1, 5), '100')
+        movimiento.anulado = True
+        movimiento.save()
+        self.crear_movimiento_caja(self.caja, 'INGRESO', date(2024, 1, 5), '50')
+        TransferenciaCajaChica.objects.create(
+            caja_origen=self.otra_caja, caja_destino=self.caja, monto=Decimal('10'),
+            fecha=date(2024, 1, 6), concepto='Fondos', realizada_por=self.usuario
+        )
+
+        self.assertEqual(self.eventos[:3], [
+            ('Movimiento', self.iglesia.pk, None),
+            ('Movimiento', self.iglesia.pk, None),
+            ('MovimientoCajaChica', self.iglesia.pk, self.caja.pk),
+        ])
+        # La transferencia notifica a través de sus dos movimientos
+        self.assertEqual(self.eventos[3:], [
+            ('MovimientoCajaChica', self.iglesia.pk, self.otra_caja.pk),
+            ('MovimientoCajaChica', self.iglesia.pk, self.caja.pk),
+        ])
+
+        # Una categoría es un solo evento para la iglesia, sin uno por caja
+        del self.eventos[:]
+        self.cat_egreso.nombre = 'Mantenimiento'
+        self.cat_egreso.save()
+        self.assertEqual(self.eventos, [('CategoriaEgreso', self.iglesia.pk, None)])
+
+    def test_versiones_por_iglesia_y_por_caja(self):
+        from core.cache import clave_datos
+
+        def claves():
+            return (
+                clave_datos(self.iglesia, 'x'),
+                clave_datos(self.iglesia, 'x', caja=self.caja),
+                clave_datos(self.iglesia, 'x', caja=self.otra_caja),
+            )
+
+        iniciales = claves()
+        self.crear_movimiento('EGRESO', date(2024, 1, 5), '100')
+        iglesia, caja, otra_caja = claves()
+        self.assertNotEqual(iglesia, iniciales[0])
+        self.assertEqual((caja, otra_caja), iniciales[1:])
+
+        self.crear_movimiento_caja(self.caja, 'EGRESO', date(2024, 1, 5), '20')
+        self.assertNotEqual(claves()[1], caja)
+        self.assertEqual(claves()[2], otra_caja)
+
+        # Renombrar una categoría afecta a la iglesia y a todas sus cajas
+        antes = claves()
+        self.cat_egreso.nombre = 'Mantenimiento'
+        self.cat_egreso.save()
+        self.assertTrue(all(a != b for a, b in zip(antes, claves())))
+
+    def test_api_dashboard_cacheada_hasta_que_cambian_los_datos(self):
+        from django.urls import reverse
+        from django.utils import timezone
+
+        self.client.force_login(self.usuario)
+        url = reverse('dashboard_caja_data_api', args=[self.caja.pk])
+        primera = self.client.get(url, {'meses': 3}).json()
+
+        with self.assertNumQueries(4):
+            # Sesión, usuario, caja y versión de sus datos; la serie sale de la caché
+            self.assertEqual(self.client.get(url, {'meses': 3}).json(), primera)
+
+        self.crear_movimiento_caja(self.caja, 'INGRESO', timezone.now().date(), '75')
+        self.assertEqual(self.client.get(url, {'meses': 3}).json()['ingresos_data'][-1], 75.0)
+
+    def test_carga_masiva_notifica_al_final(self):
+        from core.utils import carga_masiva
+
+        with carga_masiva(self.iglesia):
+            for dia in range(1, 6):
+                self.crear_movimiento('INGRESO', date(2024, 1, dia), '10')
+            self.assertEqual(self.eventos, [])
+
+        self.assertCountEqual(self.eventos, [
+            ('Iglesia', self.iglesia.pk, None),
+            ('CajaChica', self.iglesia.pk, self.caja.pk),
+            ('CajaChica', self.iglesia.pk, self.otra_caja.pk),
+        ])
@@ -11,6 +11,7 @@ from core.views import (
     generar_reporte_movimientos_completo_view,
     dashboard_data_api,
     exportar_excel_view,
+    exportar_movimientos_view,
     exportar_dashboard_pdf_view,
     registro_view,
     registro_iglesia_google_view,
@@ -43,6 +44,7 @@ from core.views_caja_chica import (
     toggle_caja_chica,
     DashboardCajaChicaView,
     dashboard_caja_data_api,
+    exportar_movimientos_caja_view,
     # Movimientos de Caja
     MovimientoCajaChicaListView,
     MovimientoCajaChicaCreateView,
@@ -55,6 +57,11 @@ from core.views_caja_chica import (
     # Códigos de invitación
     generar_codigo_caja_view,
 )
+from core.views_reportes import (
+    reporte_job_estado_view,
+    reporte_job_estado_api,
+    descargar_reporte_job_view,
+)
 from django.contrib.auth.views import LogoutView
 
 urlpatterns = [
@@ -77,6 +84,10 @@ urlpatterns = [
     path('reportes/mensual/', reporte_mensual_view, name='reporte_mensual'),
     path('reportes/generar-pdf/', generar_reporte_pdf_view, name='generar_reporte_pdf'),
     path('reportes/movimientos-completo/', generar_reporte_movimientos_completo_view, name='reporte_movimientos_completo'),
+    # Reportes en segundo plano
+    path('reportes/jobs/<int:pk>/', reporte_job_estado_view, name='reporte_job_estado'),
+    path('reportes/jobs/<int:pk>/descargar/', descargar_reporte_job_view, name='descargar_reporte_job'),
+    path('api/reportes/jobs/<int:pk>/', reporte_job_estado_api, name='reporte_job_estado_api'),
     # Gestión de usuarios (solo ADMIN)
     path('usuarios/gestionar/', gestionar_usuarios_view, name='gestionar_usuarios'),
     # Perfil de usuario
@@ -93,6 +104,7 @@ urlpatterns = [
     # API y exportación
     path('api/dashboard-data/', dashboard_data_api, name='dashboard_data_api'),
     path('exportar/excel/', exportar_excel_view, name='exportar_excel'),
+    path('exportar/movimientos.<str:formato>', exportar_movimientos_view, name='exportar_movimientos'),
     path('exportar/dashboard-pdf/', exportar_dashboard_pdf_view, name='exportar_dashboard_pdf'),
     # Categorías de Ingreso
     path('categorias/ingresos/', CategoriaIngresoListView.as_view(), name='categoria_ingreso_list'),
@@ -119,6 +131,7 @@ urlpatterns = [
 
     # Movimientos de Caja Chica
     path('cajas-chicas/<int:caja_pk>/movimientos/', MovimientoCajaChicaListView.as_view(), name='movimiento_caja_list'),
+    path('cajas-chicas/<int:caja_pk>/movimientos.<str:formato>', exportar_movimientos_caja_view, name='exportar_movimientos_caja'),
     path('cajas-chicas/<int:caja_pk>/movimientos/nuevo/', MovimientoCajaChicaCreateView.as_view(), name='movimiento_caja_create'),
     path('cajas-chicas/<int:caja_pk>/movimientos/<int:pk>/editar/', MovimientoCajaChicaUpdateView.as_view(), name='movimiento_caja_update'),
     path('cajas-chicas/<int:caja_pk>/movimientos/<int:pk>/anular/', anular_movimiento_caja_view, name='anular_movimiento_caja'),
@@ -1,6 +1,8 @@
+import threading
+from contextlib import contextmanager
 from decimal import Decimal
-from datetime import datetime
-from django.db.models import Sum, Q
+from datetime import datetime, timedelta
+from django.db.models import Sum, Q, Func
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -27,6 +29,25 @@ def formato_mes(fecha, corto=False):
     return f"{meses[fecha.month]} {fecha.year}"
 
 
+def rango_mes(año_mes):
+    """
+    Rango de fechas de un mes para filtrar por `fecha`.
+    año_mes: formato 'YYYY-MM'
+    Retorna {'fecha__gte': primer día, 'fecha__lt': primer día del mes siguiente},
+    que a diferencia de fecha__year/fecha__month puede usar los índices sobre fecha.
+    Lanza ValueError si el formato es inválido.
+    """
+    from datetime import date
+
+    año, mes = str(año_mes).split('-')
+    inicio = date(int(año), int(mes), 1)
+    if inicio.month == 12:
+        fin = date(inicio.year + 1, 1, 1)
+    else:
+        fin = date(inicio.year, inicio.month + 1, 1)
+    return {'fecha__gte': inicio, 'fecha__lt': fin}
+
+
 def formato_pesos(monto):
     """
     Convierte un número a formato de pesos argentinos
@@ -159,8 +180,7 @@ def calcular_saldo_mes(iglesia, año_mes):
     # Calcular totales del mes actual (excluye movimientos anulados)
     movimientos_mes = Movimiento.objects.filter(
         iglesia=iglesia,
-        fecha__year=int(año),
-        fecha__month=int(mes),
+        **rango_mes(año_mes),
         anulado=False
     )
 
@@ -180,6 +200,503 @@ def calcular_saldo_mes(iglesia, año_mes):
     return saldo
 
 
+# ============================================
+# LIBRO INCREMENTAL DE SALDOS MENSUALES
+# ============================================
+
+def aporte_movimiento(tipo, monto, anulado):
+    """
+    Retorna la contribución (ingresos, egresos) de un movimiento a los saldos.
+    Los movimientos anulados no aportan nada.
+    """
+    if anulado or monto is None:
+        return Decimal('0.00'), Decimal('0.00')
+    if tipo == 'INGRESO':
+        return Decimal(monto), Decimal('0.00')
+    return Decimal('0.00'), Decimal(monto)
+
+
+def abrir_saldo_mes(iglesia, año_mes):
+    """
+    Crea el SaldoMensual de un mes que todavía no existe.
+    El saldo inicial se arrastra del último mes registrado y solo se agregan
+    los movimientos del propio mes; el historial completo se recorre
+    únicamente si la iglesia no tiene ningún saldo anterior.
+    """
+    from core.models import Movimiento, SaldoMensual
+
+    iglesia_id = getattr(iglesia, 'pk', iglesia)
+    año, mes = año_mes.split('-')
+    fecha_inicio = datetime(int(año), int(mes), 1).date()
+
+    anterior = SaldoMensual.objects.filter(
+        iglesia_id=iglesia_id,
+        año_mes__lt=año_mes
+    ).order_by('-año_mes').first()
+
+    if anterior:
+        saldo_inicial = anterior.saldo_final
+    else:
+        anteriores = Movimiento.objects.filter(
+            iglesia_id=iglesia_id,
+            fecha__lt=fecha_inicio,
+            anulado=False
+        ).aggregate(
+            ingresos=Sum('monto', filter=Q(tipo='INGRESO')),
+            egresos=Sum('monto', filter=Q(tipo='EGRESO'))
+        )
+        saldo_inicial = (anteriores['ingresos'] or Decimal('0.00')) - (anteriores['egresos'] or Decimal('0.00'))
+
+    totales_mes = Movimiento.objects.filter(
+        iglesia_id=iglesia_id,
+        **rango_mes(año_mes),
+        anulado=False
+    ).aggregate(
+        ingresos=Sum('monto', filter=Q(tipo='INGRESO')),
+        egresos=Sum('monto', filter=Q(tipo='EGRESO'))
+    )
+    total_ingresos = totales_mes['ingresos'] or Decimal('0.00')
+    total_egresos = totales_mes['egresos'] or Decimal('0.00')
+
+    saldo, created = SaldoMensual.objects.get_or_create(
+        iglesia_id=iglesia_id,
+        año_mes=año_mes,
+        defaults={
+            'saldo_inicial': saldo_inicial,
+            'total_ingresos': total_ingresos,
+            'total_egresos': total_egresos,
+            'saldo_final': saldo_inicial + total_ingresos - total_egresos,
+        }
+    )
+    return saldo, created
+
+
+def saldo_al(iglesia, fecha):
+    """
+    Saldo de la iglesia antes de `fecha` (sin incluir los movimientos de ese día).
+    Parte del saldo final del último mes cerrado en el libro de saldos y
+    agrega solo los movimientos posteriores, así que el costo no depende del
+    largo del historial; sin saldos registrados recorre todo el historial.
+    """
+    from core.models import Movimiento, SaldoMensual
+
+    iglesia_id = getattr(iglesia, 'pk', iglesia)
+
+    anterior = SaldoMensual.objects.filter(
+        iglesia_id=iglesia_id,
+        año_mes__lt=fecha.strftime('%Y-%m')
+    ).order_by('-año_mes').values('año_mes', 'saldo_final').first()
+
+    movimientos = Movimiento.objects.filter(iglesia_id=iglesia_id, fecha__lt=fecha, anulado=False)
+    saldo = Decimal('0.00')
+    if anterior:
+        saldo = anterior['saldo_final']
+        movimientos = movimientos.filter(fecha__gte=rango_mes(anterior['año_mes'])['fecha__lt'])
+
+    totales = movimientos.aggregate(
+        ingresos=Sum('monto', filter=Q(tipo='INGRESO')),
+        egresos=Sum('monto', filter=Q(tipo='EGRESO'))
+    )
+    return saldo + (totales['ingresos'] or Decimal('0.00')) - (totales['egresos'] or Decimal('0.00'))
+
+
+def registrar_delta_saldo(iglesia, año_mes, delta_ingresos, delta_egresos, abrir_mes=True):
+    """
+    Aplica una variación de ingresos/egresos al libro de saldos mensuales.
+    Actualiza los totales del mes afectado y arrastra la diferencia de saldo
+    a los meses posteriores, sin recalcular el historial.
+    abrir_mes: si el mes no tiene SaldoMensual, crearlo (False en bajas).
+    """
+    from core.models import SaldoMensual
+    from django.db import transaction
+    from django.db.models import F
+    from django.utils import timezone
+
+    if not delta_ingresos and not delta_egresos:
+        return
+
+    iglesia_id = getattr(iglesia, 'pk', iglesia)
+    delta_saldo = delta_ingresos - delta_egresos
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        actualizados = SaldoMensual.objects.filter(iglesia_id=iglesia_id, año_mes=año_mes).update(
+            total_ingresos=F('total_ingresos') + delta_ingresos,
+            total_egresos=F('total_egresos') + delta_egresos,
+            saldo_final=F('saldo_final') + delta_saldo,
+            fecha_actualizacion=ahora
+        )
+        if not actualizados and abrir_mes:
+            # El mes nuevo se abre con los movimientos ya guardados, así que
+            # la variación solo debe propagarse a los meses siguientes
+            abrir_saldo_mes(iglesia_id, año_mes)
+
+        if delta_saldo:
+            SaldoMensual.objects.filter(iglesia_id=iglesia_id, año_mes__gt=año_mes).update(
+                saldo_inicial=F('saldo_inicial') + delta_saldo,
+                saldo_final=F('saldo_final') + delta_saldo,
+                fecha_actualizacion=ahora
+            )
+
+
+def registrar_cambio_datos(iglesia, *fechas, caja=None, crear=True):
+    """
+    Incrementa la versión de datos de los meses de `fechas` (date o 'YYYY-MM')
+    para invalidar los reportes y cálculos en caché que dependen de ellos.
+    Sin fechas, registra un cambio que afecta a todos los meses. Con `caja`,
+    el cambio se registra en los contadores de esa caja chica.
+    crear: si el mes no tiene VersionDatosMes, crearlo (False en bajas, que
+    pueden ocurrir en cascada al eliminar la iglesia).
+    """
+    from core.models import VersionDatosMes
+    from django.db import IntegrityError, transaction
+    from django.db.models import F
+
+    iglesia_id = getattr(iglesia, 'pk', iglesia)
+    caja_chica_id = getattr(caja, 'pk', caja)
+    if en_carga_masiva(iglesia_id):
+        return
+
+    meses = {
+        fecha if isinstance(fecha, str) else fecha.strftime('%Y-%m')
+        for fecha in fechas if fecha
+    } or {VersionDatosMes.AÑO_MES_GLOBAL}
+
+    for año_mes in sorted(meses):
+        versiones = VersionDatosMes.objects.filter(
+            iglesia_id=iglesia_id, caja_chica_id=caja_chica_id, año_mes=año_mes
+        )
+        if versiones.update(version=F('version') + 1) or not crear:
+            continue
+        try:
+            with transaction.atomic():
+                VersionDatosMes.objects.create(
+                    iglesia_id=iglesia_id, caja_chica_id=caja_chica_id, año_mes=año_mes, version=1
+                )
+        except IntegrityError:
+            # Otro proceso creó el registro al mismo tiempo
+            versiones.update(version=F('version') + 1)
+
+
+def version_datos(iglesia, hasta_año_mes=None, caja=None):
+    """
+    Versión de los datos de la iglesia hasta `hasta_año_mes` inclusive (todos
+    los meses si es None). Es la suma de los contadores mensuales, así que
+    crece con cualquier cambio en esos meses o en el ámbito global; incluye
+    los de sus cajas chicas, porque sus datos también son de la iglesia.
+    Con `caja`, solo cuenta los contadores de esa caja y los globales de la
+    iglesia (las categorías son compartidas).
+    """
+    from core.models import VersionDatosMes
+    from django.db.models import Q, Sum
+
+    versiones = VersionDatosMes.objects.filter(iglesia=iglesia)
+    if caja is not None:
+        versiones = versiones.filter(
+            Q(caja_chica=caja) | Q(caja_chica__isnull=True, año_mes=VersionDatosMes.AÑO_MES_GLOBAL)
+        )
+    if hasta_año_mes:
+        versiones = versiones.filter(año_mes__lte=hasta_año_mes)
+    return versiones.aggregate(total=Sum('version'))['total'] or 0
+
+
+def aplicar_movimiento_a_saldos(movimiento, estado_anterior=None, eliminado=False):
+    """
+    Actualiza el libro de saldos con la diferencia entre el estado anterior
+    de un movimiento (dict con fecha, tipo, monto, anulado) y su estado actual.
+    Cubre altas, ediciones (incluido el cambio de mes), anulaciones y bajas.
+    """
+    cambios = {}
+
+    if estado_anterior:
+        ingresos, egresos = aporte_movimiento(
+            estado_anterior['tipo'], estado_anterior['monto'], estado_anterior['anulado']
+        )
+        año_mes = estado_anterior['fecha'].strftime('%Y-%m')
+        cambios[año_mes] = (-ingresos, -egresos)
+
+    if not eliminado:
+        ingresos, egresos = aporte_movimiento(movimiento.tipo, movimiento.monto, movimiento.anulado)
+        año_mes = movimiento.fecha.strftime('%Y-%m')
+        previo_ing, previo_egr = cambios.get(año_mes, (Decimal('0.00'), Decimal('0.00')))
+        cambios[año_mes] = (previo_ing + ingresos, previo_egr + egresos)
+
+    for año_mes, (delta_ingresos, delta_egresos) in sorted(cambios.items()):
+        registrar_delta_saldo(
+            movimiento.iglesia_id, año_mes, delta_ingresos, delta_egresos,
+            abrir_mes=not eliminado
+        )
+
+
+def _saldos_esperados(iglesia):
+    """
+    Recalcula desde cero los saldos mensuales de una iglesia con una única
+    consulta agrupada por mes. Incluye los meses con movimientos y los meses
+    que ya tienen un SaldoMensual registrado.
+    Retorna un dict ordenado {año_mes: (saldo_inicial, ingresos, egresos, saldo_final)}.
+    """
+    from core.models import Movimiento, SaldoMensual
+    from django.db.models.functions import TruncMonth
+
+    totales = Movimiento.objects.filter(
+        iglesia=iglesia,
+        anulado=False
+    ).annotate(
+        mes=TruncMonth('fecha')
+    ).values('mes').annotate(
+        ingresos=Sum('monto', filter=Q(tipo='INGRESO')),
+        egresos=Sum('monto', filter=Q(tipo='EGRESO'))
+    ).order_by('mes')
+
+    por_mes = {
+        item['mes'].strftime('%Y-%m'): (
+            item['ingresos'] or Decimal('0.00'),
+            item['egresos'] or Decimal('0.00')
+        )
+        for item in totales
+    }
+
+    meses = set(por_mes) | set(
+        SaldoMensual.objects.filter(iglesia=iglesia).values_list('año_mes', flat=True)
+    )
+
+    esperados = {}
+    saldo_acumulado = Decimal('0.00')
+    for año_mes in sorted(meses):
+        ingresos, egresos = por_mes.get(año_mes, (Decimal('0.00'), Decimal('0.00')))
+        saldo_inicial = saldo_acumulado
+        saldo_acumulado = saldo_inicial + ingresos - egresos
+        esperados[año_mes] = (saldo_inicial, ingresos, egresos, saldo_acumulado)
+
+    return esperados
+
+
+def verificar_saldos_mensuales(iglesia):
+    """
+    Compara el libro incremental de saldos con un recálculo completo.
+    Retorna una lista de diferencias (vacía si el libro es consistente).
+    """
+    from core.models import SaldoMensual
+
+    registrados = {
+        s.año_mes: s for s in SaldoMensual.objects.filter(iglesia=iglesia)
+    }
+
+    diferencias = []
+    campos = ('saldo_inicial', 'total_ingresos', 'total_egresos', 'saldo_final')
+    for año_mes, valores in _saldos_esperados(iglesia).items():
+        saldo = registrados.get(año_mes)
+        for campo, esperado in zip(campos, valores):
+            registrado = getattr(saldo, campo) if saldo else None
+            if registrado != esperado:
+                diferencias.append({
+                    'año_mes': año_mes,
+                    'campo': campo,
+                    'esperado': esperado,
+                    'registrado': registrado,
+                })
+
+    return diferencias
+
+
+def reconstruir_saldos_mensuales(iglesia):
+    """
+    Reescribe el libro de saldos mensuales de una iglesia a partir de un
+    recálculo completo. Retorna la cantidad de meses creados o corregidos.
+    """
+    from core.models import SaldoMensual
+    from django.db import transaction
+
+    campos = ('saldo_inicial', 'total_ingresos', 'total_egresos', 'saldo_final')
+
+    with transaction.atomic():
+        registrados = {
+            s.año_mes: s for s in SaldoMensual.objects.select_for_update().filter(iglesia=iglesia)
+        }
+        nuevos = []
+        modificados = []
+
+        for año_mes, valores in _saldos_esperados(iglesia).items():
+            saldo = registrados.get(año_mes)
+            if saldo is None:
+                nuevos.append(SaldoMensual(iglesia=iglesia, año_mes=año_mes, **dict(zip(campos, valores))))
+            elif any(getattr(saldo, campo) != valor for campo, valor in zip(campos, valores)):
+                for campo, valor in zip(campos, valores):
+                    setattr(saldo, campo, valor)
+                modificados.append(saldo)
+
+        SaldoMensual.objects.bulk_create(nuevos)
+        SaldoMensual.objects.bulk_update(modificados, campos)
+
+    return len(nuevos) + len(modificados)
+
+
+def sincronizar_datos_derivados(iglesia):
+    """
+    Recalcula los datos que los signals mantienen movimiento a movimiento
+    (libro de saldos mensuales, saldo materializado de las cajas chicas y
+    versiones de datos de los reportes) y notifica el cambio de datos de la
+    iglesia y sus cajas. Se usa después de cargar movimientos con
+    bulk_create, que no dispara signals.
+    """
+    from core.models import CajaChica, Iglesia, Movimiento, MovimientoCajaChica, VersionDatosMes
+    from django.db.models.functions import TruncMonth
+
+    reconstruir_saldos_mensuales(iglesia)
+
+    for caja in CajaChica.objects.filter(iglesia=iglesia):
+        caja.sincronizar_saldo()
+
+    meses = set(
+        Movimiento.objects.filter(iglesia=iglesia).order_by().annotate(
+            mes=TruncMonth('fecha')
+        ).values_list('mes', flat=True).distinct()
+    )
+    # Además de los meses con movimientos, cada caja registra un cambio global
+    # por su saldo recalculado
+    meses_cajas = {
+        caja_id: {VersionDatosMes.AÑO_MES_GLOBAL}
+        for caja_id in CajaChica.objects.filter(iglesia=iglesia).values_list('pk', flat=True)
+    }
+    for caja_id, mes in MovimientoCajaChica.objects.filter(caja_chica__iglesia=iglesia).order_by().annotate(
+        mes=TruncMonth('fecha')
+    ).values_list('caja_chica_id', 'mes').distinct():
+        meses_cajas[caja_id].add(mes)
+
+    from core.signals import notificar_cambio_datos
+
+    notificar_cambio_datos(iglesia.pk, fechas=meses, sender=Iglesia)
+    for caja_id, meses_caja in meses_cajas.items():
+        notificar_cambio_datos(iglesia.pk, caja_id, fechas=meses_caja, sender=CajaChica)
+
+
+# ============================================
+# CARGA MASIVA
+# ============================================
+
+_carga_masiva = threading.local()
+
+
+def en_carga_masiva(iglesia_id):
+    """
+    Indica si hay una carga masiva en curso en este hilo (ver carga_masiva).
+    En ese caso anota la iglesia para sincronizarla al final, y los signals
+    omiten la actualización movimiento a movimiento.
+    """
+    iglesias = getattr(_carga_masiva, 'iglesias', None)
+    if iglesias is None:
+        return False
+    iglesias.add(iglesia_id)
+    return True
+
+
+@contextmanager
+def carga_masiva(*iglesias):
+    """
+    Contexto para importar muchos movimientos de una vez:
+
+        with carga_masiva(iglesia):
+            Movimiento.objects.bulk_create(movimientos)
+
+    Mientras está activo, los signals no actualizan el libro de saldos, los
+    saldos de cajas ni las versiones de datos por cada movimiento guardado.
+    Al salir, todo se recalcula una sola vez por iglesia (las indicadas y las
+    que tocaron los movimientos guardados con save()), dentro de la misma
+    transacción que la carga.
+    """
+    from core.models import Iglesia
+    from django.db import transaction
+
+    ids = {getattr(iglesia, 'pk', iglesia) for iglesia in iglesias}
+
+    # Cargas anidadas: se sincroniza al salir de la externa
+    if getattr(_carga_masiva, 'iglesias', None) is not None:
+        _carga_masiva.iglesias.update(ids)
+        yield
+        return
+
+    _carga_masiva.iglesias = ids
+    try:
+        with transaction.atomic():
+            yield
+            ids = _carga_masiva.iglesias
+            _carga_masiva.iglesias = None
+            for iglesia in Iglesia.objects.filter(pk__in=ids):
+                sincronizar_datos_derivados(iglesia)
+    finally:
+        _carga_masiva.iglesias = None
+
+
+def asignar_comprobantes(movimientos):
+    """
+    Numera, en orden de fecha, los movimientos nuevos (de la iglesia o de
+    cajas chicas) que no tienen comprobante, reservando un bloque del
+    contador por iglesia o caja y tipo. Reemplaza la numeración que hace
+    save() cuando los movimientos se guardan con bulk_create.
+    """
+    from collections import defaultdict
+    from core.models import ContadorComprobante, MovimientoCajaChica
+
+    grupos = defaultdict(list)
+    for movimiento in movimientos:
+        if movimiento.comprobante_nro:
+            continue
+        if isinstance(movimiento, MovimientoCajaChica):
+            clave = (movimiento.caja_chica.iglesia_id, movimiento.tipo, movimiento.caja_chica_id)
+        else:
+            clave = (movimiento.iglesia_id, movimiento.tipo, None)
+        grupos[clave].append(movimiento)
+
+    for (iglesia_id, tipo, caja_chica_id), grupo in grupos.items():
+        prefijo = ('CC-' if caja_chica_id else '') + ('I' if tipo == 'INGRESO' else 'E')
+        numero = ContadorComprobante.reservar_numeros(iglesia_id, tipo, len(grupo), caja_chica_id)
+        for movimiento in sorted(grupo, key=lambda m: m.fecha):
+            movimiento.comprobante_nro = f'{prefijo}-{numero:04d}'
+            numero += 1
+
+
+# ============================================
+# NAVEGACIÓN
+# ============================================
+
+def clave_navegacion(usuario_id):
+    return f'navegacion:usuario:{usuario_id}'
+
+
+def cajas_navegacion(usuario):
+    """
+    Cajas chicas asignadas al usuario para el menú lateral, ordenadas por nombre:
+    [{'pk', 'nombre', 'rol_caja', 'rol_caja_display'}].
+    Se arman con una sola consulta y se guardan en caché por usuario; los
+    signals de UsuarioCajaChica y CajaChica las invalidan.
+    """
+    from django.conf import settings
+    from django.core.cache import cache
+
+    clave = clave_navegacion(usuario.pk)
+    cajas = cache.get(clave)
+    if cajas is None:
+        cajas = [
+            {
+                'pk': asignacion.caja_chica_id,
+                'nombre': asignacion.caja_chica.nombre,
+                'rol_caja': asignacion.rol_caja,
+                'rol_caja_display': asignacion.get_rol_caja_display(),
+            }
+            for asignacion in usuario.asignaciones_caja.values()
+        ]
+        cache.set(clave, cajas, settings.NAVEGACION_CACHE_TIMEOUT)
+    return cajas
+
+
+def invalidar_navegacion(*usuario_ids):
+    """Descarta el menú cacheado de los usuarios indicados"""
+    from django.core.cache import cache
+
+    if usuario_ids:
+        cache.delete_many([clave_navegacion(usuario_id) for usuario_id in usuario_ids])
+
+
 def generar_reporte_pdf(iglesia, año_mes):
     """
     Genera un PDF profesional con el reporte mensual de movimientos
@@ -292,8 +809,7 @@ def generar_reporte_pdf(iglesia, año_mes):
     ingresos_por_categoria = Movimiento.objects.filter(
         iglesia=iglesia,
         tipo='INGRESO',
-        fecha__year=int(año),
-        fecha__month=int(mes),
+        **rango_mes(año_mes),
         anulado=False
     ).values('categoria_ingreso__nombre').annotate(
         total=Sum('monto')
@@ -333,8 +849,7 @@ def generar_reporte_pdf(iglesia, año_mes):
     egresos_por_categoria = Movimiento.objects.filter(
         iglesia=iglesia,
         tipo='EGRESO',
-        fecha__year=int(año),
-        fecha__month=int(mes),
+        **rango_mes(año_mes),
         anulado=False
     ).values('categoria_egreso__nombre').annotate(
         total=Sum('monto')
@@ -373,8 +888,7 @@ def generar_reporte_pdf(iglesia, año_mes):
     # Detalle de movimientos del mes (excluye anulados)
     movimientos = Movimiento.objects.filter(
         iglesia=iglesia,
-        fecha__year=int(año),
-        fecha__month=int(mes),
+        **rango_mes(año_mes),
         anulado=False
     ).order_by('fecha', 'tipo')
 
@@ -439,13 +953,219 @@ def generar_reporte_pdf(iglesia, año_mes):
     return buffer
 
 
+class SumaAcumulada(Func):
+    """
+    SUM usable como función de ventana sobre columnas ya agregadas
+    (Django no permite Window(Sum(...)) sobre un annotate con Sum).
+    """
+    function = 'SUM'
+    window_compatible = True
+
+
+def serie_mensual_saldos(iglesia, fecha_inicio, cantidad_meses):
+    """
+    Retorna ingresos, egresos y saldo final de `cantidad_meses` meses desde
+    `fecha_inicio` (primer día de mes) con una única consulta agrupada por mes.
+    El saldo acumulado se calcula con una función de ventana sobre todo el
+    historial previo, por lo que no lee ni escribe SaldoMensual.
+    """
+    from core.models import Movimiento
+    from django.db.models import DecimalField, F, Window
+    from django.db.models.functions import TruncMonth
+    from dateutil.relativedelta import relativedelta
+
+    fecha_fin = fecha_inicio + relativedelta(months=cantidad_meses)
+
+    filas = Movimiento.objects.filter(
+        iglesia=iglesia,
+        anulado=False,
+        fecha__lt=fecha_fin
+    ).annotate(
+        mes=TruncMonth('fecha')
+    ).values('mes').annotate(
+        ingresos=Sum('monto', filter=Q(tipo='INGRESO'), default=Decimal('0.00')),
+        egresos=Sum('monto', filter=Q(tipo='EGRESO'), default=Decimal('0.00')),
+    ).annotate(
+        acumulado=Window(
+            SumaAcumulada(
+                F('ingresos') - F('egresos'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+            order_by=F('mes').asc()
+        )
+    ).order_by('mes')
+
+    por_mes = {}
+    saldo_previo = Decimal('0.00')
+    for fila in filas:
+        if fila['mes'] < fecha_inicio:
+            saldo_previo = fila['acumulado']
+        else:
+            por_mes[fila['mes']] = fila
+
+    serie = []
+    for i in range(cantidad_meses):
+        mes = fecha_inicio + relativedelta(months=i)
+        fila = por_mes.get(mes)
+        if fila:
+            saldo_previo = fila['acumulado']
+            ingresos, egresos = fila['ingresos'], fila['egresos']
+        else:
+            ingresos, egresos = Decimal('0.00'), Decimal('0.00')
+        serie.append({
+            'mes': mes,
+            'ingresos': ingresos,
+            'egresos': egresos,
+            'saldo_final': saldo_previo,
+        })
+
+    return serie
+
+
+def serie_mensual_caja(caja, fecha_inicio, cantidad_meses):
+    """
+    Retorna ingresos, egresos y saldo acumulado de una caja chica para
+    `cantidad_meses` meses desde `fecha_inicio` (primer día de mes).
+    Usa una única consulta con agregación condicional agrupada por mes; los
+    meses anteriores a la ventana solo se suman para obtener el saldo de apertura.
+    """
+    from core.models import MovimientoCajaChica
+    from django.db.models import Case, When, DecimalField, Value
+    from django.db.models.functions import TruncMonth
+    from dateutil.relativedelta import relativedelta
+
+    fecha_fin = fecha_inicio + relativedelta(months=cantidad_meses)
+    cero = Value(Decimal('0.00'))
+
+    filas = MovimientoCajaChica.objects.filter(
+        caja_chica=caja,
+        anulado=False,
+        fecha__lt=fecha_fin
+    ).annotate(
+        mes=TruncMonth('fecha')
+    ).values('mes').annotate(
+        ingresos=Sum(Case(When(tipo='INGRESO', then='monto'), default=cero, output_field=DecimalField())),
+        egresos=Sum(Case(When(tipo='EGRESO', then='monto'), default=cero, output_field=DecimalField())),
+    ).order_by('mes')
+
+    saldo = caja.saldo_inicial
+    por_mes = {}
+    for fila in filas:
+        if fila['mes'] < fecha_inicio:
+            saldo += fila['ingresos'] - fila['egresos']
+        else:
+            por_mes[fila['mes']] = fila
+
+    serie = []
+    for i in range(cantidad_meses):
+        mes = fecha_inicio + relativedelta(months=i)
+        fila = por_mes.get(mes)
+        ingresos = fila['ingresos'] if fila else Decimal('0.00')
+        egresos = fila['egresos'] if fila else Decimal('0.00')
+        saldo += ingresos - egresos
+        serie.append({
+            'mes': mes,
+            'ingresos': ingresos,
+            'egresos': egresos,
+            'saldo_final': saldo,
+        })
+
+    return serie
+
+
+def resumen_mensual_cajas(cajas, año_mes, hoy=None, meses_evolucion=12):
+    """
+    Calcula para varias cajas chicas, con una única consulta agrupada por
+    caja y mes:
+    - saldo: saldo al cierre del mes `año_mes`
+    - promedio_ingresos / promedio_egresos: promedio de los meses con
+      movimientos del año de `año_mes` (sin contar el mes en curso)
+    - evolucion: saldo al cierre de cada uno de los últimos `meses_evolucion`
+      meses completos
+    Retorna (meses_evolucion, {caja_id: datos}), donde meses_evolucion es la
+    lista de fechas (primer día de mes) de la evolución.
+    """
+    from datetime import date
+    from collections import defaultdict
+    from core.models import MovimientoCajaChica
+    from django.db.models import Case, When, DecimalField, Value
+    from django.db.models.functions import TruncMonth
+    from dateutil.relativedelta import relativedelta
+
+    hoy = hoy or date.today()
+    mes_en_curso = hoy.replace(day=1)
+    mes_cierre = rango_mes(año_mes)['fecha__gte']
+    año_promedio = mes_cierre.year
+
+    meses_grafica = [
+        mes_en_curso - relativedelta(months=meses_evolucion - i)
+        for i in range(meses_evolucion)
+    ]
+    fecha_fin = max(date(año_promedio + 1, 1, 1), mes_en_curso)
+
+    cajas = list(cajas)
+    cero = Value(Decimal('0.00'))
+    filas = MovimientoCajaChica.objects.filter(
+        caja_chica__in=cajas,
+        anulado=False,
+        fecha__lt=fecha_fin
+    ).annotate(
+        mes=TruncMonth('fecha')
+    ).values('caja_chica_id', 'mes').annotate(
+        ingresos=Sum(Case(When(tipo='INGRESO', then='monto'), default=cero, output_field=DecimalField())),
+        egresos=Sum(Case(When(tipo='EGRESO', then='monto'), default=cero, output_field=DecimalField())),
+    ).order_by('caja_chica_id', 'mes')
+
+    meses_por_caja = defaultdict(list)
+    for fila in filas:
+        meses_por_caja[fila['caja_chica_id']].append(fila)
+
+    resumen = {}
+    for caja in cajas:
+        saldo_acumulado = caja.saldo_inicial
+        saldo_cierre = caja.saldo_inicial
+        ingresos_año = []
+        egresos_año = []
+
+        for fila in meses_por_caja[caja.pk]:
+            saldo_acumulado += fila['ingresos'] - fila['egresos']
+            if fila['mes'] <= mes_cierre:
+                saldo_cierre = saldo_acumulado
+
+            # Promedios del año (excluye el mes en curso, que aún no está completo)
+            if fila['mes'].year == año_promedio and fila['mes'] != mes_en_curso:
+                if fila['ingresos'] > 0 or fila['egresos'] > 0:
+                    ingresos_año.append(fila['ingresos'])
+                    egresos_año.append(fila['egresos'])
+
+        # Saldo al cierre de cada mes de la gráfica
+        filas_caja = meses_por_caja[caja.pk]
+        evolucion = []
+        saldo = caja.saldo_inicial
+        indice = 0
+        for mes in meses_grafica:
+            while indice < len(filas_caja) and filas_caja[indice]['mes'] <= mes:
+                saldo += filas_caja[indice]['ingresos'] - filas_caja[indice]['egresos']
+                indice += 1
+            evolucion.append(saldo)
+
+        resumen[caja.pk] = {
+            'saldo': saldo_cierre,
+            'promedio_ingresos': sum(ingresos_año) / len(ingresos_año) if ingresos_año else Decimal('0.00'),
+            'promedio_egresos': sum(egresos_año) / len(egresos_año) if egresos_año else Decimal('0.00'),
+            'evolucion': evolucion,
+        }
+
+    return meses_grafica, resumen
+
+
 def get_dashboard_data(iglesia, meses=None, mes_distribucion=None):
     """
     Obtiene los datos para los gráficos del dashboard
     Retorna los últimos 12 meses completos (excluyendo el mes actual)
     mes_distribucion: mes para el gráfico de distribución (formato YYYY-MM), por defecto mes anterior
     """
-    from core.models import SaldoMensual, Movimiento
+    from core.models import Movimiento
     from django.db.models import Sum
     from datetime import datetime, timedelta
     from dateutil.relativedelta import relativedelta
@@ -460,41 +1180,22 @@ def get_dashboard_data(iglesia, meses=None, mes_distribucion=None):
     # Cantidad de meses a mostrar (12 meses, excluyendo el actual)
     meses_a_mostrar = 12
 
-    # Generar lista de meses
-    meses_labels = []
-    saldos_data = []
-    ingresos_data = []
-    egresos_data = []
-    balance_data = []
-
-    for i in range(meses_a_mostrar):
-        fecha = fecha_inicio + relativedelta(months=i)
-
-        # Excluir el mes actual
-        if fecha.year == fecha_actual.year and fecha.month == fecha_actual.month:
-            continue
-
-        año_mes = fecha.strftime('%Y-%m')
-        mes_label = formato_mes(fecha, corto=True)  # Formato corto en español
+    # Serie mensual de solo lectura: una consulta agrupada, sin escribir SaldoMensual
+    serie = serie_mensual_saldos(iglesia, fecha_inicio.date(), meses_a_mostrar)
 
-        # Recalcular saldo del mes (siempre, para asegurar datos correctos)
-        saldo = calcular_saldo_mes(iglesia, año_mes)
-
-        meses_labels.append(mes_label)
-        saldos_data.append(float(saldo.saldo_final))
-        ingresos_data.append(float(saldo.total_ingresos))
-        egresos_data.append(float(saldo.total_egresos))
-        balance_data.append(float(saldo.total_ingresos - saldo.total_egresos))
+    meses_labels = [formato_mes(item['mes'], corto=True) for item in serie]
+    saldos_data = [float(item['saldo_final']) for item in serie]
+    ingresos_data = [float(item['ingresos']) for item in serie]
+    egresos_data = [float(item['egresos']) for item in serie]
+    balance_data = [float(item['ingresos'] - item['egresos']) for item in serie]
 
     # Distribución de gastos por categoría (mes seleccionado o mes actual)
     mes_para_distribucion = mes_distribucion if mes_distribucion else fecha_actual.strftime('%Y-%m')
-    año, mes = mes_para_distribucion.split('-')
 
     egresos_por_categoria = Movimiento.objects.filter(
         iglesia=iglesia,
         tipo='EGRESO',
-        fecha__year=int(año),
-        fecha__month=int(mes),
+        **rango_mes(mes_para_distribucion),
         anulado=False
     ).values('categoria_egreso__nombre').annotate(
         total=Sum('monto')
@@ -507,8 +1208,7 @@ def get_dashboard_data(iglesia, meses=None, mes_distribucion=None):
     ingresos_por_categoria = Movimiento.objects.filter(
         iglesia=iglesia,
         tipo='INGRESO',
-        fecha__year=int(año),
-        fecha__month=int(mes),
+        **rango_mes(mes_para_distribucion),
         anulado=False
     ).values('categoria_ingreso__nombre').annotate(
         total=Sum('monto')
@@ -540,12 +1240,98 @@ def get_dashboard_data(iglesia, meses=None, mes_distribucion=None):
     }
 
 
-def generar_reporte_movimientos_completo_pdf(iglesia, fecha_desde=None, fecha_hasta=None):
+ENCABEZADO_EXTRACTO = ['Fecha', 'Tipo', 'Categoría', 'Concepto', 'Monto', 'Saldo']
+ANCHOS_EXTRACTO = [0.9*inch, 0.8*inch, 1.2*inch, 2.2*inch, 1.0*inch, 1.0*inch]
+
+ESTILO_EXTRACTO = [
+    # Header
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 0), (-1, 0), 12),
+
+    # Body
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Fecha centrada
+    ('ALIGN', (1, 1), (1, -1), 'CENTER'),  # Tipo centrado
+    ('ALIGN', (4, 1), (4, -1), 'RIGHT'),   # Monto a la derecha
+    ('ALIGN', (5, 1), (5, -1), 'RIGHT'),   # Saldo a la derecha
+    ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 1), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+
+    # Líneas
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
+    ('LINEBELOW', (0, 0), (-1, 0), 2, colors.HexColor('#4f46e5')),
+
+    # Alternar colores de filas
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')]),
+]
+
+
+def _estilo_fila_transporte(fila):
+    return [
+        ('BACKGROUND', (0, fila), (-1, fila), colors.HexColor('#e0e7ff')),
+        ('FONTNAME', (0, fila), (-1, fila), 'Helvetica-Bold'),
+        ('SPAN', (0, fila), (4, fila)),
+        ('ALIGN', (0, fila), (4, fila), 'RIGHT'),
+    ]
+
+
+def _tabla_extracto(filas, saldo_anterior=None, saldo_a_transportar=None, etiqueta_saldo_anterior=None):
+    """
+    Tabla de una página del extracto de movimientos. saldo_anterior y
+    saldo_a_transportar agregan las filas de transporte al inicio y al final.
+    """
+    data = [ENCABEZADO_EXTRACTO]
+    estilo = list(ESTILO_EXTRACTO)
+
+    if saldo_anterior is not None:
+        estilo += _estilo_fila_transporte(len(data))
+        data.append([etiqueta_saldo_anterior or 'Saldo transportado', '', '', '', '', formato_pesos(saldo_anterior)])
+
+    data.extend(filas)
+
+    if saldo_a_transportar is not None:
+        estilo += _estilo_fila_transporte(len(data))
+        data.append(['Saldo a transportar', '', '', '', '', formato_pesos(saldo_a_transportar)])
+
+    tabla = Table(data, colWidths=ANCHOS_EXTRACTO, repeatRows=1)
+    tabla.setStyle(TableStyle(estilo))
+    return tabla
+
+
+def _filas_por_pagina_extracto(ancho, alto):
+    """
+    Cantidad de movimientos que entran en una tabla de extracto de `alto`
+    puntos junto con el encabezado y las dos filas de transporte. Mide una
+    tabla de muestra (todas las filas de movimientos tienen el mismo alto).
+    """
+    fila = ['00/00/0000', 'Ingreso', 'Categoría', 'Concepto', '$ 0,00', '$ 0,00']
+    _, alto_una = _tabla_extracto([fila], 0, 0).wrap(ancho, alto)
+    _, alto_dos = _tabla_extracto([fila, fila], 0, 0).wrap(ancho, alto)
+    alto_fila = alto_dos - alto_una
+    alto_fijo = alto_una - alto_fila
+
+    # Padding del frame de SimpleDocTemplate y una fila de margen
+    disponible = alto - 12 - alto_fijo
+    return max(1, int(disponible // alto_fila) - 1)
+
+
+def generar_reporte_movimientos_completo_pdf(iglesia, fecha_desde=None, fecha_hasta=None, filas_por_pagina=None):
     """
     Genera un PDF con todos los movimientos y saldo acumulado
     Similar a un extracto bancario
+    Los movimientos se leen por lotes y se arma una tabla por página;
+    filas_por_pagina=None la calcula según el alto disponible.
     """
     from core.models import Movimiento
+    from django.db.models.functions import Coalesce
+    from reportlab.platypus import PageBreak
     
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.75*inch)
@@ -625,76 +1411,70 @@ def generar_reporte_movimientos_completo_pdf(iglesia, fecha_desde=None, fecha_ha
     if fecha_hasta:
         movimientos = movimientos.filter(fecha__lte=fecha_hasta)
     
-    movimientos = movimientos.order_by('fecha', 'id')
+    movimientos = movimientos.annotate(
+        categoria=Coalesce('categoria_ingreso__nombre', 'categoria_egreso__nombre')
+    ).order_by('fecha', 'id').values('fecha', 'tipo', 'categoria', 'concepto', 'monto')
     
-    # Tabla de movimientos
-    data = [['Fecha', 'Tipo', 'Categoría', 'Concepto', 'Monto', 'Saldo']]
+    # Filas por tabla: la primera página comparte espacio con el encabezado
+    if filas_por_pagina:
+        filas_primera_pagina = filas_por_pagina
+    else:
+        alto_encabezado = sum(
+            elemento.wrap(doc.width, doc.height)[1] + elemento.getSpaceBefore() + elemento.getSpaceAfter()
+            for elemento in elements
+        )
+        filas_por_pagina = _filas_por_pagina_extracto(doc.width, doc.height)
+        filas_primera_pagina = _filas_por_pagina_extracto(doc.width, doc.height - alto_encabezado)
     
+    # Una tabla por página: el costo de armado crece linealmente con la cantidad
+    # de movimientos, y cada página abre y cierra con el saldo transportado
+    tipos = dict(Movimiento.TIPOS)
     saldo_acumulado = Decimal('0.00')
+    saldo_transporte = None
+    etiqueta_anterior = None
+    if fecha_desde:
+        # Los movimientos previos al período no se recorren: el saldo inicial sale del libro de saldos
+        saldo_acumulado = saldo_al(iglesia, fecha_desde)
+        saldo_transporte = saldo_acumulado
+        etiqueta_anterior = f"Saldo al {(fecha_desde - timedelta(days=1)).strftime('%d/%m/%Y')}"
+    capacidad = filas_primera_pagina
+    pagina = []
     
-    for mov in movimientos:
+    for mov in movimientos.iterator(chunk_size=EXPORTACION_CHUNK_SIZE):
+        if len(pagina) == capacidad:
+            elements.append(_tabla_extracto(pagina, saldo_transporte, saldo_acumulado, etiqueta_anterior))
+            elements.append(PageBreak())
+            saldo_transporte = saldo_acumulado
+            etiqueta_anterior = None
+            capacidad = filas_por_pagina
+            pagina = []
+        
         # Calcular saldo acumulado
-        if mov.tipo == 'INGRESO':
-            saldo_acumulado += mov.monto
+        if mov['tipo'] == 'INGRESO':
+            saldo_acumulado += mov['monto']
         else:  # EGRESO
-            saldo_acumulado -= mov.monto
-        
-        # Obtener categoría
-        categoria = mov.categoria_ingreso.nombre if mov.categoria_ingreso else mov.categoria_egreso.nombre
+            saldo_acumulado -= mov['monto']
         
         # Formatear monto con signo
-        monto_formateado = formato_pesos(mov.monto) if mov.tipo == 'INGRESO' else f"-{formato_pesos(mov.monto)}"
+        monto_formateado = formato_pesos(mov['monto']) if mov['tipo'] == 'INGRESO' else f"-{formato_pesos(mov['monto'])}"
         
         # Truncar concepto si es muy largo
-        concepto = mov.concepto[:40] + '...' if len(mov.concepto) > 40 else mov.concepto
+        concepto = mov['concepto'][:40] + '...' if len(mov['concepto']) > 40 else mov['concepto']
         
-        data.append([
-            mov.fecha.strftime('%d/%m/%Y'),
-            mov.get_tipo_display(),
-            categoria,
+        pagina.append([
+            mov['fecha'].strftime('%d/%m/%Y'),
+            tipos[mov['tipo']],
+            mov['categoria'] or '',
             concepto,
             monto_formateado,
             formato_pesos(saldo_acumulado)
         ])
     
     # Si no hay movimientos
-    if len(data) == 1:
-        data.append(['', '', 'No hay movimientos registrados', '', '', ''])
+    if not pagina:
+        pagina.append(['', '', 'No hay movimientos registrados', '', '', ''])
     
-    # Crear tabla
-    tabla = Table(data, colWidths=[0.9*inch, 0.8*inch, 1.2*inch, 2.2*inch, 1.0*inch, 1.0*inch])
-    
-    # Estilo de la tabla
-    tabla.setStyle(TableStyle([
-        # Header
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('TOPPADDING', (0, 0), (-1, 0), 12),
-        
-        # Body
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Fecha centrada
-        ('ALIGN', (1, 1), (1, -1), 'CENTER'),  # Tipo centrado
-        ('ALIGN', (4, 1), (4, -1), 'RIGHT'),   # Monto a la derecha
-        ('ALIGN', (5, 1), (5, -1), 'RIGHT'),   # Saldo a la derecha
-        ('VALIGN', (0, 1), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 1), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-        
-        # Líneas
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#d1d5db')),
-        ('LINEBELOW', (0, 0), (-1, 0), 2, colors.HexColor('#4f46e5')),
-        
-        # Alternar colores de filas
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f9fafb')]),
-    ]))
-    
-    elements.append(tabla)
+    elements.append(_tabla_extracto(pagina, saldo_transporte, etiqueta_saldo_anterior=etiqueta_anterior))
     
     # Resumen final
     elements.append(Spacer(1, 20))
@@ -718,19 +1498,179 @@ def generar_reporte_movimientos_completo_pdf(iglesia, fecha_desde=None, fecha_ha
     return buffer
 
 
-def generar_dashboard_pdf(iglesia, mes_seleccionado=None):
+# Filas leídas por lote al exportar movimientos
+EXPORTACION_CHUNK_SIZE = 2000
+
+
+def generar_excel_movimientos(movimientos):
+    """
+    Escribe los movimientos en un XLSX usando un workbook de solo escritura.
+    Las filas se leen por lotes con .iterator() y openpyxl las vuelca a disco
+    a medida que se agregan, así que la memoria no crece con la cantidad de
+    movimientos. Retorna un archivo temporal posicionado al inicio (se borra
+    al cerrarse).
+    """
+    import tempfile
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Movimientos")
+
+    # Anchos de columna (deben definirse antes de escribir filas)
+    for columna, ancho in zip('ABCDEF', (12, 10, 25, 50, 15, 15)):
+        ws.column_dimensions[columna].width = ancho
+
+    # Estilos
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="2C3E50", end_color="2C3E50", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    egreso_font = Font(bold=True, color="DC3545")  # Rojo
+    ingreso_font = Font(bold=True, color="198754")  # Verde
+
+    # Headers
+    headers = []
+    for header in ['Fecha', 'Tipo', 'Categoría', 'Concepto', 'Monto', 'Comprobante']:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        headers.append(cell)
+    ws.append(headers)
+
+    movimientos = movimientos.select_related('categoria_ingreso', 'categoria_egreso')
+
+    # Datos
+    for mov in movimientos.iterator(chunk_size=EXPORTACION_CHUNK_SIZE):
+        categoria = mov.categoria_ingreso or mov.categoria_egreso
+
+        # Monto: negativo para egresos, positivo para ingresos
+        if mov.tipo == 'EGRESO':
+            monto_cell = WriteOnlyCell(ws, value=-float(mov.monto))
+            monto_cell.font = egreso_font
+        else:
+            monto_cell = WriteOnlyCell(ws, value=float(mov.monto))
+            monto_cell.font = ingreso_font
+        monto_cell.number_format = '#,##0.00'
+
+        ws.append([
+            mov.fecha.strftime('%d/%m/%Y'),
+            mov.get_tipo_display(),
+            str(categoria),
+            mov.concepto,
+            monto_cell,
+            mov.comprobante_nro or '',
+        ])
+
+    archivo = tempfile.TemporaryFile()
+    wb.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def aplicar_filtros_movimientos(queryset, form):
     """
-    Genera un PDF del dashboard con gráficas, KPIs y saldos de cajas chicas
+    Aplica los filtros de FiltroMovimientosForm (mes, tipo, categoría y
+    búsqueda) a un queryset de Movimiento o MovimientoCajaChica.
+    El formulario debe estar validado; si no es válido se retorna el queryset sin cambios.
+    """
+    if not form.is_valid():
+        return queryset
+
+    if form.cleaned_data.get('mes'):
+        try:
+            queryset = queryset.filter(**rango_mes(form.cleaned_data['mes']))
+        except (ValueError, AttributeError):
+            pass
+
+    if form.cleaned_data.get('tipo'):
+        queryset = queryset.filter(tipo=form.cleaned_data['tipo'])
+
+    if form.cleaned_data.get('categoria'):
+        cat = form.cleaned_data['categoria']
+        if cat.startswith('ingreso_'):
+            cat_id = int(cat.split('_')[1])
+            queryset = queryset.filter(categoria_ingreso_id=cat_id)
+        elif cat.startswith('egreso_'):
+            cat_id = int(cat.split('_')[1])
+            queryset = queryset.filter(categoria_egreso_id=cat_id)
+
+    if form.cleaned_data.get('buscar'):
+        queryset = queryset.filter(
+            concepto__icontains=form.cleaned_data['buscar']
+        )
+
+    return queryset
+
+
+# Columnas de la exportación masiva (CSV / NDJSON)
+COLUMNAS_EXPORTACION = [
+    'id', 'fecha', 'tipo', 'categoria', 'concepto', 'monto', 'comprobante_nro', 'anulado'
+]
+
+
+def filas_exportacion(movimientos):
+    """
+    Genera un dict por movimiento leyendo el queryset por lotes con
+    .values().iterator() (cursor del lado del servidor en PostgreSQL), sin
+    instanciar modelos ni materializar el resultado.
+    """
+    from django.db.models.functions import Coalesce
+
+    filas = movimientos.annotate(
+        categoria=Coalesce('categoria_ingreso__nombre', 'categoria_egreso__nombre')
+    ).values(*COLUMNAS_EXPORTACION)
+
+    for fila in filas.iterator(chunk_size=EXPORTACION_CHUNK_SIZE):
+        fila['fecha'] = fila['fecha'].isoformat()
+        fila['monto'] = str(fila['monto'])
+        fila['comprobante_nro'] = fila['comprobante_nro'] or ''
+        yield fila
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: retorna la línea en lugar de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(movimientos):
+    """Genera el CSV de los movimientos línea por línea (para StreamingHttpResponse)"""
+    import csv
+
+    writer = csv.DictWriter(_Eco(), fieldnames=COLUMNAS_EXPORTACION)
+    yield writer.writeheader()
+    for fila in filas_exportacion(movimientos):
+        yield writer.writerow(fila)
+
+
+def exportar_ndjson(movimientos):
+    """Genera un objeto JSON por línea para cada movimiento (para StreamingHttpResponse)"""
+    import json
+
+    for fila in filas_exportacion(movimientos):
+        yield json.dumps(fila, ensure_ascii=False) + '\n'
+
+
+# Formatos de exportación masiva: extensión -> (generador, content type)
+FORMATOS_EXPORTACION = {
+    'csv': (exportar_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (exportar_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def generar_dashboard_pdf(iglesia, mes_seleccionado=None, dpi=None, escala_graficas=None, motor_graficas=None):
+    """
+    Genera un PDF del dashboard con gráficas, KPIs y saldos de cajas chicas.
+    Las gráficas se generan en memoria con el motor indicado ('matplotlib' o
+    'reportlab'); motor_graficas, dpi y escala_graficas toman por defecto
+    REPORTES_GRAFICAS_MOTOR, REPORTES_GRAFICAS_DPI y REPORTES_GRAFICAS_ESCALA.
     """
     from datetime import datetime
     from calendar import monthrange
-    import matplotlib
-    matplotlib.use('Agg')  # Backend sin interfaz gráfica
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_pdf import PdfPages
-    from reportlab.platypus import Image, PageBreak
-    import tempfile
-    import os
+    from reportlab.platypus import PageBreak
 
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.75*inch)
@@ -798,10 +1738,6 @@ def generar_dashboard_pdf(iglesia, mes_seleccionado=None):
     fecha_sel = datetime(int(año), int(mes), 1)
     mes_nombre = formato_mes(fecha_sel, corto=False)
 
-    # Identificar el mes actual para excluirlo de los cálculos
-    mes_actual = fecha_actual.month
-    año_actual = fecha_actual.year
-
     info_style = ParagraphStyle(
         'InfoStyle',
         parent=styles['Normal'],
@@ -821,43 +1757,29 @@ def generar_dashboard_pdf(iglesia, mes_seleccionado=None):
     from core.models import Movimiento, CajaChica
     from django.db.models import Sum
 
-    # Calcular fecha límite: último día del mes seleccionado
-    año_int, mes_int = int(año), int(mes)
-    ultimo_dia = monthrange(año_int, mes_int)[1]
-    fecha_limite = datetime(año_int, mes_int, ultimo_dia, 23, 59, 59)
-
-    # Calcular saldo total hasta el último día del mes seleccionado
-    total_ingresos_historico = Movimiento.objects.filter(
-        iglesia=iglesia,
-        tipo='INGRESO',
-        anulado=False,
-        fecha__lte=fecha_limite
-    ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
+    # Último día del mes seleccionado
+    ultimo_dia = monthrange(int(año), int(mes))[1]
 
-    total_egresos_historico = Movimiento.objects.filter(
+    # Saldo total hasta el último día del mes seleccionado y totales del mes, en una consulta
+    rango = rango_mes(mes_seleccionado)
+    del_mes = Q(fecha__gte=rango['fecha__gte'])
+    totales = Movimiento.objects.filter(
         iglesia=iglesia,
-        tipo='EGRESO',
         anulado=False,
-        fecha__lte=fecha_limite
-    ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-    saldo_final = total_ingresos_historico - total_egresos_historico
-
-    # Totales del mes seleccionado
-    movimientos_mes = Movimiento.objects.filter(
-        iglesia=iglesia,
-        fecha__year=int(año),
-        fecha__month=int(mes),
-        anulado=False
+        fecha__lt=rango['fecha__lt']
+    ).aggregate(
+        ingresos_historico=Sum('monto', filter=Q(tipo='INGRESO')),
+        egresos_historico=Sum('monto', filter=Q(tipo='EGRESO')),
+        ingresos_mes=Sum('monto', filter=Q(tipo='INGRESO') & del_mes),
+        egresos_mes=Sum('monto', filter=Q(tipo='EGRESO') & del_mes),
     )
 
-    total_ingresos_mes = movimientos_mes.filter(tipo='INGRESO').aggregate(
-        total=Sum('monto')
-    )['total'] or Decimal('0.00')
+    total_ingresos_historico = totales['ingresos_historico'] or Decimal('0.00')
+    total_egresos_historico = totales['egresos_historico'] or Decimal('0.00')
+    saldo_final = total_ingresos_historico - total_egresos_historico
 
-    total_egresos_mes = movimientos_mes.filter(tipo='EGRESO').aggregate(
-        total=Sum('monto')
-    )['total'] or Decimal('0.00')
+    total_ingresos_mes = totales['ingresos_mes'] or Decimal('0.00')
+    total_egresos_mes = totales['egresos_mes'] or Decimal('0.00')
 
     balance_mes = total_ingresos_mes - total_egresos_mes
 
@@ -896,81 +1818,31 @@ def generar_dashboard_pdf(iglesia, mes_seleccionado=None):
     elements.append(Spacer(1, 20))
 
     # Obtener cajas chicas para usar después
-    cajas_chicas = CajaChica.objects.filter(iglesia=iglesia, activa=True).order_by('moneda', 'nombre')
+    cajas_chicas = list(
+        CajaChica.objects.filter(iglesia=iglesia, activa=True).order_by('moneda', 'nombre')
+    )
 
-    # Calcular datos de cajas para mostrar al final
+    # Calcular datos de cajas para mostrar al final (una sola consulta para todas las cajas)
     cajas_por_moneda = None
     saldos_por_moneda = None
-    if cajas_chicas.exists():
-        from core.models import MovimientoCajaChica, TransferenciaCajaChica
+    if cajas_chicas:
         from collections import defaultdict
 
+        meses_evolucion, resumen_cajas = resumen_mensual_cajas(
+            cajas_chicas, mes_seleccionado, hoy=fecha_actual.date()
+        )
+
         # Agrupar cajas por moneda (calcular ahora, mostrar después)
         cajas_por_moneda = defaultdict(list)
         saldos_por_moneda = {}
 
         for caja in cajas_chicas:
-            # Calcular saldo de la caja hasta la fecha límite
-            # Las transferencias ya están incluidas como movimientos de ingreso/egreso
-            ingresos_caja = MovimientoCajaChica.objects.filter(
-                caja_chica=caja,
-                tipo='INGRESO',
-                anulado=False,
-                fecha__lte=fecha_limite
-            ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-            egresos_caja = MovimientoCajaChica.objects.filter(
-                caja_chica=caja,
-                tipo='EGRESO',
-                anulado=False,
-                fecha__lte=fecha_limite
-            ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-            saldo_caja = caja.saldo_inicial + ingresos_caja - egresos_caja
-
-            # Calcular promedio mensual del año completo (igual que en el dashboard web)
-            # Obtener todos los movimientos del año del mes seleccionado
-            # EXCLUIR el mes actual porque aún no está completo
-            ingresos_por_mes = []
-            egresos_por_mes = []
-
-            for mes_num in range(1, 13):
-                # Excluir el mes actual si es del año actual
-                if año_int == año_actual and mes_num == mes_actual:
-                    continue
-
-                ing_mes = MovimientoCajaChica.objects.filter(
-                    caja_chica=caja,
-                    tipo='INGRESO',
-                    anulado=False,
-                    fecha__year=año_int,
-                    fecha__month=mes_num
-                ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-                egr_mes = MovimientoCajaChica.objects.filter(
-                    caja_chica=caja,
-                    tipo='EGRESO',
-                    anulado=False,
-                    fecha__year=año_int,
-                    fecha__month=mes_num
-                ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-                if ing_mes > 0 or egr_mes > 0:
-                    ingresos_por_mes.append(ing_mes)
-                    egresos_por_mes.append(egr_mes)
-
-            # Calcular promedio solo de los meses con movimientos
-            if ingresos_por_mes:
-                promedio_ingresos = sum(ingresos_por_mes) / len(ingresos_por_mes)
-            else:
-                promedio_ingresos = Decimal('0.00')
-
-            if egresos_por_mes:
-                promedio_egresos = sum(egresos_por_mes) / len(egresos_por_mes)
-            else:
-                promedio_egresos = Decimal('0.00')
-
-            cajas_por_moneda[caja.moneda].append((caja.nombre, saldo_caja, promedio_ingresos, promedio_egresos))
+            datos_caja = resumen_cajas[caja.pk]
+            saldo_caja = datos_caja['saldo']
+
+            cajas_por_moneda[caja.moneda].append(
+                (caja.nombre, saldo_caja, datos_caja['promedio_ingresos'], datos_caja['promedio_egresos'])
+            )
             if caja.moneda not in saldos_por_moneda:
                 saldos_por_moneda[caja.moneda] = Decimal('0.00')
             saldos_por_moneda[caja.moneda] += saldo_caja
@@ -978,340 +1850,176 @@ def generar_dashboard_pdf(iglesia, mes_seleccionado=None):
     # Obtener datos para gráficas generales
     dashboard_data = get_dashboard_data(iglesia, mes_distribucion=mes_seleccionado)
 
-    # Configurar matplotlib para español y mejor visualización
-    import matplotlib
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
-    import tempfile
-
-    plt.rcParams['font.size'] = 10
-    plt.rcParams['axes.labelsize'] = 10
-    plt.rcParams['axes.titlesize'] = 12
-    plt.rcParams['xtick.labelsize'] = 9
-    plt.rcParams['ytick.labelsize'] = 9
-    plt.rcParams['legend.fontsize'] = 8
-
-    # Crear archivo temporal para las gráficas
-    temp_files = []
-
-    try:
-        # Gráfica 1: Evolución de Saldos (General)
-        elements.append(PageBreak())
-        elements.append(Paragraph("Evolución de Saldos", section_style))
-
-        fig1, ax1 = plt.subplots(figsize=(8, 4))
-
-        ax1.plot(dashboard_data['meses_labels'], dashboard_data['saldos_data'],
-                marker='o', linewidth=2, color='#6366f1', markersize=6, label='Saldo')
-        ax1.fill_between(range(len(dashboard_data['meses_labels'])), dashboard_data['saldos_data'],
-                         alpha=0.2, color='#6366f1')
-
-        ax1.set_xlabel('Mes')
-        ax1.set_ylabel('Saldo ($)')
-        ax1.set_title('Evolución del Saldo Total')
-        ax1.set_xticks(range(len(dashboard_data['meses_labels'])))
-        ax1.set_xticklabels(dashboard_data['meses_labels'], rotation=45, ha='right')
-        ax1.legend()
-        ax1.grid(axis='y', alpha=0.3)
-
-        # Formatear eje Y con separador de miles
-        ax1.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-
-        plt.tight_layout()
-
-        temp1 = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-        temp_files.append(temp1.name)
-        fig1.savefig(temp1.name, dpi=150, bbox_inches='tight')
-        plt.close(fig1)
-
-        img1 = Image(temp1.name, width=6.5*inch, height=3.25*inch)
-        elements.append(img1)
-        elements.append(Spacer(1, 15))
-
-        # Gráfica 2: Evolución de Ingresos y Egresos (líneas)
-        elements.append(Paragraph("Evolución de Ingresos y Egresos", section_style))
-
-        fig2, ax2 = plt.subplots(figsize=(8, 4))
-
-        ax2.plot(dashboard_data['meses_labels'], dashboard_data['ingresos_data'],
-                marker='o', linewidth=2, color='#10b981', markersize=6, label='Ingresos')
-        ax2.plot(dashboard_data['meses_labels'], dashboard_data['egresos_data'],
-                marker='o', linewidth=2, color='#ef4444', markersize=6, label='Egresos')
-
-        ax2.set_xlabel('Mes')
-        ax2.set_ylabel('Monto ($)')
-        ax2.set_title('Ingresos vs Egresos por Mes')
-        ax2.set_xticks(range(len(dashboard_data['meses_labels'])))
-        ax2.set_xticklabels(dashboard_data['meses_labels'], rotation=45, ha='right')
-        ax2.legend()
-        ax2.grid(axis='y', alpha=0.3)
-
-        # Formatear eje Y con separador de miles
-        ax2.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-
-        plt.tight_layout()
-
-        temp2 = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-        temp_files.append(temp2.name)
-        fig2.savefig(temp2.name, dpi=150, bbox_inches='tight')
-        plt.close(fig2)
-
-        img2 = Image(temp2.name, width=6.5*inch, height=3.25*inch)
-        elements.append(img2)
-        elements.append(Spacer(1, 15))
-
-        # Gráfica 3: Balance Mensual
-        elements.append(PageBreak())
-        elements.append(Paragraph("Balance Mensual", section_style))
-
-        # Reducir tamaño para que quepa con Distribución
-        fig3, ax3 = plt.subplots(figsize=(7.5, 3))
-        colors_balance = ['#10b981' if b >= 0 else '#ef4444' for b in dashboard_data['balance_data']]
-
-        ax3.bar(dashboard_data['meses_labels'], dashboard_data['balance_data'],
-                color=colors_balance, alpha=0.8)
-        ax3.axhline(y=0, color='black', linestyle='-', linewidth=0.8)
-        ax3.set_xlabel('Mes', fontsize=9)
-        ax3.set_ylabel('Balance ($)', fontsize=9)
-        ax3.set_title('Balance Mensual (Ingresos - Egresos)', fontsize=10)
-        ax3.set_xticklabels(dashboard_data['meses_labels'], rotation=45, ha='right', fontsize=8)
-        ax3.tick_params(axis='y', labelsize=8)
-        ax3.grid(axis='y', alpha=0.3)
-        ax3.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-
-        plt.tight_layout()
-
-        temp3 = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-        temp_files.append(temp3.name)
-        fig3.savefig(temp3.name, dpi=150, bbox_inches='tight')
-        plt.close(fig3)
-
-        img3 = Image(temp3.name, width=6.5*inch, height=2.8*inch)
-        elements.append(img3)
+    from core.graficas import obtener_motor_graficas
+
+    graficas = obtener_motor_graficas(motor_graficas, dpi=dpi, escala=escala_graficas)
+
+    # Gráfica 1: Evolución de Saldos (General)
+    elements.append(PageBreak())
+    elements.append(Paragraph("Evolución de Saldos", section_style))
+    elements.append(graficas.lineas(
+        dashboard_data['meses_labels'],
+        [('Saldo', dashboard_data['saldos_data'], '#6366f1')],
+        titulo='Evolución del Saldo Total',
+        etiqueta_y='Saldo ($)',
+        width=6.5*inch, height=3.25*inch, figsize=(8, 4),
+        relleno=True
+    ))
+    elements.append(Spacer(1, 15))
+
+    # Gráfica 2: Evolución de Ingresos y Egresos (líneas)
+    elements.append(Paragraph("Evolución de Ingresos y Egresos", section_style))
+    elements.append(graficas.lineas(
+        dashboard_data['meses_labels'],
+        [
+            ('Ingresos', dashboard_data['ingresos_data'], '#10b981'),
+            ('Egresos', dashboard_data['egresos_data'], '#ef4444'),
+        ],
+        titulo='Ingresos vs Egresos por Mes',
+        etiqueta_y='Monto ($)',
+        width=6.5*inch, height=3.25*inch, figsize=(8, 4)
+    ))
+    elements.append(Spacer(1, 15))
+
+    # Gráfica 3: Balance Mensual (reducida para que quepa con Distribución)
+    elements.append(PageBreak())
+    elements.append(Paragraph("Balance Mensual", section_style))
+    elements.append(graficas.barras_balance(
+        dashboard_data['meses_labels'],
+        dashboard_data['balance_data'],
+        titulo='Balance Mensual (Ingresos - Egresos)',
+        etiqueta_y='Balance ($)',
+        width=6.5*inch, height=2.8*inch, figsize=(7.5, 3)
+    ))
+    elements.append(Spacer(1, 12))
+
+    # Gráfica 4: Distribución de Egresos por Categoría (Dona)
+    if dashboard_data['categorias_labels'] and dashboard_data['categorias_data']:
+        # Sin PageBreak para que quede en la misma página que Balance Mensual
+        elements.append(Paragraph(f"Distribución de Egresos por Categoría - {mes_nombre}", section_style))
+
+        # Tomar solo las top 10 categorías
+        top_n = 10
+        if len(dashboard_data['categorias_labels']) > top_n:
+            labels = dashboard_data['categorias_labels'][:top_n]
+            data = dashboard_data['categorias_data'][:top_n]
+            otros = sum(dashboard_data['categorias_data'][top_n:])
+            if otros > 0:
+                labels.append('Otros')
+                data.append(otros)
+        else:
+            labels = dashboard_data['categorias_labels']
+            data = dashboard_data['categorias_data']
+
+        # Colores para el gráfico de dona
+        colors_dona = ['#ff6384', '#36a2eb', '#ffce56', '#4bc0c0', '#9966ff', '#ff9f40',
+                      '#ff6384', '#c9cbcf', '#4bc0c0', '#ff6384', '#36a2eb']
+
+        # Aumentar tamaño aprovechando el margen disponible
+        elements.append(graficas.dona(
+            labels, data, colors_dona,
+            titulo='Distribución de Egresos por Categoría',
+            width=6.5*inch, height=3.8*inch, figsize=(7.5, 4.2)
+        ))
         elements.append(Spacer(1, 12))
 
-        # Gráfica 4: Distribución de Egresos por Categoría (Dona)
-        if dashboard_data['categorias_labels'] and dashboard_data['categorias_data']:
-            # Sin PageBreak para que quede en la misma página que Balance Mensual
-            elements.append(Paragraph(f"Distribución de Egresos por Categoría - {mes_nombre}", section_style))
-
-            # Aumentar tamaño aprovechando el margen disponible
-            fig4, ax4 = plt.subplots(figsize=(7.5, 4.2))
-
-            # Tomar solo las top 10 categorías
-            top_n = 10
-            if len(dashboard_data['categorias_labels']) > top_n:
-                labels = dashboard_data['categorias_labels'][:top_n]
-                data = dashboard_data['categorias_data'][:top_n]
-                otros = sum(dashboard_data['categorias_data'][top_n:])
-                if otros > 0:
-                    labels.append('Otros')
-                    data.append(otros)
-            else:
-                labels = dashboard_data['categorias_labels']
-                data = dashboard_data['categorias_data']
-
-            # Colores para el gráfico de dona
-            colors_dona = ['#ff6384', '#36a2eb', '#ffce56', '#4bc0c0', '#9966ff', '#ff9f40',
-                          '#ff6384', '#c9cbcf', '#4bc0c0', '#ff6384', '#36a2eb']
-
-            # Calcular porcentajes
-            total = sum(data)
-            percentages = [(value / total * 100) if total > 0 else 0 for value in data]
-
-            # Crear gráfico de dona
-            wedges, texts, autotexts = ax4.pie(data, labels=None, autopct='%1.1f%%',
-                                                colors=colors_dona[:len(data)], startangle=90,
-                                                pctdistance=0.85, wedgeprops=dict(width=0.5))
-
-            ax4.set_title('Distribución de Egresos por Categoría')
-
-            # Mejorar el formato de los porcentajes
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontsize(9)
-                autotext.set_weight('bold')
-
-            # Crear leyenda con nombres y porcentajes
-            legend_labels = [f'{label}: {pct:.1f}%' for label, pct in zip(labels, percentages)]
-            ax4.legend(legend_labels, loc='center left', bbox_to_anchor=(1, 0, 0.5, 1),
-                      fontsize=9)
-
-            plt.tight_layout()
-
-            temp4 = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            temp_files.append(temp4.name)
-            fig4.savefig(temp4.name, dpi=150, bbox_inches='tight')
-            plt.close(fig4)
-
-            # Aumentar tamaño aprovechando el margen disponible
-            img4 = Image(temp4.name, width=6.5*inch, height=3.8*inch)
-            elements.append(img4)
+    # ==================================================================
+    # SECCIÓN DE CAJAS CHICAS AL FINAL
+    # ==================================================================
+    if cajas_chicas and cajas_por_moneda:
+        elements.append(PageBreak())
+        elements.append(Paragraph(f"Saldos de Cajas Chicas al {ultimo_dia}/{mes}/{año}", section_style))
+
+        # Crear tablas separadas por moneda
+        for moneda in sorted(cajas_por_moneda.keys()):
+            # Título de la moneda
+            moneda_nombres = {'ARS': 'Peso Argentino ($)', 'USD': 'Dólar Estadounidense (US$)', 'EUR': 'Euro (€)'}
+            elements.append(Spacer(1, 10))
+            elements.append(Paragraph(f"<b>Cajas en {moneda_nombres.get(moneda, moneda)}</b>", section_style))
+
+            caja_data = [['CAJA', 'SALDO', 'PROM. ING.', 'PROM. EGR.']]
+            for nombre_caja, saldo, prom_ing, prom_egr in cajas_por_moneda[moneda]:
+                caja_data.append([
+                    nombre_caja,
+                    formato_moneda(saldo, moneda),
+                    formato_moneda(prom_ing, moneda),
+                    formato_moneda(prom_egr, moneda)
+                ])
+
+            # Fila de totales (solo saldo tiene total, promedios van vacíos)
+            caja_data.append([f'TOTAL {moneda}', formato_moneda(saldos_por_moneda[moneda], moneda), '-', '-'])
+
+            caja_table = Table(caja_data, colWidths=[2.5*inch, 1.5*inch, 1.25*inch, 1.25*inch])
+            caja_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10b981')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('TOPPADDING', (0, 0), (-1, 0), 12),
+                ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -2), 9),
+                ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cbd5e1')),
+                ('TOPPADDING', (0, 1), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+                ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#d1fae5')),
+                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, -1), (-1, -1), 10),
+            ]))
+
+            elements.append(caja_table)
+            elements.append(Spacer(1, 15))
+
+        # Gráficas de evolución de saldos de cajas chicas por moneda
+        cajas_por_moneda_graficas = defaultdict(list)
+        for caja in cajas_chicas:
+            cajas_por_moneda_graficas[caja.moneda].append(caja)
+
+        # Últimos 12 meses completos (excluyendo el mes actual)
+        meses_labels = [fecha_mes.strftime('%b %y') for fecha_mes in meses_evolucion]
+
+        # Crear una gráfica por moneda
+        primera_grafica = True
+        for moneda in sorted(cajas_por_moneda_graficas.keys()):
+            cajas_moneda = cajas_por_moneda_graficas[moneda]
+
+            # Saldo acumulado al cierre de cada mes
+            saldos_por_caja = {
+                caja.nombre: [float(saldo) for saldo in resumen_cajas[caja.pk]['evolucion']]
+                for caja in cajas_moneda
+            }
+
+            # Crear la gráfica - solo PageBreak en la primera
+            if primera_grafica:
+                elements.append(PageBreak())
+                primera_grafica = False
+
+            moneda_nombres_graf = {'ARS': 'Peso Argentino ($)', 'USD': 'Dólar Estadounidense (US$)', 'EUR': 'Euro (€)'}
+            titulo_grafica = f"Evolución de Saldos - Cajas en {moneda_nombres_graf.get(moneda, moneda)}"
+            elements.append(Paragraph(titulo_grafica, section_style))
+
+            # Reducir altura para que quepan 2 gráficas en una página
+            simbolo_moneda = {'ARS': '$', 'USD': 'US$', 'EUR': '€'}[moneda]
+            colores = ['#6366f1', '#10b981', '#ef4444', '#f59e0b', '#8b5cf6', '#ec4899', '#14b8a6']
+            img_graf = graficas.lineas(
+                meses_labels,
+                [
+                    (nombre_caja, saldos, colores[idx % len(colores)])
+                    for idx, (nombre_caja, saldos) in enumerate(saldos_por_caja.items())
+                ],
+                titulo=f'Evolución de Saldos (Últimos 12 meses) - {moneda}',
+                etiqueta_y=f'Saldo ({simbolo_moneda})',
+                width=6.5*inch, height=2.8*inch, figsize=(7.5, 3),
+                simbolo=simbolo_moneda,
+                compacta=True
+            )
+            elements.append(img_graf)
             elements.append(Spacer(1, 12))
 
-        # ==================================================================
-        # SECCIÓN DE CAJAS CHICAS AL FINAL
-        # ==================================================================
-        if cajas_chicas.exists() and cajas_por_moneda:
-            elements.append(PageBreak())
-            elements.append(Paragraph(f"Saldos de Cajas Chicas al {ultimo_dia}/{mes}/{año}", section_style))
-
-            # Crear tablas separadas por moneda
-            for moneda in sorted(cajas_por_moneda.keys()):
-                # Título de la moneda
-                moneda_nombres = {'ARS': 'Peso Argentino ($)', 'USD': 'Dólar Estadounidense (US$)', 'EUR': 'Euro (€)'}
-                elements.append(Spacer(1, 10))
-                elements.append(Paragraph(f"<b>Cajas en {moneda_nombres.get(moneda, moneda)}</b>", section_style))
-
-                caja_data = [['CAJA', 'SALDO', 'PROM. ING.', 'PROM. EGR.']]
-                for nombre_caja, saldo, prom_ing, prom_egr in cajas_por_moneda[moneda]:
-                    caja_data.append([
-                        nombre_caja,
-                        formato_moneda(saldo, moneda),
-                        formato_moneda(prom_ing, moneda),
-                        formato_moneda(prom_egr, moneda)
-                    ])
-
-                # Fila de totales (solo saldo tiene total, promedios van vacíos)
-                caja_data.append([f'TOTAL {moneda}', formato_moneda(saldos_por_moneda[moneda], moneda), '-', '-'])
-
-                caja_table = Table(caja_data, colWidths=[2.5*inch, 1.5*inch, 1.25*inch, 1.25*inch])
-                caja_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10b981')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('TOPPADDING', (0, 0), (-1, 0), 12),
-                    ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -2), 9),
-                    ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cbd5e1')),
-                    ('TOPPADDING', (0, 1), (-1, -1), 8),
-                    ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
-                    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#d1fae5')),
-                    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, -1), (-1, -1), 10),
-                ]))
-
-                elements.append(caja_table)
-                elements.append(Spacer(1, 15))
-
-            # Gráficas de evolución de saldos de cajas chicas por moneda
-            from core.models import MovimientoCajaChica
-            from dateutil.relativedelta import relativedelta
-            cajas_por_moneda_graficas = defaultdict(list)
-            for caja in cajas_chicas:
-                cajas_por_moneda_graficas[caja.moneda].append(caja)
-
-            # Crear una gráfica por moneda
-            primera_grafica = True
-            for moneda in sorted(cajas_por_moneda_graficas.keys()):
-                cajas_moneda = cajas_por_moneda_graficas[moneda]
-
-                # Preparar datos para la gráfica
-                meses_labels = []
-                saldos_por_caja = {caja.nombre: [] for caja in cajas_moneda}
-
-                # Calcular los últimos 12 meses completos (excluyendo el mes actual)
-                fecha_inicio_graf = fecha_actual - relativedelta(months=12)
-                fecha_inicio_graf = datetime(fecha_inicio_graf.year, fecha_inicio_graf.month, 1)
-
-                for i in range(12):
-                    fecha_mes = fecha_inicio_graf + relativedelta(months=i)
-
-                    # Excluir el mes actual
-                    if fecha_mes.year == año_actual and fecha_mes.month == mes_actual:
-                        continue
-
-                    meses_labels.append(fecha_mes.strftime('%b %y'))
-
-                    for caja in cajas_moneda:
-                        # Calcular saldo acumulado hasta fin de cada mes
-                        ultimo_dia_mes = monthrange(fecha_mes.year, fecha_mes.month)[1]
-                        fecha_limite_mes = datetime(fecha_mes.year, fecha_mes.month, ultimo_dia_mes, 23, 59, 59)
-
-                        ingresos_acum = MovimientoCajaChica.objects.filter(
-                            caja_chica=caja,
-                            tipo='INGRESO',
-                            anulado=False,
-                            fecha__lte=fecha_limite_mes
-                        ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-                        egresos_acum = MovimientoCajaChica.objects.filter(
-                            caja_chica=caja,
-                            tipo='EGRESO',
-                            anulado=False,
-                            fecha__lte=fecha_limite_mes
-                        ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-                        saldo_mes = float(caja.saldo_inicial + ingresos_acum - egresos_acum)
-                        saldos_por_caja[caja.nombre].append(saldo_mes)
-
-                # Crear la gráfica - solo PageBreak en la primera
-                if primera_grafica:
-                    elements.append(PageBreak())
-                    primera_grafica = False
-
-                moneda_nombres_graf = {'ARS': 'Peso Argentino ($)', 'USD': 'Dólar Estadounidense (US$)', 'EUR': 'Euro (€)'}
-                titulo_grafica = f"Evolución de Saldos - Cajas en {moneda_nombres_graf.get(moneda, moneda)}"
-                elements.append(Paragraph(titulo_grafica, section_style))
-
-                # Reducir tamaño de figura para que quepan 2 en una página
-                fig, ax = plt.subplots(figsize=(7.5, 3))
-
-                # Colores para cada caja
-                colores = ['#6366f1', '#10b981', '#ef4444', '#f59e0b', '#8b5cf6', '#ec4899', '#14b8a6']
-
-                for idx, (nombre_caja, saldos) in enumerate(saldos_por_caja.items()):
-                    color = colores[idx % len(colores)]
-                    ax.plot(meses_labels, saldos, marker='o', linewidth=2,
-                           markersize=4, label=nombre_caja, color=color)
-
-                ax.set_xlabel('Mes', fontsize=9)
-                simbolo_moneda = {'ARS': '$', 'USD': 'US$', 'EUR': '€'}[moneda]
-                ax.set_ylabel(f'Saldo ({simbolo_moneda})', fontsize=9)
-                ax.set_title(f'Evolución de Saldos (Últimos 12 meses) - {moneda}', fontsize=10)
-                ax.set_xticks(range(len(meses_labels)))
-                ax.set_xticklabels(meses_labels, rotation=45, ha='right', fontsize=8)
-                ax.tick_params(axis='y', labelsize=8)
-
-                # Posicionar leyenda debajo de la gráfica
-                ax.legend(loc='upper center', bbox_to_anchor=(0.5, -0.20),
-                         ncol=min(4, len(saldos_por_caja)), fontsize=7, frameon=True)
-                ax.grid(axis='y', alpha=0.3, linestyle='--')
-
-                # Formatear eje Y según la moneda
-                if moneda == 'USD':
-                    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'US${x:,.0f}'))
-                elif moneda == 'EUR':
-                    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-                else:
-                    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.0f}'))
-
-                plt.tight_layout()
-
-                temp_graf = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-                temp_files.append(temp_graf.name)
-                fig.savefig(temp_graf.name, dpi=150, bbox_inches='tight')
-                plt.close(fig)
-
-                # Reducir altura para que quepan 2 gráficas en una página
-                img_graf = Image(temp_graf.name, width=6.5*inch, height=2.8*inch)
-                elements.append(img_graf)
-                elements.append(Spacer(1, 12))
-
-        # Construir PDF con números de página
-        doc.build(elements, onFirstPage=add_page_number, onLaterPages=add_page_number)
-
-    finally:
-        # Limpiar archivos temporales
-        for temp_file in temp_files:
-            try:
-                os.unlink(temp_file)
-            except:
-                pass
+    # Construir PDF con números de página
+    doc.build(elements, onFirstPage=add_page_number, onLaterPages=add_page_number)
 
     buffer.seek(0)
     return buffer
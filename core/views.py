@@ -2,9 +2,10 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
 from django.views.generic import TemplateView, CreateView, ListView, UpdateView
 from django.urls import reverse_lazy
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.db.models import Sum, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -14,7 +15,11 @@ from decimal import Decimal
 from core.models import Movimiento, SaldoMensual, CategoriaIngreso, CategoriaEgreso, Iglesia
 from core.forms import MovimientoForm, FiltroMovimientosForm, RegistroForm, CategoriaIngresoForm, CategoriaEgresoForm
 from core.forms_google import RegistroIglesiaGoogleForm
-from core.utils import formato_pesos, calcular_saldo_mes, generar_reporte_pdf, get_dashboard_data, formato_mes
+from core.utils import formato_pesos, calcular_saldo_mes, get_dashboard_data, formato_mes, rango_mes
+from core.utils import aplicar_filtros_movimientos
+from core.cache import clave_datos
+from core.reportes import encolar_reporte
+from core.views_reportes import responder_job
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
@@ -206,10 +211,7 @@ def registro_con_codigo_view(request):
                     request.user.save()
 
                 # Verificar si ya está asignado a esta caja
-                if UsuarioCajaChica.objects.filter(
-                    usuario=request.user,
-                    caja_chica=codigo_obj.caja_chica
-                ).exists():
+                if codigo_obj.caja_chica_id in request.user.asignaciones_caja:
                     messages.warning(request, 'Ya estás asignado a esta caja')
                     return redirect('dashboard')
 
@@ -221,6 +223,7 @@ def registro_con_codigo_view(request):
                     puede_aprobar=(codigo_obj.rol == 'TESORERO_CAJA'),
                     asignado_por=codigo_obj.creado_por
                 )
+                request.user.olvidar_permisos_caja()
 
                 # Marcar código como usado
                 codigo_obj.usar_codigo(request.user)
@@ -276,11 +279,9 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         saldo_final = total_ingresos_historico - total_egresos_historico
 
         # Totales del mes SELECCIONADO (puede ser diferente al actual, excluye anulados)
-        año, mes = mes_seleccionado.split('-')
         movimientos_mes = Movimiento.objects.filter(
             iglesia=iglesia,
-            fecha__year=int(año),
-            fecha__month=int(mes),
+            **rango_mes(mes_seleccionado),
             anulado=False
         )
 
@@ -343,7 +344,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # Si es usuario solo de caja (no tiene rol de iglesia), mostrar solo sus cajas
         if self.request.user.es_usuario_solo_caja:
             context['mostrar_movimientos'] = False
-            context['cajas_usuario'] = self.request.user.cajas_asignadas.select_related('caja_chica').all()
+            context['cajas_usuario'] = list(self.request.user.asignaciones_caja.values())
             context['es_usuario_caja'] = True
         else:
             context['mostrar_movimientos'] = True
@@ -351,15 +352,12 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
         # Si es ADMIN, mostrar todas las cajas de la iglesia
         if self.request.user.rol == 'ADMIN':
+            # El saldo actual de cada caja está materializado en CajaChica.saldo_actual
             cajas_chicas = CajaChica.objects.filter(
                 iglesia=iglesia,
                 activa=True
             ).order_by('nombre')
 
-            # Agregar saldo actual de cada caja
-            for caja in cajas_chicas:
-                caja.saldo_actual = caja.calcular_saldo_actual()
-
             context['cajas_chicas'] = cajas_chicas
             context['puede_gestionar_cajas'] = True
 
@@ -489,36 +487,7 @@ class MovimientoListView(AccesoMovimientosRequiredMixin, LoginRequiredMixin, Lis
             iglesia=self.request.user.iglesia
         )
 
-        if form.is_valid():
-            if form.cleaned_data.get('mes'):
-                mes_str = form.cleaned_data['mes']
-                try:
-                    año, mes = mes_str.split('-')
-                    queryset = queryset.filter(
-                        fecha__year=int(año),
-                        fecha__month=int(mes)
-                    )
-                except (ValueError, AttributeError):
-                    pass
-
-            if form.cleaned_data.get('tipo'):
-                queryset = queryset.filter(tipo=form.cleaned_data['tipo'])
-
-            if form.cleaned_data.get('categoria'):
-                cat = form.cleaned_data['categoria']
-                if cat.startswith('ingreso_'):
-                    cat_id = int(cat.split('_')[1])
-                    queryset = queryset.filter(categoria_ingreso_id=cat_id)
-                elif cat.startswith('egreso_'):
-                    cat_id = int(cat.split('_')[1])
-                    queryset = queryset.filter(categoria_egreso_id=cat_id)
-
-            if form.cleaned_data.get('buscar'):
-                queryset = queryset.filter(
-                    concepto__icontains=form.cleaned_data['buscar']
-                )
-
-        return queryset
+        return aplicar_filtros_movimientos(queryset, form)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -572,17 +541,12 @@ def generar_reporte_pdf_view(request):
                 messages.error(request, 'No tiene permisos para generar reportes')
                 return redirect('dashboard')
 
-    iglesia = request.user.iglesia
     año_mes = request.GET.get('mes', timezone.now().strftime('%Y-%m'))
 
-    # Generar PDF
-    pdf_buffer = generar_reporte_pdf(iglesia, año_mes)
-
-    # Retornar como descarga
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="reporte_{iglesia.nombre}_{año_mes}.pdf"'
+    # Generar PDF en segundo plano
+    job, _ = encolar_reporte(request.user, 'REPORTE_MENSUAL', {'mes': año_mes})
 
-    return response
+    return responder_job(job)
 
 
 @login_required
@@ -596,11 +560,8 @@ def generar_reporte_movimientos_completo_view(request):
             messages.error(request, 'No tiene permisos para generar reportes')
             return redirect('dashboard')
 
-    from core.utils import generar_reporte_movimientos_completo_pdf
     from datetime import datetime
 
-    iglesia = request.user.iglesia
-
     # Obtener parámetros de fecha (opcionales)
     fecha_desde_str = request.GET.get('fecha_desde')
     fecha_hasta_str = request.GET.get('fecha_hasta')
@@ -620,19 +581,13 @@ def generar_reporte_movimientos_completo_view(request):
         except ValueError:
             pass
 
-    # Generar PDF
-    pdf_buffer = generar_reporte_movimientos_completo_pdf(iglesia, fecha_desde, fecha_hasta)
-
-    # Retornar como descarga
-    filename = f"movimientos_{iglesia.nombre.replace(' ', '_')}"
-    if fecha_desde and fecha_hasta:
-        filename += f"_{fecha_desde.strftime('%Y%m%d')}-{fecha_hasta.strftime('%Y%m%d')}"
-    filename += ".pdf"
-
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Generar PDF en segundo plano
+    job, _ = encolar_reporte(request.user, 'MOVIMIENTOS_COMPLETO', {
+        'fecha_desde': fecha_desde.isoformat() if fecha_desde else None,
+        'fecha_hasta': fecha_hasta.isoformat() if fecha_hasta else None,
+    })
 
-    return response
+    return responder_job(job)
 
 
 @login_required
@@ -649,7 +604,14 @@ def dashboard_data_api(request):
     iglesia = request.user.iglesia
     # Obtener mes seleccionado desde GET
     mes_seleccionado = request.GET.get('mes', None)
-    data = get_dashboard_data(iglesia, meses=6, mes_distribucion=mes_seleccionado)
+
+    # Cacheado hasta que cambien los datos de la iglesia (o el mes en curso)
+    clave = clave_datos(iglesia, 'dashboard_data', mes_seleccionado, timezone.now().strftime('%Y-%m')) if iglesia else None
+    data = cache.get(clave) if clave else None
+    if data is None:
+        data = get_dashboard_data(iglesia, meses=6, mes_distribucion=mes_seleccionado)
+        if clave:
+            cache.set(clave, data)
 
     return JsonResponse(data)
 
@@ -670,84 +632,45 @@ def exportar_excel_view(request):
                 messages.error(request, 'No tiene permisos para generar reportes')
                 return redirect('dashboard')
 
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from io import BytesIO
+    # Generar Excel en segundo plano
+    job, _ = encolar_reporte(request.user, 'EXCEL', {'mes': request.GET.get('mes') or None})
 
-    iglesia = request.user.iglesia
+    return responder_job(job)
 
-    # Obtener filtros (excluir movimientos anulados)
-    queryset = Movimiento.objects.filter(iglesia=iglesia, anulado=False).order_by('-fecha')
-
-    # Aplicar filtros si existen
-    mes = request.GET.get('mes')
-    if mes:
-        año, mes_num = mes.split('-')
-        queryset = queryset.filter(fecha__year=int(año), fecha__month=int(mes_num))
-
-    # Crear workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Movimientos"
-
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="2C3E50", end_color="2C3E50", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-
-    # Estilos para montos
-    egreso_font = Font(bold=True, color="DC3545")  # Rojo
-    ingreso_font = Font(bold=True, color="198754")  # Verde
-
-    # Headers
-    headers = ['Fecha', 'Tipo', 'Categoría', 'Concepto', 'Monto', 'Comprobante']
-    for col, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-
-    # Datos
-    for row, mov in enumerate(queryset, start=2):
-        categoria = mov.categoria_ingreso or mov.categoria_egreso
-        ws.cell(row=row, column=1, value=mov.fecha.strftime('%d/%m/%Y'))
-        ws.cell(row=row, column=2, value=mov.get_tipo_display())
-        ws.cell(row=row, column=3, value=str(categoria))
-        ws.cell(row=row, column=4, value=mov.concepto)
-
-        # Monto: negativo para egresos, positivo para ingresos
-        monto_cell = ws.cell(row=row, column=5)
-        if mov.tipo == 'EGRESO':
-            monto_cell.value = -float(mov.monto)  # Negativo
-            monto_cell.font = egreso_font  # Rojo
-        else:
-            monto_cell.value = float(mov.monto)
-            monto_cell.font = ingreso_font  # Verde
-
-        # Formato de número con separador de miles
-        monto_cell.number_format = '#,##0.00'
-
-        ws.cell(row=row, column=6, value=mov.comprobante_nro or '')
-
-    # Ajustar anchos de columna
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 10
-    ws.column_dimensions['C'].width = 25
-    ws.column_dimensions['D'].width = 50
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
-
-    # Guardar en buffer
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-
-    # Retornar como descarga
-    response = HttpResponse(
-        buffer,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    filename = f'movimientos_{iglesia.nombre}_{timezone.now().strftime("%Y%m%d")}.xlsx'
+
+@login_required
+def exportar_movimientos_view(request, formato):
+    """
+    Exportación masiva de movimientos en CSV o NDJSON por streaming.
+    Acepta los mismos filtros que el listado de movimientos.
+    """
+    from django.http import Http404, StreamingHttpResponse
+    from core.utils import FORMATOS_EXPORTACION
+
+    # Si el usuario no tiene iglesia, redirigir a registro de iglesia
+    if not request.user.is_staff and not request.user.is_superuser:
+        if not request.user.iglesia:
+            return redirect('seleccionar_tipo_registro')
+
+        # Verificar que el usuario tenga permiso para generar reportes
+        if not request.user.puede_generar_reportes:
+            messages.error(request, 'No tiene permisos para generar reportes')
+            return redirect('dashboard')
+
+    if formato not in FORMATOS_EXPORTACION:
+        raise Http404('Formato de exportación no soportado')
+
+    iglesia = request.user.iglesia
+    queryset = Movimiento.objects.filter(iglesia=iglesia).order_by('fecha', 'id')
+    form = FiltroMovimientosForm(request.GET, iglesia=iglesia)
+    # Con filtros inválidos no se exporta todo el libro en su lugar
+    if not form.is_valid():
+        return JsonResponse({'error': 'Filtros inválidos', 'errores': form.errors}, status=400)
+    queryset = aplicar_filtros_movimientos(queryset, form)
+
+    generador, content_type = FORMATOS_EXPORTACION[formato]
+    response = StreamingHttpResponse(generador(queryset), content_type=content_type)
+    filename = f'movimientos_{iglesia.nombre}_{timezone.now().strftime("%Y%m%d")}.{formato}'
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
     return response
@@ -764,20 +687,12 @@ def exportar_dashboard_pdf_view(request):
             if not request.user.iglesia:
                 return redirect('seleccionar_tipo_registro')
 
-    from core.utils import generar_dashboard_pdf
-
-    iglesia = request.user.iglesia
     mes_seleccionado = request.GET.get('mes', timezone.now().strftime('%Y-%m'))
 
-    # Generar PDF
-    pdf_buffer = generar_dashboard_pdf(iglesia, mes_seleccionado)
-
-    # Preparar respuesta
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    filename = f'dashboard_{iglesia.nombre}_{timezone.now().strftime("%Y%m%d")}.pdf'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Generar PDF en segundo plano
+    job, _ = encolar_reporte(request.user, 'DASHBOARD', {'mes': mes_seleccionado})
 
-    return response
+    return responder_job(job)
 
 
 @login_required
@@ -1296,7 +1211,7 @@ def perfil_usuario_view(request):
     usuario = request.user
 
     # Obtener cajas asignadas si las tiene
-    cajas_asignadas = usuario.cajas_asignadas.select_related('caja_chica').all() if hasattr(usuario, 'cajas_asignadas') else []
+    cajas_asignadas = list(usuario.asignaciones_caja.values())
 
     # Obtener estadísticas de movimientos creados (si tiene acceso)
     movimientos_creados = 0
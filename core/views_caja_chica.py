@@ -6,8 +6,10 @@ from django.contrib import messages
 from django.db.models import Sum
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from decimal import Decimal
 
+from core.cache import clave_datos
 from core.models import CajaChica, MovimientoCajaChica, TransferenciaCajaChica, CodigoInvitacion, UsuarioCajaChica
 from core.forms_caja_chica import (
     CajaChicaForm,
@@ -34,19 +36,11 @@ class CajaChicaListView(LoginRequiredMixin, ListView):
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
+        # El saldo de cada caja está materializado en CajaChica.saldo_actual
         return CajaChica.objects.filter(
             iglesia=self.request.user.iglesia
         ).order_by('-activa', 'nombre')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-
-        # Calcular saldo de cada caja
-        for caja in context['cajas']:
-            caja.saldo_actual = caja.calcular_saldo_actual()
-
-        return context
-
 
 class CajaChicaCreateView(LoginRequiredMixin, CreateView):
     model = CajaChica
@@ -120,25 +114,60 @@ def desactivar_caja_chica(request, pk):
 # VISTAS DE MOVIMIENTOS DE CAJA CHICA
 # ============================================================================
 
-class MovimientoCajaChicaListView(LoginRequiredMixin, ListView):
-    model = MovimientoCajaChica
-    template_name = 'core/movimiento_caja_list.html'
-    context_object_name = 'movimientos'
-    paginate_by = 20
+class CajaChicaAccesoMixin:
+    """
+    Mixin para vistas de una caja chica específica.
+    Resuelve en dispatch, una sola vez, la caja de la URL (con su iglesia) y
+    los permisos del usuario sobre ella, y los expone como self.caja,
+    self.puede_ver y self.puede_crear. Agrega al contexto 'caja',
+    'saldo_actual', 'puede_crear', 'puede_crear_movimientos' y 'es_admin'.
+    """
+    caja_url_kwarg = 'caja_pk'
+    # Permiso requerido para acceder: 'ver' o 'crear'
+    permiso_caja = 'ver'
+    mensaje_sin_permiso = 'No tienes acceso a esta caja'
 
     def dispatch(self, request, *args, **kwargs):
-        self.caja = get_object_or_404(CajaChica, pk=self.kwargs['caja_pk'])
+        self.caja = get_object_or_404(
+            CajaChica.objects.select_related('iglesia'),
+            pk=self.kwargs[self.caja_url_kwarg]
+        )
+        self.puede_ver = request.user.puede_ver_caja(self.caja)
+        self.puede_crear = request.user.puede_crear_movimiento_caja(self.caja)
 
-        # Verificar que el usuario tenga acceso a esta caja
-        if not request.user.puede_ver_caja(self.caja):
-            messages.error(request, 'No tienes acceso a esta caja')
-            return redirect('dashboard')
+        permitido = self.puede_crear if self.permiso_caja == 'crear' else self.puede_ver
+        if not permitido:
+            messages.error(request, self.mensaje_sin_permiso)
+            return self.redirigir_sin_permiso()
 
         return super().dispatch(request, *args, **kwargs)
 
+    def redirigir_sin_permiso(self):
+        return redirect('dashboard')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'caja': self.caja,
+            'saldo_actual': self.caja.saldo_actual,
+            'puede_crear': self.puede_crear,
+            'puede_crear_movimientos': self.puede_crear,
+            'es_admin': self.request.user.rol == 'ADMIN',
+        })
+        return context
+
+
+class MovimientoCajaChicaListView(LoginRequiredMixin, CajaChicaAccesoMixin, ListView):
+    model = MovimientoCajaChica
+    template_name = 'core/movimiento_caja_list.html'
+    context_object_name = 'movimientos'
+    paginate_by = 20
+
     def get_queryset(self):
         return MovimientoCajaChica.objects.filter(
             caja_chica=self.caja
+        ).select_related(
+            'categoria_ingreso', 'categoria_egreso', 'creado_por', 'aprobado_por', 'anulado_por'
         ).order_by('-fecha', '-fecha_creacion')
 
     def get_context_data(self, **kwargs):
@@ -146,10 +175,6 @@ class MovimientoCajaChicaListView(LoginRequiredMixin, ListView):
         from decimal import Decimal
 
         context = super().get_context_data(**kwargs)
-        context['caja'] = self.caja
-        context['saldo_actual'] = self.caja.calcular_saldo_actual()
-        context['puede_crear'] = self.request.user.puede_crear_movimiento_caja(self.caja)
-        context['es_admin'] = self.request.user.rol == 'ADMIN'
 
         # Calcular totales
         movimientos = MovimientoCajaChica.objects.filter(caja_chica=self.caja, anulado=False)
@@ -164,23 +189,23 @@ class MovimientoCajaChicaListView(LoginRequiredMixin, ListView):
         context['categorias_ingreso'] = self.caja.iglesia.categorias_ingreso.filter(activa=True)
         context['categorias_egreso'] = self.caja.iglesia.categorias_egreso.filter(activa=True)
 
+        # Todas las categorías (incluidas las inactivas) para los modales de edición,
+        # evaluadas una vez en lugar de una por movimiento
+        context['categorias_ingreso_edicion'] = list(self.caja.iglesia.categorias_ingreso.all())
+        context['categorias_egreso_edicion'] = list(self.caja.iglesia.categorias_egreso.all())
+
         return context
 
 
-class MovimientoCajaChicaCreateView(LoginRequiredMixin, CreateView):
+class MovimientoCajaChicaCreateView(LoginRequiredMixin, CajaChicaAccesoMixin, CreateView):
     model = MovimientoCajaChica
     form_class = MovimientoCajaChicaForm
     template_name = 'core/movimiento_caja_form.html'
+    permiso_caja = 'crear'
+    mensaje_sin_permiso = 'No tienes permisos para crear movimientos en esta caja'
 
-    def dispatch(self, request, *args, **kwargs):
-        self.caja = get_object_or_404(CajaChica, pk=self.kwargs['caja_pk'])
-
-        # Verificar permisos para crear
-        if not request.user.puede_crear_movimiento_caja(self.caja):
-            messages.error(request, 'No tienes permisos para crear movimientos en esta caja')
-            return redirect('movimiento_caja_list', caja_pk=self.caja.pk)
-
-        return super().dispatch(request, *args, **kwargs)
+    def redirigir_sin_permiso(self):
+        return redirect('movimiento_caja_list', caja_pk=self.caja.pk)
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -203,37 +228,21 @@ class MovimientoCajaChicaCreateView(LoginRequiredMixin, CreateView):
 
         return redirect('movimiento_caja_list', caja_pk=self.caja.pk)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['caja'] = self.caja
-        context['saldo_actual'] = self.caja.calcular_saldo_actual()
-        return context
-
 
-class MovimientoCajaChicaUpdateView(LoginRequiredMixin, UpdateView):
+class MovimientoCajaChicaUpdateView(LoginRequiredMixin, CajaChicaAccesoMixin, UpdateView):
     model = MovimientoCajaChica
     form_class = MovimientoCajaChicaForm
     template_name = 'core/movimiento_caja_form.html'
+    # Solo ADMIN de la iglesia o TESORERO_CAJA puede editar
+    permiso_caja = 'crear'
+    mensaje_sin_permiso = 'No tienes permisos para editar movimientos'
 
-    def dispatch(self, request, *args, **kwargs):
-        movimiento = self.get_object()
-        self.caja = movimiento.caja_chica
-
-        # Solo ADMIN o TESORERO_CAJA puede editar
-        if not (request.user.rol == 'ADMIN' or
-                request.user.puede_crear_movimiento_caja(self.caja)):
-            messages.error(request, 'No tienes permisos para editar movimientos')
-            return redirect('movimiento_caja_list', caja_pk=self.caja.pk)
-
-        # No se pueden editar movimientos anulados
-        if movimiento.anulado:
-            messages.error(request, 'No puedes editar un movimiento anulado')
-            return redirect('movimiento_caja_list', caja_pk=self.caja.pk)
-
-        return super().dispatch(request, *args, **kwargs)
+    def redirigir_sin_permiso(self):
+        return redirect('movimiento_caja_list', caja_pk=self.caja.pk)
 
     def get_queryset(self):
-        return MovimientoCajaChica.objects.filter(anulado=False)
+        # Los movimientos anulados no se pueden editar
+        return MovimientoCajaChica.objects.filter(caja_chica=self.caja, anulado=False)
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -248,12 +257,6 @@ class MovimientoCajaChicaUpdateView(LoginRequiredMixin, UpdateView):
     def get_success_url(self):
         return reverse_lazy('movimiento_caja_list', kwargs={'caja_pk': self.caja.pk})
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['caja'] = self.caja
-        context['saldo_actual'] = self.caja.calcular_saldo_actual()
-        return context
-
 
 @login_required
 def anular_movimiento_caja(request, caja_pk, pk):
@@ -412,25 +415,21 @@ def generar_codigo_caja_view(request):
 # DASHBOARD DE CAJA CHICA
 # ============================================================================
 
-class DashboardCajaChicaView(LoginRequiredMixin, DetailView):
+class DashboardCajaChicaView(LoginRequiredMixin, CajaChicaAccesoMixin, DetailView):
     model = CajaChica
     template_name = 'core/dashboard_caja.html'
     context_object_name = 'caja'
+    caja_url_kwarg = 'pk'
 
-    def dispatch(self, request, *args, **kwargs):
-        caja = self.get_object()
-
-        # Verificar acceso
-        if not request.user.puede_ver_caja(caja):
-            messages.error(request, 'No tienes acceso a esta caja')
-            return redirect('dashboard')
-
-        return super().dispatch(request, *args, **kwargs)
+    def get_object(self, queryset=None):
+        # La caja ya se resolvió (y se verificó el acceso) en dispatch
+        return self.caja
 
     def get_context_data(self, **kwargs):
         from django.utils import timezone
         from dateutil.relativedelta import relativedelta
         from decimal import Decimal
+        from core.utils import rango_mes
 
         context = super().get_context_data(**kwargs)
         caja = self.object
@@ -439,27 +438,13 @@ class DashboardCajaChicaView(LoginRequiredMixin, DetailView):
         mes_anterior = (timezone.now() - relativedelta(months=1)).strftime('%Y-%m')
         mes_seleccionado = self.request.GET.get('mes', mes_anterior)
 
-        # Saldo actual (histórico total)
-        total_ingresos_historico = MovimientoCajaChica.objects.filter(
-            caja_chica=caja,
-            tipo='INGRESO',
-            anulado=False
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-        total_egresos_historico = MovimientoCajaChica.objects.filter(
-            caja_chica=caja,
-            tipo='EGRESO',
-            anulado=False
-        ).aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
-
-        saldo_final = total_ingresos_historico - total_egresos_historico + caja.saldo_inicial
+        # Saldo actual (histórico total, materializado en la caja)
+        saldo_final = caja.saldo_actual
 
         # Movimientos del mes seleccionado
-        año, mes = mes_seleccionado.split('-')
         movimientos_mes = MovimientoCajaChica.objects.filter(
             caja_chica=caja,
-            fecha__year=int(año),
-            fecha__month=int(mes),
+            **rango_mes(mes_seleccionado),
             anulado=False
         )
 
@@ -505,19 +490,14 @@ class DashboardCajaChicaView(LoginRequiredMixin, DetailView):
         mes_nombre = formato_mes(fecha_sel, corto=False)
 
         context.update({
-            'caja': caja,
             'mes_seleccionado': mes_seleccionado,
             'mes_nombre': mes_nombre,
-            'saldo_actual': saldo_final,
             'saldo_actual_format': formato_pesos(saldo_final),
             'saldo_clase': saldo_clase,
             'total_ingresos_mes': formato_pesos(total_ingresos_mes),
             'total_egresos_mes': formato_pesos(total_egresos_mes),
             'ultimos_movimientos': ultimos_movimientos,
             'alertas': alertas,
-            'puede_crear': self.request.user.puede_crear_movimiento_caja(caja),
-            'puede_crear_movimientos': self.request.user.puede_crear_movimiento_caja(caja),
-            'es_admin': self.request.user.rol == 'ADMIN',
         })
 
         return context
@@ -525,10 +505,14 @@ class DashboardCajaChicaView(LoginRequiredMixin, DetailView):
 
 @login_required
 def dashboard_caja_data_api(request, caja_pk):
-    """API para obtener datos de gráficas del dashboard de caja chica"""
-    from datetime import datetime, timedelta
-    from django.db.models import Q
-    from collections import defaultdict
+    """
+    API para obtener datos de gráficas del dashboard de caja chica.
+    Parámetros opcionales: ?año=YYYY (año calendario, por defecto el actual)
+    o ?meses=N (ventana móvil de N meses que termina en el mes actual).
+    """
+    from datetime import date
+    from dateutil.relativedelta import relativedelta
+    from core.utils import serie_mensual_caja
 
     caja = get_object_or_404(CajaChica, pk=caja_pk)
 
@@ -536,47 +520,44 @@ def dashboard_caja_data_api(request, caja_pk):
     if not request.user.puede_ver_caja(caja):
         return JsonResponse({'error': 'No autorizado'}, status=403)
 
-    # Obtener año actual
-    año_actual = datetime.now().year
-
-    # Inicializar datos mensuales
-    meses_labels = []
-    saldos_data = []
-    ingresos_data = []
-    egresos_data = []
-    balance_data = []
-
-    saldo_acumulado = float(caja.saldo_inicial)
-
-    # Procesar cada mes del año
-    for mes in range(1, 13):
-        fecha = datetime(año_actual, mes, 1)
-        mes_nombre = fecha.strftime('%b')
-        meses_labels.append(mes_nombre)
+    hoy = date.today()
 
-        # Obtener movimientos del mes
-        movimientos = MovimientoCajaChica.objects.filter(
-            caja_chica=caja,
-            fecha__year=año_actual,
-            fecha__month=mes,
-            anulado=False
-        )
-
-        ingresos = float(movimientos.filter(tipo='INGRESO').aggregate(
-            total=Sum('monto')
-        )['total'] or 0)
+    # Determinar ventana de meses a mostrar
+    try:
+        if request.GET.get('meses'):
+            cantidad_meses = int(request.GET['meses'])
+            if not 1 <= cantidad_meses <= 60:
+                raise ValueError
+            fecha_inicio = hoy.replace(day=1) - relativedelta(months=cantidad_meses - 1)
+        else:
+            año = int(request.GET.get('año', hoy.year))
+            if not 1900 <= año <= 9999:
+                raise ValueError
+            cantidad_meses = 12
+            fecha_inicio = date(año, 1, 1)
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos'}, status=400)
+
+    # Cacheado hasta que cambien los datos de la caja (o el mes en curso)
+    clave = clave_datos(
+        caja.iglesia_id, 'dashboard_caja_data', fecha_inicio.isoformat(), cantidad_meses,
+        hoy.strftime('%Y-%m'), caja=caja
+    )
+    data = cache.get(clave)
+    if data is not None:
+        return JsonResponse(data)
 
-        egresos = float(movimientos.filter(tipo='EGRESO').aggregate(
-            total=Sum('monto')
-        )['total'] or 0)
+    fecha_fin = fecha_inicio + relativedelta(months=cantidad_meses)
+    un_solo_año = fecha_inicio.year == (fecha_fin - relativedelta(days=1)).year
 
-        # Calcular saldo acumulado
-        saldo_acumulado += ingresos - egresos
+    # Totales mensuales en una sola consulta
+    serie = serie_mensual_caja(caja, fecha_inicio, cantidad_meses)
 
-        ingresos_data.append(ingresos)
-        egresos_data.append(egresos)
-        saldos_data.append(saldo_acumulado)
-        balance_data.append(ingresos - egresos)
+    meses_labels = [item['mes'].strftime('%b' if un_solo_año else '%b %y') for item in serie]
+    ingresos_data = [float(item['ingresos']) for item in serie]
+    egresos_data = [float(item['egresos']) for item in serie]
+    saldos_data = [float(item['saldo_final']) for item in serie]
+    balance_data = [float(item['ingresos'] - item['egresos']) for item in serie]
 
     # Calcular KPIs
     meses_con_datos = [i for i in range(len(ingresos_data)) if ingresos_data[i] > 0 or egresos_data[i] > 0]
@@ -597,7 +578,8 @@ def dashboard_caja_data_api(request, caja_pk):
 
     gastos_por_categoria = MovimientoCajaChica.objects.filter(
         caja_chica=caja,
-        fecha__year=año_actual,
+        fecha__gte=fecha_inicio,
+        fecha__lt=fecha_fin,
         tipo='EGRESO',
         anulado=False,
         categoria_egreso__isnull=False
@@ -609,7 +591,7 @@ def dashboard_caja_data_api(request, caja_pk):
         categorias_labels.append(item['categoria_egreso__nombre'])
         categorias_data.append(float(item['total']))
 
-    return JsonResponse({
+    data = {
         'meses_labels': meses_labels,
         'saldos_data': saldos_data,
         'ingresos_data': ingresos_data,
@@ -621,7 +603,46 @@ def dashboard_caja_data_api(request, caja_pk):
         'meses_deficit': meses_deficit,
         'categorias_labels': categorias_labels,
         'categorias_data': categorias_data,
-    })
+    }
+    cache.set(clave, data)
+
+    return JsonResponse(data)
+
+
+@login_required
+def exportar_movimientos_caja_view(request, caja_pk, formato):
+    """
+    Exportación masiva de los movimientos de una caja chica en CSV o NDJSON
+    por streaming. Acepta los mismos filtros que el listado de movimientos.
+    """
+    from django.http import Http404, StreamingHttpResponse
+    from django.utils import timezone
+    from core.forms import FiltroMovimientosForm
+    from core.utils import FORMATOS_EXPORTACION, aplicar_filtros_movimientos
+
+    caja = get_object_or_404(CajaChica.objects.select_related('iglesia'), pk=caja_pk)
+
+    # Verificar acceso
+    if not request.user.puede_ver_caja(caja):
+        messages.error(request, 'No tienes acceso a esta caja')
+        return redirect('dashboard')
+
+    if formato not in FORMATOS_EXPORTACION:
+        raise Http404('Formato de exportación no soportado')
+
+    queryset = MovimientoCajaChica.objects.filter(caja_chica=caja).order_by('fecha', 'id')
+    form = FiltroMovimientosForm(request.GET, iglesia=caja.iglesia)
+    # Con filtros inválidos no se exporta todo el libro en su lugar
+    if not form.is_valid():
+        return JsonResponse({'error': 'Filtros inválidos', 'errores': form.errors}, status=400)
+    queryset = aplicar_filtros_movimientos(queryset, form)
+
+    generador, content_type = FORMATOS_EXPORTACION[formato]
+    response = StreamingHttpResponse(generador(queryset), content_type=content_type)
+    filename = f'movimientos_{caja.nombre}_{timezone.now().strftime("%Y%m%d")}.{formato}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    return response
 
 
 # Alias para compatibilidad con urls.py
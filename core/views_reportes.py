@@ -0,0 +1,79 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import FileResponse, JsonResponse
+from django.urls import reverse
+
+from core.models import ReporteJob
+from core.reportes import retomar_job
+
+
+def responder_job(job):
+    """
+    Respuesta para una vista de reporte luego de encolarlo: descarga directa
+    si ya está listo (modo local), o la página de estado que espera al worker.
+    """
+    if job.estado == 'COMPLETADO':
+        return redirect('descargar_reporte_job', pk=job.pk)
+    return redirect('reporte_job_estado', pk=job.pk)
+
+
+def _job_de_iglesia(request, pk):
+    """
+    Job de la iglesia del usuario. Con permiso para generar reportes se ven
+    todos los de la iglesia; sin él, los que pidió el propio usuario y los del
+    dashboard PDF, que puede exportar cualquiera que vea el dashboard (un job
+    en curso se comparte entre quienes piden el mismo reporte).
+    """
+    usuario = request.user
+    jobs = ReporteJob.objects.filter(iglesia_id=usuario.iglesia_id)
+    if not (usuario.is_staff or usuario.is_superuser or usuario.puede_generar_reportes):
+        jobs = jobs.filter(Q(solicitado_por=usuario) | Q(tipo='DASHBOARD'))
+    return get_object_or_404(jobs, pk=pk)
+
+
+@login_required
+def reporte_job_estado_view(request, pk):
+    """
+    Página de espera de un reporte en segundo plano.
+    Se recarga sola mientras el job está pendiente o en proceso.
+    """
+    job = retomar_job(_job_de_iglesia(request, pk))
+
+    return render(request, 'core/reporte_job.html', {
+        'job': job,
+        'url_estado': reverse('reporte_job_estado_api', args=[job.pk]),
+        'url_descarga': reverse('descargar_reporte_job', args=[job.pk]),
+    })
+
+
+@login_required
+def reporte_job_estado_api(request, pk):
+    """API de consulta (polling) del estado de un reporte en segundo plano"""
+    job = retomar_job(_job_de_iglesia(request, pk))
+
+    return JsonResponse({
+        'id': job.pk,
+        'tipo': job.tipo,
+        'estado': job.estado,
+        'terminado': job.terminado,
+        'error': job.error,
+        'url_descarga': reverse('descargar_reporte_job', args=[job.pk]) if job.estado == 'COMPLETADO' else None,
+    })
+
+
+@login_required
+def descargar_reporte_job_view(request, pk):
+    """Descarga el archivo generado por un reporte en segundo plano"""
+    job = _job_de_iglesia(request, pk)
+
+    if job.estado != 'COMPLETADO':
+        return redirect('reporte_job_estado', pk=job.pk)
+
+    # FileResponse envía el archivo por bloques, sin cargarlo en memoria
+    return FileResponse(
+        job.archivo.open('rb'),
+        as_attachment=True,
+        filename=job.nombre_archivo,
+        content_type=job.content_type
+    )
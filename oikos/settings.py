@@ -72,6 +72,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.perfil.PerfilConsultasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -94,6 +95,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.app_name',
+                'core.context_processors.navegacion',
                 'social_django.context_processors.backends',
                 'social_django.context_processors.login_redirect',
             ],
@@ -178,7 +180,8 @@ STORAGES = {
     },
 }
 
-# Media files
+# Media files (incluye los archivos generados por los reportes en segundo plano,
+# ReporteJob.archivo, que se sirven por la vista de descarga y no desde MEDIA_URL)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -231,8 +234,98 @@ SOCIAL_AUTH_PIPELINE = (
     'social_core.pipeline.user.user_details',
 )
 
-# Redis (optional)
-REDIS_URL = env('REDIS_URL', default='redis://localhost:6379')
+# Reportes en segundo plano: 'local' (por defecto) genera el reporte dentro del
+# request; 'cola' lo deja en la base de datos para el worker, que hay que
+# agregar como proceso aparte (worker: python manage.py procesar_reportes) y que
+# debe compartir con el web el storage de MEDIA_ROOT
+REPORTES_MODO = env('REPORTES_MODO', default='local')
+
+# Minutos tras los cuales un job en proceso se considera colgado y vuelve a pendiente
+REPORTES_TIMEOUT_MINUTOS = env.int('REPORTES_TIMEOUT_MINUTOS', default=10)
+
+# Días que se conservan los jobs terminados y sus archivos. Se purgan al pedir
+# cada reporte (y al iniciar el worker); pedir de nuevo un reporte reemplaza
+# además el job terminado anterior del mismo reporte
+REPORTES_RETENCION_DIAS = env.int('REPORTES_RETENCION_DIAS', default=7)
+
+# Cachés (ver core.cache para las claves versionadas por iglesia).
+# Para cada caché gana, en este orden: su directorio (CACHE_DIR /
+# REPORTES_CACHE_DIR), que la guarda en disco compartida entre procesos del
+# mismo servidor; REDIS_URL, que la comparte en Redis entre los workers de
+# gunicorn y el worker de reportes; y si no, memoria de cada proceso. En disco
+# y en memoria se descartan las entradas más viejas al superar MAX_ENTRIES
+REDIS_URL = env('REDIS_URL', default='')
+CACHE_KEY_PREFIX = env('CACHE_KEY_PREFIX', default='oikos')
+CACHE_TIMEOUT = env.int('CACHE_TIMEOUT', default=60 * 60)
+CACHE_DIR = env('CACHE_DIR', default='')
+
+# Caché de reportes generados (ver core.reportes)
+REPORTES_CACHE = 'reportes'
+REPORTES_CACHE_TIMEOUT = env.int('REPORTES_CACHE_TIMEOUT', default=60 * 60 * 24 * 30)
+REPORTES_CACHE_DIR = env('REPORTES_CACHE_DIR', default='')
+# En Redis no hay MAX_ENTRIES: los PDF/XLSX completos viven menos tiempo
+REPORTES_CACHE_REDIS_TIMEOUT = env.int('REPORTES_CACHE_REDIS_TIMEOUT', default=60 * 60 * 24)
+
+
+def configurar_cache(prefijo, timeout, directorio, max_entries, timeout_redis=None):
+    if REDIS_URL and not directorio:
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': prefijo,
+            'TIMEOUT': timeout_redis or timeout,
+        }
+    if directorio:
+        backend = 'django.core.cache.backends.filebased.FileBasedCache'
+    else:
+        backend = 'django.core.cache.backends.locmem.LocMemCache'
+    return {
+        'BACKEND': backend,
+        'LOCATION': directorio or prefijo,
+        'KEY_PREFIX': prefijo,
+        'TIMEOUT': timeout,
+        'OPTIONS': {'MAX_ENTRIES': max_entries},
+    }
+
+
+CACHES = {
+    'default': configurar_cache(
+        CACHE_KEY_PREFIX, CACHE_TIMEOUT, CACHE_DIR,
+        env.int('CACHE_MAX_ENTRIES', default=5000)
+    ),
+    REPORTES_CACHE: configurar_cache(
+        f'{CACHE_KEY_PREFIX}:reportes', REPORTES_CACHE_TIMEOUT, REPORTES_CACHE_DIR,
+        env.int('REPORTES_CACHE_MAX_ENTRIES', default=200),
+        timeout_redis=REPORTES_CACHE_REDIS_TIMEOUT
+    ),
+}
+
+# Menú lateral cacheado por usuario en la caché 'default' (core.context_processors.navegacion).
+# Los signals lo invalidan; el timeout acota cuánto puede tardar en verse un
+# cambio en otros procesos mientras la caché sea en memoria de cada proceso
+NAVEGACION_CACHE_TIMEOUT = env.int('NAVEGACION_CACHE_TIMEOUT', default=60 * 5)
+
+# Gráficas de reportes PDF: motor ('matplotlib' o 'reportlab' vectorial),
+# resolución (solo matplotlib) y factor de escala del tamaño de figura
+REPORTES_GRAFICAS_MOTOR = env('REPORTES_GRAFICAS_MOTOR', default='matplotlib')
+REPORTES_GRAFICAS_DPI = env.int('REPORTES_GRAFICAS_DPI', default=150)
+REPORTES_GRAFICAS_ESCALA = env.float('REPORTES_GRAFICAS_ESCALA', default=1.0)
+
+# Perfilado de consultas por request (core.perfil): header Server-Timing y
+# log en 'core.perfil', con advertencia si una consulta se repite UMBRAL veces
+PERFIL_CONSULTAS = env.bool('PERFIL_CONSULTAS', default=False)
+PERFIL_CONSULTAS_UMBRAL = env.int('PERFIL_CONSULTAS_UMBRAL', default=10)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.perfil': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 # Security settings for production
 if not DEBUG: